@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ClassesConfig(AppConfig):
     name = 'classes'
+
+    def ready(self):
+        from common.utilities.reference import register_reference_cache
+        register_reference_cache(self.get_model('Class'), indexes=('name',))
@@ -0,0 +1,16 @@
+from django_filters import rest_framework as filters
+
+from common.utilities import CommonFieldsFilterset
+
+from classes.models import Class
+
+
+class ClassFilter(CommonFieldsFilterset):
+    name = filters.CharFilter(field_name='name', lookup_expr='iexact')
+
+    class Meta(object):
+        model = Class
+        fields = (
+            'name',
+            'class_teacher',
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 2.1.1 on 2026-10-18 07:14
+
+import common.utilities.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0002_auto_20180917_0313'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='class',
+            name='id',
+            field=models.UUIDField(default=common.utilities.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
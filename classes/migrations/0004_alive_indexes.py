@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Partial index for the rows `SoftDeletionManager` returns, matching the
+    default ordering plus `id`, the cursor pagination tie-breaker.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('classes', '0003_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS classes_class_alive_ordering_idx '
+            'ON classes_class (updated_at DESC, created_at DESC, id DESC) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS classes_class_alive_ordering_idx',
+        ),
+    ]
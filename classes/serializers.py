@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from common.utilities.relations import (
+	BatchedListSerializer,
+	BatchedPrimaryKeyRelatedField,
+)
 
 from classes.models import Class
 
@@ -8,8 +12,11 @@ from users.serializers import UserInlineSerializer
 
 
 class ClassSerializer(serializers.ModelSerializer):
+	serializer_related_field = BatchedPrimaryKeyRelatedField
+
 	class Meta:
 		model = Class
+		list_serializer_class = BatchedListSerializer
 		fields = (
 			'name',
 			'description',
@@ -38,4 +45,18 @@ class ClassInlineSerializer(serializers.ModelSerializer):
 			'name',
 			'description',
 			'class_teacher'
-		)
\ No newline at end of file
+		)
+
+
+class ClassExportSerializer(serializers.ModelSerializer):
+	class_teacher = serializers.CharField(
+		source='class_teacher.full_name', read_only=True, default=None)
+
+	class Meta:
+		model = Class
+		fields = (
+			'id',
+			'name',
+			'description',
+			'class_teacher',
+		)
@@ -1,3 +1,68 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from common.benchmarks.budgets import EndpointBudgetMixin
+from common.benchmarks.endpoints import Budget
+
+from classes.models import Class
+from classes.views import ClassViewSet
+from users.models import User
+
+
+class ClassEndpointBudgetTest(EndpointBudgetMixin, TestCase):
+	"""Query budgets of the class endpoints."""
+	app_label = 'classes'
+	# The list takes the `values()` path, which reads the class teachers
+	# with a batched query of their own.
+	budgets = {
+		('class-list', 'list'): Budget(queries=3, time_ms=250),
+		('class-list', 'create'): Budget(queries=3, time_ms=100),
+		('class-detail', 'retrieve'): Budget(queries=1, time_ms=100),
+		('class-detail', 'update'): Budget(queries=4, time_ms=100),
+		('class-detail', 'partial_update'): Budget(queries=3, time_ms=100),
+		('class-detail', 'destroy'): Budget(queries=2, time_ms=100),
+		('class-export', 'export'): Budget(queries=1, time_ms=250),
+	}
+	sparse_fields = {
+		'class-list': 'name',
+	}
+
+
+@override_settings(RESPONSE_CACHE=dict(settings.RESPONSE_CACHE, ENABLED=False))
+class ClassValuesListTest(TestCase):
+	"""The `values()` list path renders exactly what the serializer does."""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_user(
+			'classes', 'Amina', phone_number='+254722000200',
+			password='classes-pass', last_name='Otieno', gender='F')
+		Class.objects.create(
+			name='4A', description='Stream A', class_teacher=cls.user,
+			created_by=cls.user)
+		Class.objects.create(name='4B', created_by=cls.user)
+
+	def setUp(self):
+		self.client = APIClient()
+		self.client.credentials(
+			HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+
+	def get_list(self, params):
+		response = self.client.get(reverse('class-list'), params)
+		self.assertEqual(response.status_code, 200)
+		return response.json()
+
+	def test_matches_serializer_output(self):
+		for params in ({}, {'fields': 'name'}, {'omit': 'class_teacher'},
+				{'fields': 'name,class_teacher.full_name'}):
+			with self.subTest(params=params):
+				values = self.get_list(params)
+				with mock.patch.object(ClassViewSet, 'values_list', False):
+					serialized = self.get_list(params)
+				self.assertEqual(values, serialized)
+				self.assertEqual(len(values['results']), 2)
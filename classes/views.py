@@ -1,21 +1,22 @@
-from rest_framework.viewsets import ModelViewSet
+from common.views import BaseViewSet, ExportMixin
 
 from classes.models import Class
 
 from classes.serializers import (
 	ClassSerializer,
 	ClassInlineSerializer,
+	ClassExportSerializer,
 )
 
+from classes.filters import ClassFilter
 
-class BaseViewSet(ModelViewSet):
-	def perform_create(self, serializer):
-		serializer.save(created_by=self.request.user)
 
-
-class ClassViewSet(BaseViewSet):
+class ClassViewSet(ExportMixin, BaseViewSet):
 	queryset = Class.objects.all()
 	serializer_class = ClassSerializer
+	export_serializer_class = ClassExportSerializer
+	filter_class = ClassFilter
+	values_list = True
 
 	def get_serializer_class(self):
 		serializer_class = ClassSerializer
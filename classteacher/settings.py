@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 
 import os
 import datetime
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,12 +42,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters'
 ]
 
 
 CLASSTEACHER_APPS = [
+    'common.apps.CommonConfig',
     'users.apps.UsersConfig',
     'classes.apps.ClassesConfig',
     'students.apps.StudentsConfig',
@@ -56,6 +59,8 @@ CLASSTEACHER_APPS = [
 INSTALLED_APPS += CLASSTEACHER_APPS
 
 MIDDLEWARE = [
+    'common.utilities.metrics.MetricsMiddleware',
+    'common.utilities.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -146,14 +151,19 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'common.utilities.auth.CachedBasicAuthentication',
         'common.utilities.auth.JWTAuthentication',
     ),
     'EXCEPTION_HANDLER': 'common.utilities.exceptions.custom_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': (
+        'common.utilities.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_FILTER_BACKENDS': (
         # Remember to put this back in later
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',
+        'common.utilities.search.FullTextSearchFilter',
     ),
     'DEFAULT_PAGINATION_CLASS':
         'common.utilities.paginator.ClassteacherPagingSerializer',
@@ -172,6 +182,24 @@ MEDIA_URL = '/media/'
 
 AUTH_USER_MODEL = 'users.User'
 
+# The first hasher makes new hashes, the others only verify old ones. Logins
+# replace hashes made by another hasher or with other iterations.
+PASSWORD_HASHERS = [
+    'common.utilities.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Login password hashes run on WORKERS threads per process. Past MAX_QUEUE
+# waiting hashes logins get a 429 with Retry-After: RETRY_AFTER seconds.
+PASSWORD_HASHING = {
+    'WORKERS': int(os.getenv('PASSWORD_HASHING_WORKERS', 2)),
+    'MAX_QUEUE': int(os.getenv('PASSWORD_HASHING_MAX_QUEUE', 16)),
+    'RETRY_AFTER': 1,
+    'PBKDF2_ITERATIONS': int(os.getenv('PBKDF2_ITERATIONS', 120000)),
+}
+
 AUTHENTICATION_BACKENDS = [
     'common.utilities.auth.ClassteacherAuthenticationBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -179,4 +207,148 @@ AUTHENTICATION_BACKENDS = [
 
 JWT_AUTH = {
     'JWT_EXPIRATION_DELTA': datetime.timedelta(days=1),
+    # Authenticated users are cached per worker to avoid a query per request.
+    # A timeout of 0 disables the cache.
+    'JWT_PRINCIPAL_CACHE_TIMEOUT': 60,
+    'JWT_PRINCIPAL_CACHE_MAX_SIZE': 1024,
+}
+
+# Successful HTTP Basic credential checks are cached per worker so scripted
+# clients are not hashed on every request. A timeout of 0 disables the cache.
+BASIC_AUTH = {
+    'CREDENTIAL_CACHE_TIMEOUT': 60,
+    'CREDENTIAL_CACHE_MAX_SIZE': 1024,
+}
+
+# Student roster imports (`POST /api/students/bulk/`)
+BULK_IMPORT = {
+    'BATCH_SIZE': 500,
+    'MAX_ROWS': 20000,
+}
+
+# Streaming exports (`GET /api/<resource>/export/`)
+EXPORT = {
+    'CHUNK_SIZE': 2000,
+}
+
+# `default` is per worker. `shared` must be reachable by every worker: the
+# file based default covers the workers of one host, point it at memcached or
+# another network backend when serving from several, e.g.
+# SHARED_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'classteacher',
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'SHARED_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'classteacher-shared')),
+    },
+    'generations': {
+        'BACKEND': os.getenv(
+            'GENERATION_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'GENERATION_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'classteacher-generations')),
+        # One entry per model; never cull them.
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+}
+
+# Per-model generation counters, bumped on every write. They must live in a
+# cache all workers share for writes in one worker to reach the others, and
+# one of their own: a counter culled to make room for cached responses comes
+# back at a new seed, dropping everything stored under it. The app refuses
+# to start with a per-process backend or one shared with other caches. Every
+# request authenticated by a token reads the `User` generation, so serving
+# from several workers, prefer memcached to the file based default, e.g.
+# GENERATION_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache.
+GENERATION_CACHE_ALIAS = 'generations'
+
+# Cached list/retrieve responses, keyed by the generations of the models
+# they contain. SCOPE is 'user' to keep entries per user or 'shared' to
+# share them between all authenticated users.
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'shared',
+    'TIMEOUT': 300,
+    'SCOPE': 'user',
+}
+
+# Row counts of paginated lists. COUNT_STRATEGY is 'exact', 'cached' (for
+# COUNT_CACHE_TIMEOUT seconds, dropped on writes), 'estimate' (the planner's
+# estimate above ESTIMATE_THRESHOLD rows, PostgreSQL only) or 'none'. Views
+# override it with `count_strategy`, clients with `?count=`.
+PAGINATION = {
+    'COUNT_STRATEGY': 'exact',
+    'COUNT_CACHE_ALIAS': 'shared',
+    'COUNT_CACHE_TIMEOUT': 60,
+    'ESTIMATE_THRESHOLD': 100000,
+}
+
+# JSON responses. ENCODER is 'auto' to use orjson when it is installed,
+# 'orjson' to require it or 'json' for the standard library.
+JSON_RENDERER = {
+    'ENCODER': os.getenv('JSON_ENCODER', 'auto'),
+}
+
+# Per-worker caches of Class and Subject rows. Writes made by other workers
+# are picked up within CHECK_INTERVAL seconds through the generations.
+REFERENCE_CACHE = {
+    'CHECK_INTERVAL': 1,
+}
+
+# Request profiling. With ENABLED every response carries a Server-Timing
+# header; with ALLOW_HEADER a request can ask for one with `X-Profile: 1`.
+# Requests slower than SLOW_REQUEST_MS go to SLOW_REQUEST_LOG.
+PROFILING = {
+    'ENABLED': False,
+    'ALLOW_HEADER': DEBUG,
+    'SLOW_REQUEST_MS': 500,
+    'EXPLAIN': True,
+    'EXPLAIN_LIMIT': 5,
+}
+
+SLOW_REQUEST_LOG = os.getenv(
+    'SLOW_REQUEST_LOG', os.path.join(BASE_DIR, 'slow_requests.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_REQUEST_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'classteacher.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Request metrics, served at /metrics to requests sending
+# `Authorization: Bearer <TOKEN>` and to unproxied connections from
+# ALLOWED_IPS. Each worker writes its samples to DIRECTORY; the files of
+# exited workers are folded into one.
+METRICS = {
+    'ENABLED': True,
+    'DIRECTORY': os.getenv(
+        'METRICS_DIR', os.path.join(BASE_DIR, 'metrics')),
+    'FLUSH_INTERVAL': 1,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TOKEN': os.getenv('METRICS_TOKEN'),
 }
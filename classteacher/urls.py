@@ -19,6 +19,8 @@ from django.conf.urls import include, url
 from django.conf import settings
 from django.views.static import serve
 
+from common.utilities.metrics import metrics_view
+
 from users.views import (
     UserCreateAPIView,
     UserLoginAPIView,
@@ -43,6 +45,7 @@ apipatterns = [
 
 urlpatterns = [
     path(r'api/', include(apipatterns)),
+    path(r'metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CommonConfig(AppConfig):
     name = 'common'
+
+    def ready(self):
+        from common.signals import connect_generation_signals
+        from common.utilities.generations import check_generation_cache
+        check_generation_cache()
+        connect_generation_signals()
@@ -0,0 +1,7 @@
+"""
+Benchmark and regression harness helpers.
+
+`dataset` seeds a realistic school, `endpoints` discovers and measures the
+router registered API endpoints and `budgets` checks them from the tests.
+Each app declares the budgets of its own endpoints in its `tests.py`.
+"""
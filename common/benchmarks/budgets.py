@@ -0,0 +1,266 @@
+import datetime
+import os
+
+from django.conf import settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from common.benchmarks.dataset import seed_dataset
+from common.benchmarks.endpoints import (
+    Budget,
+    discover_endpoints,
+    measure,
+    write_results,
+)
+from common.utilities.reference import get_reference_caches
+
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+
+BENCHMARK_STUDENTS = int(os.getenv('BENCHMARK_STUDENTS', 2000))
+BENCHMARK_REPEAT = int(os.getenv('BENCHMARK_REPEAT', 3))
+BENCHMARK_TIME_FACTOR = float(os.getenv('BENCHMARK_TIME_FACTOR', 1))
+BENCHMARK_OUTPUT = os.getenv(
+    'BENCHMARK_OUTPUT',
+    os.path.join(settings.BASE_DIR, 'benchmark_results.json'))
+
+LARGE_PAGE_SIZE = 1000
+
+# Budgets are measured with the response cache off; list and retrieve are
+# then measured again with it on, where a hit must not touch the database.
+RESPONSE_CACHE_DISABLED = dict(settings.RESPONSE_CACHE, ENABLED=False)
+RESPONSE_CACHE_ENABLED = dict(settings.RESPONSE_CACHE, ENABLED=True)
+CACHED_BUDGET = Budget(queries=0, time_ms=50)
+
+# Results of every budget test in the run, rewritten to BENCHMARK_OUTPUT as
+# each test case finishes.
+RESULTS = []
+
+
+class EndpointBudgetMixin(object):
+    """
+    Exercise the router registered endpoints of `app_label` against a
+    seeded school, for mixing into a `TestCase`.
+
+    Every action must be declared in `budgets`. Going over a query budget
+    fails the test; going over a time budget is only reported, as
+    `over_time_budget` in the results written to `BENCHMARK_OUTPUT`, so a
+    slow CI machine does not fail the build.
+
+    `list` is also measured with `?page_size=LARGE_PAGE_SIZE`, with
+    `?count=none` and, for endpoints in `sparse_fields`, narrowed to those
+    fields, all against the same budget, so the query count of a list page
+    must not depend on its size. Tune the run with `BENCHMARK_STUDENTS`,
+    `BENCHMARK_REPEAT` and `BENCHMARK_TIME_FACTOR`.
+    """
+    app_label = None
+    budgets = {}
+    sparse_fields = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super(EndpointBudgetMixin, cls).setUpTestData()
+        cls.dataset = seed_dataset(students=BENCHMARK_STUDENTS)
+        cls.owner = cls.dataset['owner']
+
+    @classmethod
+    def tearDownClass(cls):
+        super(EndpointBudgetMixin, cls).tearDownClass()
+        write_results(
+            BENCHMARK_OUTPUT, RESULTS,
+            dataset={'students': BENCHMARK_STUDENTS},
+            time_factor=BENCHMARK_TIME_FACTOR)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(self.owner.token))
+        self.counter = 0
+
+    def get_endpoints(self):
+        return [
+            endpoint for endpoint in discover_endpoints()
+            if endpoint.viewset.queryset.model._meta.app_label ==
+            self.app_label
+        ]
+
+    def next_number(self):
+        self.counter += 1
+        return self.counter
+
+    def build_payload(self, model):
+        number = self.next_number()
+        if model is Student:
+            return {
+                'first_name': 'Bench',
+                'last_name': 'Student {}'.format(number),
+                'date_of_birth': '2008-05-17',
+                'admission_number': 'BEN{:06d}'.format(number),
+                'student_class': str(self.dataset['classes'][0].pk),
+                'subjects': [
+                    str(subject.pk) for subject in self.dataset['subjects']],
+            }
+        if model is Class:
+            return {
+                'name': 'Bench {}'.format(number),
+                'description': 'Benchmark class',
+                'class_teacher': str(self.dataset['teachers'][0].pk),
+            }
+        if model is Subject:
+            return {'name': 'Bench {}'.format(number), 'code': 'B{}'.format(
+                number)}
+        raise NotImplementedError(
+            'No payload for {}'.format(model.__name__))
+
+    def make_instance(self, model):
+        """A throwaway row for actions that modify or remove it."""
+        data = self.build_payload(model)
+        if model is Student:
+            student = Student.objects.create(
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                date_of_birth=datetime.date(2008, 5, 17),
+                student_class=self.dataset['classes'][0],
+                created_by=self.owner,
+            )
+            student.subjects.set(self.dataset['subjects'])
+            return student
+        if model is Class:
+            return Class.objects.create(
+                name=data['name'], created_by=self.owner)
+        return model.objects.create(created_by=self.owner, **data)
+
+    def detail_url(self, endpoint, instance):
+        return reverse(endpoint.name, kwargs={'pk': instance.pk})
+
+    def build_list_request(self, endpoint, model):
+        return 'get', reverse(endpoint.name), None, {}
+
+    def build_retrieve_request(self, endpoint, model):
+        instance = model.objects.first()
+        return 'get', self.detail_url(endpoint, instance), None, {}
+
+    def build_create_request(self, endpoint, model):
+        return 'post', reverse(endpoint.name), self.build_payload(model), {
+            'format': 'json'}
+
+    def build_update_request(self, endpoint, model):
+        instance = self.make_instance(model)
+        return 'put', self.detail_url(endpoint, instance), \
+            self.build_payload(model), {'format': 'json'}
+
+    def build_partial_update_request(self, endpoint, model):
+        instance = self.make_instance(model)
+        data = self.build_payload(model)
+        field = 'last_name' if 'last_name' in data else 'name'
+        return 'patch', self.detail_url(endpoint, instance), {
+            field: data[field]}, {'format': 'json'}
+
+    def build_destroy_request(self, endpoint, model):
+        instance = self.make_instance(model)
+        return 'delete', self.detail_url(endpoint, instance), None, {}
+
+    def build_export_request(self, endpoint, model):
+        return 'get', reverse(endpoint.name), None, {}
+
+    def build_bulk_request(self, endpoint, model):
+        roster = [self.build_payload(model) for _ in range(200)]
+        return 'post', reverse(endpoint.name), roster, {'format': 'json'}
+
+    def run_scenario(self, endpoint, action, repeat, params=None):
+        model = endpoint.viewset.queryset.model
+        builder = getattr(self, 'build_{}_request'.format(action))
+        method, url, data, extra = builder(endpoint, model)
+        if params:
+            data = dict(data or {}, **params)
+
+        response, result = measure(
+            self.client, method, url, data, repeat=repeat, **extra)
+        result.update({'endpoint': endpoint.name, 'action': action})
+        return response, result
+
+    def record(self, endpoint, scenario, response, result, budget,
+               status=None):
+        """
+        Keep `result` for the report and check the status and query count
+        of `response`, each scenario as a subtest of its own.
+        """
+        result.update({
+            'endpoint': endpoint,
+            'scenario': scenario,
+            'budget': budget._asdict(),
+            'over_time_budget': budget.over_time(
+                result, BENCHMARK_TIME_FACTOR),
+        })
+        RESULTS.append(result)
+
+        with self.subTest(endpoint=endpoint, scenario=scenario):
+            if status is None:
+                self.assertLess(response.status_code, 400)
+            else:
+                self.assertEqual(response.status_code, status)
+            self.assertFalse(budget.check(result))
+
+    def test_every_action_has_a_budget(self):
+        for endpoint in self.get_endpoints():
+            for action in set(endpoint.actions.values()):
+                self.assertIn((endpoint.name, action), self.budgets)
+
+    def test_query_budgets(self):
+        # Warm up the per-process caches so the first endpoint measured does
+        # not pay for them. Writes inside a test never commit, so nothing
+        # bumps generations: drop the rows another test case loaded.
+        self.client.get(reverse('user-list'))
+        for reference in get_reference_caches().values():
+            reference.invalidate()
+            reference.all()
+
+        with self.settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED):
+            for endpoint in self.get_endpoints():
+                for action in sorted(set(endpoint.actions.values())):
+                    budget = self.budgets.get((endpoint.name, action))
+                    if budget is not None:
+                        self.check_action(endpoint, action, budget)
+
+    def check_action(self, endpoint, action, budget):
+        read_only = action in ('list', 'retrieve')
+        scenarios = [(action, None)]
+        if action == 'list':
+            scenarios.append(('list:large', {'page_size': LARGE_PAGE_SIZE}))
+            scenarios.append(('list:uncounted', {'count': 'none'}))
+            if endpoint.name in self.sparse_fields:
+                scenarios.append((
+                    'list:sparse', {'fields': self.sparse_fields[
+                        endpoint.name]}))
+
+        for scenario, params in scenarios:
+            response, result = self.run_scenario(
+                endpoint, action,
+                repeat=BENCHMARK_REPEAT if read_only else 1, params=params)
+            self.record(
+                endpoint.name, scenario, response,
+                dict(result, action=action), budget)
+            if not read_only:
+                continue
+            url = result['url']
+
+            if response.has_header('ETag'):
+                # Replay with the validator; the 304 must fit the same
+                # budget.
+                response, result = measure(
+                    self.client, 'get', url, params, repeat=BENCHMARK_REPEAT,
+                    HTTP_IF_NONE_MATCH=response['ETag'])
+                self.record(
+                    endpoint.name, scenario + ':not-modified', response,
+                    dict(result, action=action), budget, status=304)
+
+            # Served from the response cache once primed.
+            with self.settings(RESPONSE_CACHE=RESPONSE_CACHE_ENABLED):
+                self.client.get(url, params)
+                response, result = measure(
+                    self.client, 'get', url, params, repeat=BENCHMARK_REPEAT)
+            self.record(
+                endpoint.name, scenario + ':cached', response,
+                dict(result, action=action), CACHED_BUDGET)
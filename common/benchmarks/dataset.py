@@ -0,0 +1,104 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from users.models import User
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+
+SUBJECTS = (
+    ('Mathematics', 'MAT'), ('English', 'ENG'), ('Kiswahili', 'KIS'),
+    ('Biology', 'BIO'), ('Chemistry', 'CHE'), ('Physics', 'PHY'),
+    ('History', 'HIS'), ('Geography', 'GEO'), ('Religious Education', 'CRE'),
+    ('Business Studies', 'BST'), ('Agriculture', 'AGR'), ('Computer', 'CMP'),
+)
+
+FIRST_NAMES = (
+    'Amani', 'Baraka', 'Chege', 'Dalia', 'Eshe', 'Faraji', 'Gathoni',
+    'Hamisi', 'Imani', 'Jabari', 'Kamau', 'Lulu', 'Makena', 'Njeri',
+    'Otieno', 'Pendo', 'Rehema', 'Sifa', 'Tumaini', 'Wanjiru', 'Zawadi',
+)
+
+LAST_NAMES = (
+    'Achieng', 'Barasa', 'Cheruiyot', 'Kiprop', 'Kariuki', 'Mutua',
+    'Njoroge', 'Odhiambo', 'Ochieng', 'Wafula', 'Wambui', 'Mwangi',
+)
+
+BATCH_SIZE = 500
+
+
+@transaction.atomic
+def seed_dataset(teachers=40, classes=40, students=2000,
+                 subjects_per_student=(6, 10), seed=0):
+    """
+    Create a school worth of teachers, classes, subjects and students.
+
+    The data is generated from `seed` so two runs with the same arguments
+    produce the same rows, and is written with `bulk_create` so thousands
+    of students take seconds rather than minutes.
+
+    Returns a dict of the created owner, teachers, classes and subjects.
+    """
+    rand = random.Random(seed)
+    password = make_password(None)
+
+    owner = User.objects.create_user(
+        'bench', 'Bench', phone_number='+254700000000',
+        email='bench@school.test', password='bench-pass')
+
+    teacher_objs = User.objects.bulk_create([
+        User(
+            username='t{}'.format(i),
+            first_name=rand.choice(FIRST_NAMES),
+            last_name=rand.choice(LAST_NAMES),
+            email='teacher{}@school.test'.format(i),
+            password=password,
+            gender=rand.choice('MF'),
+        ) for i in range(teachers)
+    ], batch_size=BATCH_SIZE)
+
+    class_objs = Class.objects.bulk_create([
+        Class(
+            name='Form {} {}'.format(i % 4 + 1, i),
+            description='Stream {} of form {}'.format(i, i % 4 + 1),
+            class_teacher=teacher_objs[i % len(teacher_objs)]
+            if teacher_objs else None,
+            created_by=owner,
+        ) for i in range(classes)
+    ], batch_size=BATCH_SIZE)
+
+    subject_objs = Subject.objects.bulk_create([
+        Subject(name=name, code=code, created_by=owner)
+        for name, code in SUBJECTS
+    ], batch_size=BATCH_SIZE)
+
+    student_objs = Student.objects.bulk_create([
+        Student(
+            first_name=rand.choice(FIRST_NAMES),
+            last_name=rand.choice(LAST_NAMES),
+            date_of_birth=datetime.date(2004, 1, 1) + datetime.timedelta(
+                days=rand.randint(0, 365 * 6)),
+            admission_number='ADM{:07d}'.format(i),
+            student_class=class_objs[i % len(class_objs)],
+            created_by=owner,
+        ) for i in range(students)
+    ], batch_size=BATCH_SIZE)
+
+    Enrollment = Student.subjects.through
+    low, high = subjects_per_student
+    Enrollment.objects.bulk_create([
+        Enrollment(student_id=student.pk, subject_id=subject.pk)
+        for student in student_objs
+        for subject in rand.sample(
+            subject_objs, min(rand.randint(low, high), len(subject_objs)))
+    ], batch_size=BATCH_SIZE)
+
+    return {
+        'owner': owner,
+        'teachers': teacher_objs,
+        'classes': class_objs,
+        'subjects': subject_objs,
+    }
@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+
+Endpoint = namedtuple('Endpoint', ('name', 'route', 'viewset', 'actions'))
+
+
+class Budget(namedtuple('Budget', ('queries', 'time_ms'))):
+    """
+    The most SQL queries and milliseconds (median over the measured runs)
+    an endpoint action may use. Query counts are exact and checked; times
+    depend on the machine and are only reported.
+    """
+
+    def check(self, result):
+        failures = []
+        if result['queries'] > self.queries:
+            failures.append('{} queries, budget is {}'.format(
+                result['queries'], self.queries))
+        return failures
+
+    def over_time(self, result, time_factor=1.0):
+        return result['time_ms'] > self.time_ms * time_factor
+
+
+def discover_endpoints(prefix='api/'):
+    """
+    Return an `Endpoint` for every router registered viewset route whose
+    path starts with `prefix`.
+    """
+    endpoints = []
+
+    def walk(patterns, route):
+        for pattern in patterns:
+            full_route = route + str(pattern.pattern)
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern.url_patterns, full_route)
+                continue
+
+            actions = getattr(pattern.callback, 'actions', None)
+            if actions is None or not full_route.startswith(prefix):
+                continue
+
+            endpoints.append(Endpoint(
+                name=pattern.name,
+                route=full_route,
+                viewset=pattern.callback.cls,
+                actions=dict(actions),
+            ))
+
+    walk(get_resolver().url_patterns, '')
+    return endpoints
+
+
+def measure(client, method, url, data=None, repeat=1, **extra):
+    """
+    Issue the request `repeat` times and return the response of the last
+    run along with its query count, median wall time and body size.
+    """
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data, **extra)
+            if getattr(response, 'streaming', False):
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            timings.append((time.perf_counter() - start) * 1000)
+
+    return response, {
+        'method': method.upper(),
+        'url': url,
+        'status': response.status_code,
+        'queries': len(queries),
+        'time_ms': round(statistics.median(timings), 3),
+        'max_time_ms': round(max(timings), 3),
+        'bytes': len(content),
+        'runs': repeat,
+    }
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, results, **meta):
+    """
+    Write `results` as JSON together with the revision and time of the run
+    so that files from different commits can be compared.
+    """
+    payload = {
+        'revision': get_revision(),
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+    }
+    payload.update(meta)
+    payload['results'] = results
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with open(path, 'w') as results_file:
+        json.dump(payload, results_file, indent=2, sort_keys=True)
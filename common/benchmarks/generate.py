@@ -0,0 +1,334 @@
+import datetime
+import io
+import multiprocessing
+import random
+import uuid
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import connection, connections, transaction
+
+from common.benchmarks.dataset import FIRST_NAMES, LAST_NAMES, SUBJECTS
+from common.utilities import normalize_phone_number
+from common.utilities.generations import bump_generation
+
+from users.models import User
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+
+DEFAULT_END = datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Rows of generated teachers can never log in.
+UNUSABLE_PASSWORD = UNUSABLE_PASSWORD_PREFIX + 'generated'
+
+OWNER_PHONE_NUMBER = '+254700000001'
+# Spelled as clients type them, logins find them by `phone_number_e164`.
+TEACHER_PHONE_NUMBER = '+254 71{:07d}'
+
+
+def make_uuid(rand, timestamp):
+    """
+    A `uuid7` for `timestamp` whose random bits come from `rand`, so ids are
+    repeatable and still sort by creation time.
+    """
+    return uuid.UUID(int=(
+        (int(timestamp.timestamp() * 1000) & ((1 << 48) - 1)) << 80 |
+        0x7 << 76 |
+        rand.getrandbits(12) << 64 |
+        0x2 << 62 |
+        rand.getrandbits(62)
+    ))
+
+
+def copy_value(value):
+    """A value in the text format of PostgreSQL's `COPY`."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n').replace('\r', '\\r')
+
+
+def get_columns(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.auto_created or not field.primary_key
+    ]
+
+
+def write_rows(model, rows):
+    """
+    Write `rows`, dicts keyed by attribute name, with `COPY` on PostgreSQL
+    and batched `INSERT`s elsewhere. Model `save()`, `bulk_create` and
+    signals are bypassed so the generated timestamps are kept as they are.
+    """
+    if not rows:
+        return
+    fields = get_columns(model)
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(
+                    copy_value(row[field.attname]) for field in fields))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.copy_expert('COPY {} ({}) FROM STDIN'.format(
+                table, columns), buffer)
+        else:
+            cursor.executemany(
+                'INSERT INTO {} ({}) VALUES ({})'.format(
+                    table, columns, ', '.join(['%s'] * len(fields))),
+                [[field.get_db_prep_save(row[field.attname], connection)
+                  for field in fields] for row in rows])
+
+
+class DatasetGenerator(object):
+    """
+    Fill an empty database with a district worth of teachers, classes,
+    subjects and students, and the students' subject enrollments.
+
+    Every row, ids included, is derived from `seed` so two runs with the
+    same arguments on an empty database write identical data. A run on a
+    database that already has rows continues their numbering, see
+    `get_offsets`, so it adds new rows rather than colliding with the ones
+    an earlier run with the same seed wrote. `created_at` is spread over the
+    `days` before `end`, `updated_at` falls between `created_at` and `end`
+    and a `deleted_ratio` share of rows is soft deleted.
+
+    Students are generated in chunks of `chunk_size`, each written in its own
+    transaction by one of `workers` processes.
+    """
+
+    def __init__(self, teachers=1000, classes=1000, subjects=12,
+                 students=100000, subjects_per_student=(6, 10),
+                 deleted_ratio=0.05, days=730, end=DEFAULT_END, seed=0,
+                 workers=1, chunk_size=50000):
+        self.teachers = teachers
+        self.classes = classes
+        self.subjects = subjects
+        self.students = students
+        self.subjects_per_student = subjects_per_student
+        self.deleted_ratio = deleted_ratio
+        self.days = days
+        self.end = end
+        self.seed = seed
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        self.offsets = {}
+        self.owner_id = None
+        self.teacher_ids = []
+        self.class_ids = []
+        self.subject_ids = []
+
+    def get_offsets(self):
+        """
+        The index the rows of each table start at: the number of rows the
+        table already has, soft deleted ones included. Usernames, phone
+        numbers, names and admission numbers are numbered from there and
+        the offset is part of the random seed, so ids differ too.
+        """
+        return {
+            table: model._base_manager.count()
+            for table, model in (
+                ('teachers', User), ('classes', Class),
+                ('subjects', Subject), ('students', Student))
+        }
+
+    def get_random(self, table, chunk=0):
+        return random.Random('{}:{}:{}:{}'.format(
+            self.seed, table, self.offsets.get(table, 0), chunk))
+
+    def base_row(self, rand, owner=True):
+        created_at = self.end - datetime.timedelta(
+            seconds=rand.uniform(0, self.days * 86400))
+        updated_at = created_at + (self.end - created_at) * rand.random()
+        deleted = rand.random() < self.deleted_ratio
+        row = {
+            'id': make_uuid(rand, created_at),
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'deleted_at': updated_at if deleted else None,
+            'is_deleted': deleted,
+            'is_active': not deleted,
+        }
+        if owner:
+            row['created_by_id'] = self.owner_id
+        return row
+
+    def create_owner(self):
+        owner = User.objects.filter(phone_number=OWNER_PHONE_NUMBER).first()
+        if owner is None:
+            owner = User.objects.create_user(
+                'generator', 'Generator', phone_number=OWNER_PHONE_NUMBER,
+                password=None)
+        self.owner_id = owner.pk
+
+    def teacher_rows(self):
+        rand = self.get_random('teachers')
+        offset = self.offsets.get('teachers', 0)
+        for i in range(offset, offset + self.teachers):
+            row = self.base_row(rand, owner=False)
+            phone_number = TEACHER_PHONE_NUMBER.format(i)
+            yield {
+                'id': row['id'],
+                'password': UNUSABLE_PASSWORD,
+                'last_login': None,
+                'first_name': rand.choice(FIRST_NAMES),
+                'last_name': rand.choice(LAST_NAMES),
+                'other_names': None,
+                'username': 't{}'.format(i),
+                'email': 'teacher{}@school.test'.format(i),
+                'phone_number': phone_number,
+                'phone_number_e164': normalize_phone_number(phone_number),
+                'gender': rand.choice('MF'),
+                'date_of_birth': None,
+                'is_staff': False,
+                'is_superuser': False,
+                'is_active': row['is_active'],
+                'is_deleted': row['is_deleted'],
+                'date_joined': row['created_at'],
+                'search_vector': None,
+            }
+
+    def class_rows(self):
+        rand = self.get_random('classes')
+        offset = self.offsets.get('classes', 0)
+        for i in range(offset, offset + self.classes):
+            row = self.base_row(rand)
+            row.update({
+                'name': 'Form {} {}'.format(i % 4 + 1, i),
+                'description': 'Stream {} of form {}'.format(i, i % 4 + 1),
+                'class_teacher_id': self.teacher_ids[i % len(
+                    self.teacher_ids)] if self.teacher_ids else None,
+            })
+            yield row
+
+    def subject_rows(self):
+        rand = self.get_random('subjects')
+        offset = self.offsets.get('subjects', 0)
+        for i in range(offset, offset + self.subjects):
+            name, code = SUBJECTS[i % len(SUBJECTS)]
+            suffix = '' if i < len(SUBJECTS) else str(i // len(SUBJECTS) + 1)
+            row = self.base_row(rand)
+            row.update({
+                'name': name + (' ' + suffix if suffix else ''),
+                'code': code + suffix,
+            })
+            yield row
+
+    def write_references(self):
+        """Teachers, classes and subjects, written by this process."""
+        for model, rows, ids in (
+                (User, self.teacher_rows, self.teacher_ids),
+                (Class, self.class_rows, self.class_ids),
+                (Subject, self.subject_rows, self.subject_ids)):
+            batch = []
+            with transaction.atomic():
+                for row in rows():
+                    ids.append(row['id'])
+                    batch.append(row)
+                    if len(batch) >= self.chunk_size:
+                        write_rows(model, batch)
+                        batch = []
+                write_rows(model, batch)
+
+    def write_students(self, chunk):
+        """Write chunk number `chunk` of students and their enrollments."""
+        rand = self.get_random('students', chunk)
+        start = chunk * self.chunk_size
+        stop = min(start + self.chunk_size, self.students)
+        offset = self.offsets.get('students', 0)
+        low, high = self.subjects_per_student
+        high = min(high, len(self.subject_ids))
+        low = min(low, high)
+
+        students, enrollments = [], []
+        for i in range(start, stop):
+            row = self.base_row(rand)
+            row.update({
+                'first_name': rand.choice(FIRST_NAMES),
+                'last_name': rand.choice(LAST_NAMES),
+                'date_of_birth': datetime.date(2004, 1, 1) + datetime.timedelta(
+                    days=rand.randint(0, 365 * 6)),
+                'admission_number': 'ADM{:08d}'.format(offset + i),
+                'student_class_id': self.class_ids[i % len(self.class_ids)],
+                'search_vector': None,
+            })
+            students.append(row)
+            enrollments.extend(
+                {'student_id': row['id'], 'subject_id': subject_id}
+                for subject_id in rand.sample(
+                    self.subject_ids, rand.randint(low, high)))
+
+        with transaction.atomic():
+            write_rows(Student, students)
+            write_rows(Student.subjects.through, enrollments)
+        return len(students), len(enrollments)
+
+    def get_chunks(self):
+        return range(-(-self.students // self.chunk_size))
+
+    def run(self, progress=None):
+        """
+        Generate everything and return the number of rows written per table.
+        `progress(done, students, enrollments)` is called as each chunk of
+        students finishes, `done` counting the chunks finished so far.
+        """
+        self.offsets = self.get_offsets()
+        self.create_owner()
+        self.write_references()
+        counts = {
+            'teachers': self.teachers,
+            'classes': self.classes,
+            'subjects': self.subjects,
+            'students': 0,
+            'enrollments': 0,
+        }
+
+        chunks = self.get_chunks()
+        if self.workers > 1 and connection.vendor != 'sqlite' and \
+                len(chunks) > 1:
+            # Children must open their own connections.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(self.workers, initializer=_set_generator,
+                              initargs=(self,)) as pool:
+                results = pool.imap_unordered(_write_students, chunks)
+                for done, (students, enrollments) in enumerate(results, 1):
+                    counts['students'] += students
+                    counts['enrollments'] += enrollments
+                    if progress:
+                        progress(done, students, enrollments)
+        else:
+            for chunk in chunks:
+                students, enrollments = self.write_students(chunk)
+                counts['students'] += students
+                counts['enrollments'] += enrollments
+                if progress:
+                    progress(chunk + 1, students, enrollments)
+
+        # Rows were written behind the ORM's back.
+        for model in (User, Class, Subject, Student):
+            bump_generation(model)
+        return counts
+
+
+_generator = None
+
+
+def _set_generator(generator):
+    global _generator
+    _generator = generator
+
+
+def _write_students(chunk):
+    return _generator.write_students(chunk)
@@ -0,0 +1,387 @@
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connections
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+
+Result = namedtuple('Result', ('endpoint', 'status', 'time_ms'))
+
+# Relative weights of the scenarios in the traffic mix.
+DEFAULT_MIX = {
+    'login': 5,
+    'me': 15,
+    'student-list': 30,
+    'student-detail': 25,
+    'student-create': 10,
+    'student-update': 15,
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer(object):
+    """
+    The project's WSGI application on a threaded server in a forked child
+    process, so the server does not share an interpreter lock with the
+    client measuring it.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = ThreadedWSGIServer((host, port), QuietWSGIRequestHandler)
+        self.server.set_app(get_internal_wsgi_application())
+        self.process = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def __enter__(self):
+        # The child must open its own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.process = context.Process(target=self.server.serve_forever)
+        self.process.daemon = True
+        self.process.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.join()
+        self.server.server_close()
+
+
+class HTTPConnection(object):
+    """
+    A minimal keep-alive HTTP/1.1 client on asyncio streams, enough for JSON
+    APIs: `Content-Length` and chunked bodies, reconnecting when the server
+    closes the connection.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, data=None, headers=None):
+        for attempt in range(2):
+            if self.writer is None:
+                await self.connect()
+            try:
+                return await self.send(method, path, data, headers or {})
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server may close an idle keep-alive connection.
+                self.close()
+                if attempt:
+                    raise
+
+    async def send(self, method, path, data, headers):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        lines = [
+            '{} {} HTTP/1.1'.format(method, path),
+            'Host: {}:{}'.format(self.host, self.port),
+            'Accept: application/json',
+            'Content-Length: {}'.format(len(body)),
+        ]
+        if data is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend('{}: {}'.format(*header) for header in headers.items())
+        self.writer.write(
+            ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed by the server')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding') == 'chunked':
+            content = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                content += await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(
+                int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            self.close()
+
+        if version == 'HTTP/1.0' or \
+                response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status), response_headers, content
+
+
+class VirtualUser(object):
+    """
+    One client replaying the traffic mix over its own connection, logged
+    in with the harness credentials.
+    """
+
+    def __init__(self, harness, rand):
+        self.harness = harness
+        self.rand = rand
+        split = urlsplit(harness.url)
+        self.connection = HTTPConnection(split.hostname, split.port or 80)
+        self.token = None
+        self.students = []
+
+    async def call(self, endpoint, method, path, data=None):
+        headers = {}
+        if self.token:
+            headers['Authorization'] = 'Bearer {}'.format(self.token)
+        started = time.perf_counter()
+        try:
+            status, _, content = await self.connection.request(
+                method, path, data, headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, content = 0, b''
+        self.harness.record(Result(
+            endpoint, status, (time.perf_counter() - started) * 1000))
+        if status and content:
+            try:
+                return status, json.loads(content.decode('utf-8'))
+            except ValueError:
+                pass
+        return status, None
+
+    async def login(self):
+        status, body = await self.call(
+            'login', 'POST', '/api/auth/login/', {
+                'phone_number': self.harness.phone_number,
+                'password': self.harness.password,
+            })
+        if status == 200 and body:
+            self.token = body.get('token') or self.token
+
+    async def me(self):
+        await self.call('me', 'GET', '/api/auth/me/')
+
+    async def student_list(self):
+        params = self.rand.choice([
+            {},
+            {'student_class': self.rand.choice(self.harness.class_ids)},
+            {'subjects': self.rand.choice(self.harness.subject_ids)},
+            {'q': self.rand.choice(self.harness.search_terms)},
+            {'ordering': 'last_name'},
+            {'page': self.rand.randint(1, 5)},
+            {'pagination': 'cursor'},
+        ])
+        path = '/api/students/'
+        if params:
+            path += '?' + urlencode(params)
+        status, body = await self.call('student-list', 'GET', path)
+        if status == 200 and body and 'results' in body:
+            self.students = [
+                row['id'] for row in body['results'] if 'id' in row
+            ] or self.students
+
+    async def student_detail(self):
+        if not self.students:
+            return await self.student_list()
+        await self.call('student-detail', 'GET', '/api/students/{}/'.format(
+            self.rand.choice(self.students)))
+
+    def student_payload(self):
+        number = self.rand.getrandbits(40)
+        return {
+            'first_name': 'Load',
+            'last_name': 'Test {}'.format(number),
+            'date_of_birth': '2008-05-17',
+            'admission_number': 'LT{:012d}'.format(number),
+            'student_class': self.rand.choice(self.harness.class_ids),
+            'subjects': self.rand.sample(
+                self.harness.subject_ids,
+                min(6, len(self.harness.subject_ids))),
+        }
+
+    async def student_create(self):
+        status, body = await self.call(
+            'student-create', 'POST', '/api/students/',
+            self.student_payload())
+        if status == 201 and body and 'id' in body:
+            self.students.append(body['id'])
+
+    async def student_update(self):
+        if not self.students:
+            return await self.student_create()
+        await self.call(
+            'student-update', 'PATCH', '/api/students/{}/'.format(
+                self.rand.choice(self.students)),
+            {'last_name': 'Updated {}'.format(self.rand.getrandbits(20))})
+
+    async def run(self):
+        scenarios, weights = zip(*sorted(self.harness.mix.items()))
+        await self.login()
+        while self.harness.has_budget():
+            scenario = self.rand.choices(scenarios, weights)[0]
+            await getattr(self, scenario.replace('-', '_'))()
+        self.connection.close()
+
+
+class LoadTest(object):
+    """
+    Drive the API with `concurrency` virtual users for `duration` seconds,
+    or until `requests` requests have been made, and summarise latency,
+    throughput and error rate per endpoint.
+
+    Virtual users log in with `phone_number`/`password` and pick classes and
+    subjects for filters and new students from `class_ids`/`subject_ids`.
+    """
+
+    def __init__(self, url, phone_number, password, class_ids, subject_ids,
+                 concurrency=10, duration=30, requests=None, mix=None,
+                 seed=0):
+        self.url = url.rstrip('/')
+        self.phone_number = phone_number
+        self.password = password
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.mix = mix or DEFAULT_MIX
+        self.seed = seed
+        self.results = []
+        self.class_ids = [str(pk) for pk in class_ids]
+        self.subject_ids = [str(pk) for pk in subject_ids]
+        self.search_terms = ['ama', 'wan', 'kip', 'ach', 'mut']
+        self.deadline = None
+        self.started = 0
+
+    def record(self, result):
+        self.results.append(result)
+
+    def has_budget(self):
+        if self.requests is not None and self.started >= self.requests:
+            return False
+        if time.perf_counter() >= self.deadline:
+            return False
+        self.started += 1
+        return True
+
+    async def prepare(self):
+        user = VirtualUser(self, random.Random(self.seed))
+        await user.login()
+        user.connection.close()
+        if not user.token:
+            raise RuntimeError('Could not log in as {}'.format(
+                self.phone_number))
+        if not self.class_ids or not self.subject_ids:
+            raise RuntimeError(
+                'The load test needs at least one class and one subject.')
+        self.results = []
+
+    async def run_users(self):
+        await self.prepare()
+        self.deadline = time.perf_counter() + self.duration
+        users = [
+            VirtualUser(self, random.Random('{}:{}'.format(self.seed, i)))
+            for i in range(self.concurrency)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run() for user in users))
+        return time.perf_counter() - started
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            elapsed = loop.run_until_complete(self.run_users())
+        finally:
+            loop.close()
+        return summarise(self.results, elapsed)
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(int(math.ceil(percent / 100.0 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+def summarise(results, elapsed):
+    by_endpoint = {}
+    for result in results:
+        by_endpoint.setdefault(result.endpoint, []).append(result)
+    by_endpoint['all'] = list(results)
+
+    summary = {}
+    for endpoint, items in sorted(by_endpoint.items()):
+        timings = sorted(item.time_ms for item in items)
+        errors = sum(1 for item in items if not item.status or
+                     item.status >= 400)
+        entry = {
+            'requests': len(items),
+            'errors': errors,
+            'error_rate': round(errors / len(items), 4) if items else 0,
+            'throughput_rps': round(len(items) / elapsed, 2)
+            if elapsed else 0,
+            'statuses': {},
+        }
+        for item in items:
+            status = str(item.status)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+        for percent in PERCENTILES:
+            value = percentile(timings, percent)
+            entry['p{}_ms'.format(percent)] = round(value, 3) \
+                if value is not None else None
+        summary[endpoint] = entry
+    return {'elapsed_s': round(elapsed, 3), 'endpoints': summary}
+
+
+def compare(summary, baseline, tolerance=0.2):
+    """
+    Regressions of `summary` against a saved `baseline`: any endpoint whose
+    p95 latency grew, or whose error rate rose, by more than `tolerance`.
+    """
+    regressions = []
+    previous = baseline.get('results', baseline).get('endpoints', {})
+    for endpoint, current in sorted(summary['endpoints'].items()):
+        before = previous.get(endpoint)
+        if not before:
+            continue
+        if before.get('p95_ms') and current['p95_ms'] > \
+                before['p95_ms'] * (1 + tolerance):
+            regressions.append('{}: p95 {:.1f}ms, baseline {:.1f}ms'.format(
+                endpoint, current['p95_ms'], before['p95_ms']))
+        if current['error_rate'] > before.get('error_rate', 0) + tolerance / 10:
+            regressions.append('{}: error rate {:.2%}, baseline {:.2%}'.format(
+                endpoint, current['error_rate'], before.get('error_rate', 0)))
+    return regressions
@@ -0,0 +1,73 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.benchmarks.endpoints import write_results
+from common.utilities.helpers import (
+    PHONE_NUMBER_CACHE_SIZE,
+    normalize_phone_number,
+)
+
+PATHS = {
+    # Every call parses with phonenumbers, as validation used to.
+    'parse': normalize_phone_number.__wrapped__,
+    'memoized': normalize_phone_number,
+}
+
+
+def get_phone_numbers(count):
+    """`count` distinct valid numbers in the spellings clients send."""
+    spellings = ('+2547{:08d}', '2547{:08d}', '+254 7{:08d}')
+    return [
+        spellings[number % len(spellings)].format(number)
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the cost of validating and normalizing phone numbers with '
+        'a parse on every call and through the memoized helper, for a set '
+        'of numbers that comes back again and again like logins do.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--numbers', type=int, default=1000,
+            help='Distinct numbers, the memo keeps {}.'.format(
+                PHONE_NUMBER_CACHE_SIZE))
+        parser.add_argument('--calls', type=int, default=100000)
+        parser.add_argument(
+            '--output', help='Write the results to this file as JSON.')
+
+    def handle(self, *args, **options):
+        phone_numbers = get_phone_numbers(options['numbers'])
+        results = []
+        for path, normalize in sorted(PATHS.items(), reverse=True):
+            normalize_phone_number.cache_clear()
+            result = self.measure(normalize, phone_numbers, options['calls'])
+            result['path'] = path
+            results.append(result)
+            self.stdout.write(
+                '{path:>8}: {calls:>7} calls {time_ms:>9.1f}ms '
+                '{us_per_call:>8.2f}us/call {calls_per_second:>10.0f} calls/s'
+                .format(**result))
+
+        if options['output']:
+            write_results(
+                options['output'], results, numbers=options['numbers'],
+                calls=options['calls'])
+
+    def measure(self, normalize, phone_numbers, calls):
+        sample = itertools.islice(itertools.cycle(phone_numbers), calls)
+        start = time.perf_counter()
+        for phone_number in sample:
+            normalize(phone_number)
+        elapsed = time.perf_counter() - start
+        return {
+            'calls': calls,
+            'time_ms': round(elapsed * 1000, 3),
+            'us_per_call': elapsed * 1000000 / calls if calls else 0,
+            'calls_per_second': calls / elapsed if elapsed else 0,
+        }
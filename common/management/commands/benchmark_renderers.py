@@ -0,0 +1,138 @@
+import datetime
+import random
+import statistics
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+
+from common.benchmarks.dataset import FIRST_NAMES, LAST_NAMES, SUBJECTS
+from common.benchmarks.endpoints import write_results
+from common.utilities.renderers import (
+    ORJSON,
+    STDLIB,
+    FastJSONRenderer,
+    orjson,
+)
+
+
+def make_page(rows, native, seed=0):
+    """
+    A list page shaped like `StudentInlineSerializer` output. With `native`
+    ids and dates are left as UUIDs and dates for the renderer to encode.
+    """
+    rand = random.Random(seed)
+
+    def value(obj):
+        return obj if native else str(obj)
+
+    teacher = OrderedDict([
+        ('id', value(uuid.UUID(int=rand.getrandbits(128)))),
+        ('full_name', 'Grace Wanjiru'),
+        ('username', 'gwanjiru'),
+        ('gender', 'F'),
+    ])
+    subjects = [
+        OrderedDict([
+            ('id', value(uuid.UUID(int=rand.getrandbits(128)))),
+            ('name', name),
+            ('code', code),
+        ])
+        for name, code in SUBJECTS[:8]
+    ]
+    results = []
+    for i in range(rows):
+        born = datetime.date(2004, 1, 1) + datetime.timedelta(
+            days=rand.randint(0, 2000))
+        results.append(OrderedDict([
+            ('id', value(uuid.UUID(int=rand.getrandbits(128)))),
+            ('first_name', rand.choice(FIRST_NAMES)),
+            ('last_name', rand.choice(LAST_NAMES)),
+            ('date_of_birth', born if native else born.isoformat()),
+            ('admission_number', 'ADM{:08d}'.format(i)),
+            ('student_class', OrderedDict([
+                ('name', 'Form 4 East'),
+                ('description', None),
+                ('class_teacher', teacher),
+            ])),
+            ('subjects', subjects),
+        ]))
+    return OrderedDict([
+        ('count', rows),
+        ('next', None),
+        ('previous', None),
+        ('page_size', rows),
+        ('current_page', 1),
+        ('total_pages', 1),
+        ('start_index', 1),
+        ('end_index', rows),
+        ('results', results),
+    ])
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering a large list page with DRF\'s JSONRenderer and '
+        'FastJSONRenderer on each available encoder, checking they write '
+        'the same bytes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=15000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--output', help='Write the results to this file as JSON.')
+
+    def get_renderers(self):
+        renderers = [('drf', JSONRenderer())]
+        for encoder in (STDLIB, ORJSON):
+            if encoder == ORJSON and orjson is None:
+                self.stdout.write('orjson is not installed, skipping it.')
+                continue
+            renderer = FastJSONRenderer()
+            renderer.encoder = encoder
+            renderers.append(('fast-{}'.format(encoder), renderer))
+        return renderers
+
+    def handle(self, *args, **options):
+        results = []
+        for payload in ('serialized', 'native'):
+            page = make_page(options['rows'], native=payload == 'native')
+            expected = None
+            for name, renderer in self.get_renderers():
+                result, content = self.measure(
+                    renderer, page, options['repeat'])
+                if expected is None:
+                    expected = content
+                result.update({
+                    'payload': payload,
+                    'renderer': name,
+                    'same_output': content == expected,
+                })
+                results.append(result)
+                self.stdout.write(
+                    '{payload:>10} {renderer:>12}: {time_ms:>8.2f}ms '
+                    '{megabytes_per_second:>8.1f} MB/s  same output: '
+                    '{same_output}'.format(**result))
+
+        if options['output']:
+            write_results(
+                options['output'], results, rows=options['rows'],
+                repeat=options['repeat'])
+
+    def measure(self, renderer, page, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = renderer.render(page, 'application/json')
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        return {
+            'bytes': len(content),
+            'time_ms': round(median * 1000, 3),
+            'megabytes_per_second': len(content) / median / 1e6
+            if median else 0,
+        }, content
@@ -0,0 +1,118 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from common.benchmarks.endpoints import write_results
+from common.utilities.prefetch import (
+    apply_related_lookups,
+    get_related_lookups,
+)
+from common.utilities.values import get_reader
+
+from classes.models import Class
+from classes.serializers import ClassInlineSerializer
+from students.models import Student
+from students.serializers import StudentInlineSerializer
+
+TARGETS = {
+    'students': (Student, StudentInlineSerializer),
+    'classes': (Class, ClassInlineSerializer),
+}
+
+
+def serialize_instances(model, serializer_class, rows):
+    serializer = serializer_class()
+    queryset = apply_related_lookups(
+        model.objects.all(), get_related_lookups(serializer, model))
+    return serializer_class(list(queryset[:rows]), many=True).data
+
+
+def serialize_values(model, serializer_class, rows):
+    reader = get_reader(serializer_class(), model)
+    return reader.represent(list(reader.get_queryset(
+        model.objects.all())[:rows]))
+
+
+PATHS = {
+    'instances': serialize_instances,
+    'values': serialize_values,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare list serialization through model instances and the '
+        'serializer with the values() read path: rows per second and peak '
+        'memory for a page of existing rows, checking both give the same '
+        'output.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=15000,
+            help='Rows per page, the largest page size is 15000.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--target', choices=sorted(TARGETS), action='append',
+            help='Lists to measure, all by default.')
+        parser.add_argument(
+            '--output', help='Write the results to this file as JSON.')
+
+    def handle(self, *args, **options):
+        results = []
+        for target in options['target'] or sorted(TARGETS):
+            model, serializer_class = TARGETS[target]
+            if not model.objects.exists():
+                raise CommandError(
+                    'No {} to serialize, see generate_dataset.'.format(
+                        target))
+
+            outputs = {}
+            for path, serialize in sorted(PATHS.items()):
+                result, outputs[path] = self.measure(
+                    serialize, model, serializer_class, options['rows'],
+                    options['repeat'])
+                result.update({'target': target, 'path': path})
+                results.append(result)
+                self.stdout.write(
+                    '{target:>8} {path:>9}: {rows:>6} rows '
+                    '{time_ms:>9.1f}ms {rows_per_second:>10.0f} rows/s '
+                    'peak {peak_bytes:>12,} B'.format(**result))
+
+            if outputs['instances'] != outputs['values']:
+                raise CommandError(
+                    'The values() path renders {} differently.'.format(
+                        target))
+
+        if options['output']:
+            write_results(
+                options['output'], results, rows=options['rows'],
+                repeat=options['repeat'])
+
+    def measure(self, serialize, model, serializer_class, rows, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = serialize(model, serializer_class, rows)
+            timings.append(time.perf_counter() - start)
+
+        # Memory is traced on a separate run, tracing slows everything down.
+        tracemalloc.start()
+        try:
+            serialize(model, serializer_class, rows)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        median = statistics.median(timings)
+        return {
+            'rows': len(data),
+            'time_ms': round(median * 1000, 3),
+            'rows_per_second': len(data) / median if median else 0,
+            'peak_bytes': peak,
+        }, json.dumps(data, cls=JSONEncoder)
@@ -0,0 +1,105 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from common.utilities import uuid7
+
+from students.models import Student
+
+SCHEMES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare insert throughput and index size of random (uuid4) and '
+        'time-ordered (uuid7) primary keys on a copy of the students table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--output', help='Write the results to this file as JSON.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Index sizes are read from PostgreSQL, found {}.'.format(
+                    connection.vendor))
+
+        results = [
+            self.run_scheme(name, generate, options['rows'],
+                            options['batch_size'])
+            for name, generate in sorted(SCHEMES.items())
+        ]
+
+        for result in results:
+            self.stdout.write(
+                '{scheme:>6}: {rows_per_second:>10.0f} rows/s  '
+                'pkey {pkey_bytes:>12,} B  all indexes {index_bytes:>12,} B'
+                .format(**result))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def run_scheme(self, name, generate, rows, batch_size):
+        source = Student._meta.db_table
+        table = 'benchmark_{}_{}'.format(source, name)
+        # A class id per form stream, like a real school.
+        class_ids = [str(uuid.uuid4()) for _ in range(40)]
+        owner_id = str(uuid.uuid4())
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(table))
+            # Same columns and indexes as the students table, no foreign
+            # keys so the copy can be filled without parents.
+            cursor.execute(
+                'CREATE UNLOGGED TABLE {} (LIKE {} INCLUDING DEFAULTS '
+                'INCLUDING INDEXES)'.format(table, source))
+
+            columns = (
+                'id', 'first_name', 'last_name', 'date_of_birth',
+                'admission_number', 'student_class_id', 'created_by_id',
+                'created_at', 'updated_at', 'deleted_at', 'is_deleted',
+                'is_active',
+            )
+            statement = 'INSERT INTO {} ({}) VALUES {}'.format(
+                table, ', '.join(columns),
+                ', '.join(['(%s, %s, %s, %s, %s, %s, %s, now(), now(), '
+                           'NULL, false, true)'] * batch_size))
+
+            start = time.perf_counter()
+            inserted = 0
+            while inserted < rows:
+                params = []
+                for number in range(inserted, inserted + batch_size):
+                    params.extend((
+                        str(generate()), 'First', 'Last', '2010-01-01',
+                        'ADM{:09d}'.format(number),
+                        class_ids[number % len(class_ids)], owner_id,
+                    ))
+                cursor.execute(statement, params)
+                inserted += batch_size
+            elapsed = time.perf_counter() - start
+
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_indexes_size(%s)",
+                ['{}_pkey'.format(table), table])
+            pkey_bytes, index_bytes = cursor.fetchone()
+            cursor.execute('DROP TABLE {}'.format(table))
+
+        return {
+            'scheme': name,
+            'rows': inserted,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': inserted / elapsed,
+            'pkey_bytes': pkey_bytes,
+            'index_bytes': index_bytes,
+        }
@@ -0,0 +1,94 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+
+PAGE_SIZE = 25
+
+INDEX_PATTERN = re.compile(
+    r'(?:Index|Index Only|Bitmap Index) Scan (?:Backward )?using (\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN on the main list queries and show which indexes they '
+        'use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Execute the queries and report actual timings.')
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan of every query.')
+        parser.add_argument(
+            '--student',
+            help='Id of the student whose values fill in the filters, the '
+                 'first by id by default.')
+
+    def get_student(self, pk=None):
+        if pk is None:
+            return Student.objects.order_by('pk').first()
+        try:
+            return Student.objects.get(pk=pk)
+        except (Student.DoesNotExist, ValueError, ValidationError):
+            raise CommandError('No student with id {}.'.format(pk))
+
+    def get_queries(self, student):
+        student_class = getattr(student, 'student_class_id', None)
+        admission_number = getattr(student, 'admission_number', None) or 'x'
+        first_name = getattr(student, 'first_name', None) or 'x'
+        last_name = getattr(student, 'last_name', None) or 'x'
+
+        return (
+            ('students: list page', Student.objects.all()[:PAGE_SIZE]),
+            ('students: deep page', Student.objects.all()[
+                PAGE_SIZE * 400:PAGE_SIZE * 401]),
+            ('students: count', Student.objects.all()),
+            ('students: by class', Student.objects.filter(
+                student_class=student_class)[:PAGE_SIZE]),
+            ('students: by admission number', Student.objects.filter(
+                admission_number=admission_number)[:PAGE_SIZE]),
+            ('students: by first name', Student.objects.filter(
+                first_name__iexact=first_name)[:PAGE_SIZE]),
+            ('students: by last name', Student.objects.filter(
+                last_name__iexact=last_name)[:PAGE_SIZE]),
+            ('classes: list page', Class.objects.all()[:PAGE_SIZE]),
+            ('subjects: list page', Subject.objects.all()[:PAGE_SIZE]),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'The indexes are PostgreSQL specific, found {}.'.format(
+                    connection.vendor))
+
+        student = self.get_student(options['student'])
+        for label, queryset in self.get_queries(student):
+            if label.endswith(': count'):
+                plan = self.explain_count(queryset, options['analyze'])
+            else:
+                plan = queryset.explain(analyze=options['analyze'])
+
+            indexes = sorted(set(INDEX_PATTERN.findall(plan)))
+            summary = ', '.join(indexes) if indexes else 'no index (seq scan)'
+            self.stdout.write('{:<32} {}'.format(label, summary))
+
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+                self.stdout.write('')
+
+    def explain_count(self, queryset, analyze):
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        prefix = 'EXPLAIN ANALYZE' if analyze else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                '{} SELECT COUNT(*) FROM ({}) subquery'.format(prefix, sql),
+                params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
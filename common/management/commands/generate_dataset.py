@@ -0,0 +1,97 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from common.benchmarks.generate import DEFAULT_END, DatasetGenerator
+
+from students.models import Student
+
+
+def parse_range(value):
+    low, _, high = value.partition(',')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise CommandError('Expected a range such as 6,10, got {}'.format(
+            value))
+    return low, high
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill an empty database with generated teachers, classes, subjects '
+        'and students for load testing. Runs with the same arguments on an '
+        'empty database write the same rows; a run with --force continues '
+        'the numbering of the rows already there.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=1000)
+        parser.add_argument('--classes', type=int, default=1000)
+        parser.add_argument('--subjects', type=int, default=12)
+        parser.add_argument('--students', type=int, default=100000)
+        parser.add_argument(
+            '--subjects-per-student', type=parse_range, default=(6, 10),
+            help='Enrollments per student as MIN,MAX.')
+        parser.add_argument(
+            '--deleted-ratio', type=float, default=0.05,
+            help='Share of rows that are soft deleted.')
+        parser.add_argument(
+            '--days', type=int, default=730,
+            help='Spread creation times over this many days before --end.')
+        parser.add_argument(
+            '--end', default=DEFAULT_END.date().isoformat(),
+            help='Latest timestamp of the generated rows, as YYYY-MM-DD.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Processes writing students. SQLite always uses one.')
+        parser.add_argument('--chunk-size', type=int, default=50000)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Add to a database that already has students. New rows '
+                 'are numbered after the existing ones, whatever the seed.')
+
+    def handle(self, *args, **options):
+        if Student.all_objects.exists() and not options['force']:
+            raise CommandError(
+                'The database already has students, pass --force to add '
+                'more.')
+
+        end = parse_date(options['end'])
+        if end is None:
+            raise CommandError('--end must be a date, got {}'.format(
+                options['end']))
+
+        generator = DatasetGenerator(
+            teachers=options['teachers'],
+            classes=options['classes'],
+            subjects=options['subjects'],
+            students=options['students'],
+            subjects_per_student=options['subjects_per_student'],
+            deleted_ratio=options['deleted_ratio'],
+            days=options['days'],
+            end=DEFAULT_END.replace(
+                year=end.year, month=end.month, day=end.day),
+            seed=options['seed'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        total_chunks = len(generator.get_chunks())
+
+        def progress(done, students, enrollments):
+            self.stdout.write('chunk {}/{}: {} students, {} enrollments'.format(
+                done, total_chunks, students, enrollments))
+
+        started = time.perf_counter()
+        counts = generator.run(progress=progress)
+        elapsed = time.perf_counter() - started
+
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote {:,} rows in {:.1f}s ({:,.0f} rows/s): {}'.format(
+                rows, elapsed, rows / elapsed if elapsed else 0,
+                ', '.join('{} {:,}'.format(name, count)
+                          for name, count in counts.items()))))
@@ -0,0 +1,175 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from common.benchmarks.endpoints import write_results
+from common.benchmarks.loadtest import (
+    DEFAULT_MIX,
+    LoadTest,
+    LocalServer,
+    compare,
+)
+from common.utilities import normalize_phone_number
+
+from classes.models import Class
+from subjects.models import Subject
+from users.models import User
+
+USERNAME = 'loadtest'
+DEFAULT_PHONE_NUMBER = '+254700000002'
+DEFAULT_PASSWORD = 'loadtest-pass'
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise CommandError('Unknown scenario {}, choose from {}'.format(
+                name, ', '.join(sorted(DEFAULT_MIX))))
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError('Expected SCENARIO=WEIGHT, got {}'.format(part))
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a mix of API traffic (login, me, student lists, reads, '
+        'creates and updates) against a local or given server and report '
+        'throughput, latency percentiles and error rates per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Server to test. By default one is started locally.')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Seconds to run for.')
+        parser.add_argument(
+            '--requests', type=int,
+            help='Stop after this many requests.')
+        parser.add_argument(
+            '--mix', type=parse_mix,
+            help='Scenario weights, e.g. me=10,student-list=30. Defaults to '
+                 '{}.'.format(','.join(
+                     '{}={}'.format(*item) for item in sorted(
+                         DEFAULT_MIX.items()))))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--phone-number', default=DEFAULT_PHONE_NUMBER)
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument(
+            '--reset-user', action='store_true',
+            help='Give an existing {} user the phone number and password '
+                 'above and reactivate it.'.format(USERNAME))
+        parser.add_argument(
+            '--output',
+            default=os.path.join(settings.BASE_DIR, 'loadtest_results.json'),
+            help='Write the results to this file as JSON.')
+        parser.add_argument(
+            '--baseline',
+            help='Fail when results regress against this earlier output.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed p95 growth against the baseline, as a fraction.')
+
+    def get_user(self, phone_number, password, reset=False):
+        """
+        The `loadtest` user the virtual users log in as, created when
+        missing. An existing one is used as it is and must be able to log in
+        with `phone_number` and `password`; with `reset` it is given them
+        and reactivated instead.
+        """
+        e164 = normalize_phone_number(phone_number)
+        if e164 is None:
+            raise CommandError('{} is not a valid phone number.'.format(
+                phone_number))
+
+        user = User.objects.filter(username=USERNAME).first()
+        if user is not None and not reset:
+            if user.is_deleted or not user.is_active or \
+                    user.phone_number_e164 != e164 or \
+                    not user.check_password(password):
+                raise CommandError(
+                    'The {} user cannot log in with {} and that password. '
+                    'Pass --reset-user to set them, which changes that user '
+                    'in the database being tested.'.format(
+                        USERNAME, phone_number))
+            return user
+
+        if User.objects.filter(phone_number_e164=e164).exclude(
+                username=USERNAME).exists():
+            raise CommandError(
+                '{} belongs to another user, pass a free --phone-number.'
+                .format(phone_number))
+        if user is None:
+            return User.objects.create_user(
+                USERNAME, 'Load', phone_number=phone_number,
+                password=password)
+        user.phone_number = phone_number
+        user.is_active = True
+        user.is_deleted = False
+        user.set_password(password)
+        user.save()
+        return user
+
+    def handle(self, *args, **options):
+        class_ids = list(Class.objects.values_list('pk', flat=True)[:100])
+        subject_ids = list(Subject.objects.values_list('pk', flat=True)[:100])
+        if not class_ids or not subject_ids:
+            raise CommandError(
+                'The load test needs classes and subjects, see '
+                'generate_dataset.')
+        self.get_user(
+            options['phone_number'], options['password'],
+            reset=options['reset_user'])
+
+        def run(url):
+            return LoadTest(
+                url, options['phone_number'], options['password'],
+                class_ids, subject_ids,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                requests=options['requests'],
+                mix=options['mix'],
+                seed=options['seed'],
+            ).run()
+
+        if options['url']:
+            summary = run(options['url'])
+        else:
+            with LocalServer() as server:
+                summary = run(server.url)
+
+        self.report(summary)
+        write_results(
+            options['output'], summary,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            seed=options['seed'])
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare(summary, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Regressions against {}:\n{}'.format(
+                        options['baseline'], '\n'.join(regressions)))
+            self.stdout.write(self.style.SUCCESS(
+                'No regressions against {}'.format(options['baseline'])))
+
+    def report(self, summary):
+        self.stdout.write('{:<16} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9}'.format(
+            'endpoint', 'requests', 'rps', 'errors', 'p50 ms', 'p95 ms',
+            'p99 ms'))
+        for endpoint, entry in sorted(summary['endpoints'].items()):
+            self.stdout.write(
+                '{:<16} {requests:>8} {throughput_rps:>8.1f} '
+                '{error_rate:>9.2%} {p50_ms:>9.1f} {p95_ms:>9.1f} '
+                '{p99_ms:>9.1f}'.format(endpoint, **entry))
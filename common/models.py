@@ -1,5 +1,3 @@
-import uuid
-
 from django.db import models
 from django.db.models.query import QuerySet
 from django.utils import timezone
@@ -7,12 +5,29 @@ from django.conf import settings
 
 from common.utilities import (
 	GENDER_CHOICES,
+	uuid7,
 )
+from common.utilities.generations import bump_generation_on_commit
 
 class SoftDeletionQuerySet(QuerySet):
+	"""
+	Bulk writes skip model signals, so the ones that change rows bump the
+	model's generation themselves.
+	"""
 	def delete(self):
-		return super(SoftDeletionQuerySet, self).update(deleted_at=timezone.now(), 
-			is_deleted=True, is_active=False)
+		now = timezone.now()
+		return self.update(deleted_at=now, updated_at=now, is_deleted=True,
+			is_active=False)
+
+	def update(self, **kwargs):
+		rows = super(SoftDeletionQuerySet, self).update(**kwargs)
+		bump_generation_on_commit(self.model, using=self.db)
+		return rows
+
+	def bulk_create(self, *args, **kwargs):
+		objs = super(SoftDeletionQuerySet, self).bulk_create(*args, **kwargs)
+		bump_generation_on_commit(self.model, using=self.db)
+		return objs
 
 	def hard_delete(self):
 		return super(SoftDeletionQuerySet, self).delete()
@@ -59,7 +74,7 @@ class SoftDeletionModel(models.Model):
 		super(SoftDeletionModel, self).delete()
 
 class AbstractBase(SoftDeletionModel):
-	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 	created_by = models.ForeignKey(
@@ -0,0 +1,49 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from common.utilities.generations import bump_generation_on_commit
+
+
+def bump_model_generation(sender, using=None, **kwargs):
+    bump_generation_on_commit(sender, using=using)
+
+
+def bump_m2m_generation(sender, instance, action, model, using=None,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Membership belongs to the model declaring the field; the rows on the
+    # other side are unchanged.
+    owner = sender._meta.auto_created or type(instance)
+    bump_generation_on_commit(owner, using=using)
+
+
+def get_tracked_models():
+    """
+    Models of `CLASSTEACHER_APPS` whose generations follow their writes.
+    Auto-created many to many tables are left out: they are covered by
+    `m2m_changed`, and a `post_delete` receiver would stop Django from
+    deleting their rows in bulk.
+    """
+    names = {app.split('.apps.')[0] for app in settings.CLASSTEACHER_APPS}
+    return [
+        model for model in apps.get_models()
+        if model._meta.app_config.name in names
+    ]
+
+
+def connect_generation_signals():
+    for model in get_tracked_models():
+        post_save.connect(
+            bump_model_generation, sender=model,
+            dispatch_uid='generation-save-{}'.format(model._meta.label_lower))
+        post_delete.connect(
+            bump_model_generation, sender=model,
+            dispatch_uid='generation-delete-{}'.format(
+                model._meta.label_lower))
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(
+                bump_m2m_generation, sender=field.remote_field.through,
+                dispatch_uid='generation-m2m-{}'.format(
+                    field.remote_field.through._meta.label_lower))
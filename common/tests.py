@@ -1,3 +1,390 @@
-from django.test import TestCase
+import datetime
+import decimal
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from collections import OrderedDict
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.query import QuerySet
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from common.benchmarks.endpoints import Budget
+from common.benchmarks.generate import DatasetGenerator
+from common.utilities.generations import (
+    check_generation_cache,
+    generation_key,
+    get_generation_cache,
+)
+from common.utilities.metrics import (
+    MetricsRegistry,
+    get_process_start,
+    is_metrics_client,
+)
+from common.utilities import renderers
+from common.utilities.reference import get_reference_cache
+from common.utilities.relations import (
+    BatchedListSerializer,
+    BatchedPrimaryKeyRelatedField,
+)
+
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+from users.models import User
+
+METRICS = {'ALLOWED_IPS': ('127.0.0.1',), 'TOKEN': 'metrics-token'}
+RESPONSE_CACHE_ENABLED = dict(settings.RESPONSE_CACHE, ENABLED=True)
+
+
+class BudgetTest(SimpleTestCase):
+    """Query budgets are checked, time budgets only reported."""
+
+    def test_checks_queries(self):
+        budget = Budget(queries=2, time_ms=100)
+        self.assertEqual(budget.check({'queries': 2, 'time_ms': 500}), [])
+        self.assertEqual(
+            budget.check({'queries': 3, 'time_ms': 1}),
+            ['3 queries, budget is 2'])
+
+    def test_reports_time(self):
+        budget = Budget(queries=2, time_ms=100)
+        self.assertTrue(budget.over_time({'time_ms': 150}))
+        self.assertFalse(budget.over_time({'time_ms': 150}, time_factor=2))
+
+
+@override_settings(METRICS=METRICS)
+class MetricsClientTest(SimpleTestCase):
+    """`/metrics` is for local scrapers and holders of the token."""
+
+    def is_client(self, **meta):
+        return is_metrics_client(RequestFactory().get('/metrics', **meta))
+
+    def test_allowed_ips_only_when_not_proxied(self):
+        self.assertTrue(self.is_client(REMOTE_ADDR='127.0.0.1'))
+        self.assertFalse(self.is_client(REMOTE_ADDR='10.0.0.1'))
+        self.assertFalse(self.is_client(
+            REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9'))
+
+    def test_token(self):
+        self.assertTrue(self.is_client(
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9',
+            HTTP_AUTHORIZATION='Bearer metrics-token'))
+        self.assertFalse(self.is_client(
+            REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer wrong'))
+        # WSGI hands headers over as latin-1 text.
+        self.assertFalse(self.is_client(
+            REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer caf\xe9'))
+
+
+@unittest.skipUnless(
+    get_process_start(os.getpid()), 'needs /proc for process start times')
+class MetricsRegistryTest(SimpleTestCase):
+    """Samples files outlive the pid of the worker that wrote them."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        metrics = self.settings(
+            METRICS=dict(METRICS, DIRECTORY=self.directory))
+        metrics.enable()
+        self.addCleanup(metrics.disable)
+
+    def write(self, name, samples):
+        with open(os.path.join(self.directory, name), 'w') as f:
+            json.dump({'samples': samples, 'gauges': []}, f)
+
+    def test_reused_pid_keeps_the_old_samples(self):
+        # An exited worker that had the pid this process has now.
+        self.write('{}-1.json'.format(os.getpid()), [
+            ['http_requests_total', [], 5]])
+        registry = MetricsRegistry()
+        registry.inc('http_requests_total', amount=2)
+
+        totals = registry.collect()
+        self.assertEqual(totals[('http_requests_total', ())], 7)
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([
+            '.lock', 'exited.json', os.path.basename(registry.get_path())]))
+        self.assertEqual(
+            registry.collect()[('http_requests_total', ())], 7)
+
+
+class GenerationCacheTest(SimpleTestCase):
+    """Generations need a cache that is shared and their own."""
+
+    def test_default_settings_pass(self):
+        check_generation_cache()
+
+    def test_refuses_a_per_process_cache(self):
+        with self.settings(GENERATION_CACHE_ALIAS='default'):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'per process'):
+                check_generation_cache()
+
+    def test_refuses_a_cache_shared_with_responses(self):
+        caches = dict(settings.CACHES, responses=dict(
+            settings.CACHES['generations']))
+        response_cache = dict(settings.RESPONSE_CACHE, ALIAS='responses')
+        with self.settings(CACHES=caches, RESPONSE_CACHE=response_cache):
+            with self.assertRaisesMessage(
+                    ImproperlyConfigured, "RESPONSE_CACHE['ALIAS']"):
+                check_generation_cache()
+
+
+class DatasetGeneratorTest(TestCase):
+    """A second run with the same seed adds rows instead of colliding."""
+
+    def generate(self):
+        return DatasetGenerator(
+            teachers=3, classes=2, subjects=2, students=5,
+            subjects_per_student=(1, 2), seed=7, workers=1).run()
+
+    def test_same_seed_twice(self):
+        self.generate()
+
+        counts = self.generate()
+        self.assertEqual(counts['students'], 5)
+        self.assertEqual(Student.all_objects.count(), 10)
+        self.assertEqual(User.objects.filter(
+            username__regex=r'^t[0-9]+$').count(), 6)
+        self.assertEqual(Class.all_objects.count(), 4)
+        self.assertEqual(len(set(Student.all_objects.values_list(
+            'admission_number', flat=True))), 10)
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_ENABLED)
+class ResponseCacheTest(TransactionTestCase):
+    """
+    Cached responses are rebuilt after any write to the models in them.
+    Writes must commit to bump generations, hence the
+    `TransactionTestCase`.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='+254722000900',
+            password='amina-pass')
+        self.math = Subject.objects.create(
+            name='Mathematics', code='MAT', created_by=self.user)
+        self.english = Subject.objects.create(
+            name='English', code='ENG', created_by=self.user)
+        self.student = Student.objects.create(
+            first_name='Baraka', last_name='Kamau',
+            date_of_birth=datetime.date(2010, 1, 1),
+            student_class=Class.objects.create(
+                name='4A', created_by=self.user),
+            created_by=self.user)
+        self.student.subjects.set([self.math])
+
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+        self.url = reverse('student-detail', kwargs={'pk': self.student.pk})
+        self.get()
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def subject_ids(self):
+        return sorted(subject['id'] for subject in self.get()['subjects'])
+
+    def test_serves_the_cached_response(self):
+        # A write that bumps no generation is not seen.
+        QuerySet.update(
+            Student.objects.filter(pk=self.student.pk), last_name='Otieno')
+        self.assertEqual(self.get()['last_name'], 'Kamau')
+
+    def test_write_rebuilds_the_response(self):
+        self.student.last_name = 'Otieno'
+        self.student.save()
+        self.assertEqual(self.get()['last_name'], 'Otieno')
+
+    def test_many_to_many_change_rebuilds_the_response(self):
+        self.student.subjects.add(self.english)
+        self.assertEqual(
+            self.subject_ids(),
+            sorted([str(self.math.pk), str(self.english.pk)]))
+
+
+@override_settings(
+    REFERENCE_CACHE={'CHECK_INTERVAL': 60},
+    RESPONSE_CACHE=dict(settings.RESPONSE_CACHE, ENABLED=False))
+class ReferenceCacheTest(TestCase):
+    """
+    Reference rows are served without queries until the generation moves
+    on, and writes check it first.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='+254722001000',
+            password='amina-pass')
+        cls.live = Class.objects.create(name='4A', created_by=cls.user)
+        cls.removed = Class.objects.create(name='4B', created_by=cls.user)
+        cls.subject = Subject.objects.create(
+            name='Mathematics', code='MAT', created_by=cls.user)
+
+    def setUp(self):
+        self.reference = get_reference_cache(Class)
+        self.reference.invalidate()
+        self.reference.all()
+
+    def remove_in_another_worker(self):
+        # A write that bumps nothing here; the other worker's bump only
+        # reaches this one through the shared generation cache.
+        QuerySet.update(
+            Class.objects.filter(pk=self.removed.pk),
+            deleted_at=timezone.now(), is_deleted=True)
+        get_generation_cache().incr(generation_key(Class))
+
+    def test_serves_rows_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.reference.get(self.live.pk), self.live)
+            self.assertEqual(
+                self.reference.filter_by('name', '4A'), [self.live])
+
+    def test_refresh_sees_other_workers(self):
+        self.remove_in_another_worker()
+        # Within CHECK_INTERVAL reads may lag behind.
+        self.assertIsNotNone(self.reference.get(self.removed.pk))
+        self.reference.refresh()
+        self.assertIsNone(self.reference.get(self.removed.pk))
+        self.assertIsNotNone(self.reference.get(self.live.pk))
+
+    def test_writes_refuse_rows_removed_in_another_worker(self):
+        self.remove_in_another_worker()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+        response = client.post(reverse('student-list'), {
+            'first_name': 'Baraka', 'last_name': 'Kamau',
+            'date_of_birth': '2010-01-01',
+            'student_class': str(self.removed.pk),
+            'subjects': [str(self.subject.pk)],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error['pointer'] for error in response.data['errors']],
+            ['student_class'])
+
+
+class StaffSerializer(serializers.Serializer):
+    # `User` has no reference cache, every lookup reaches the database.
+    teacher = BatchedPrimaryKeyRelatedField(queryset=User.objects.all())
+    assistants = BatchedPrimaryKeyRelatedField(
+        queryset=User.objects.all(), many=True)
+
+    class Meta:
+        list_serializer_class = BatchedListSerializer
+
+
+class BatchedRelatedFieldTest(TestCase):
+    """Related pks are looked up with one query per field."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                'staff{}'.format(number), 'Staff',
+                phone_number='+2547220011{:02d}'.format(number),
+                password='staff-pass')
+            for number in range(6)
+        ]
+
+    def test_one_query_per_field(self):
+        data = [
+            {'teacher': str(teacher.pk), 'assistants': [
+                str(user.pk) for user in self.users[3:]]}
+            for teacher in self.users[:3]
+        ]
+        serializer = StaffSerializer(data=data, many=True)
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(
+            [item['teacher'] for item in serializer.validated_data],
+            self.users[:3])
+
+    def test_reports_every_missing_pk_at_once(self):
+        missing = [str(uuid.uuid4()) for _ in range(2)]
+        serializer = StaffSerializer(data={
+            'teacher': str(self.users[0].pk),
+            'assistants': [str(self.users[1].pk)] + missing,
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['assistants'], [
+            'Invalid pks {} - objects do not exist.'.format(', '.join(
+                '"{}"'.format(pk) for pk in missing))])
+
+
+# Values the orjson path encodes itself or hands to DRF's encoder.
+RENDERED_VALUES = OrderedDict([
+    ('datetime', datetime.datetime(
+        2026, 10, 18, 9, 30, 15, 123456, tzinfo=timezone.utc)),
+    ('whole_second', datetime.datetime(
+        2026, 10, 18, 9, 30, 15, tzinfo=timezone.utc)),
+    ('naive', datetime.datetime(2026, 10, 18, 9, 30, 15, 123456)),
+    ('offset', datetime.datetime(
+        2026, 10, 18, 12, 30, tzinfo=timezone.get_fixed_timezone(180))),
+    ('date', datetime.date(2026, 10, 18)),
+    ('time', datetime.time(9, 30, 15, 500)),
+    ('decimal', decimal.Decimal('12.50')),
+    ('lazy', gettext_lazy('Mathematics')),
+    ('uuid', uuid.UUID('01a14e23-1c66-709a-960c-2d39959b33d4')),
+    ('nested', OrderedDict([('b', 1), ('a', [1.5, None, True])])),
+    ('text', 'caf\xe9 \u2028 \u2029'),
+])
+
+
+@unittest.skipUnless(renderers.orjson, 'needs orjson')
+@override_settings(JSON_RENDERER={'ENCODER': 'orjson'})
+class FastJSONRendererTest(SimpleTestCase):
+    """orjson output is byte for byte what `JSONRenderer` writes."""
+
+    def assert_same(self, data):
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data),
+            JSONRenderer().render(data))
+
+    def test_values(self):
+        with mock.patch.object(
+                renderers.orjson, 'dumps',
+                wraps=renderers.orjson.dumps) as dumps:
+            for name, value in RENDERED_VALUES.items():
+                with self.subTest(name=name):
+                    self.assert_same({name: value})
+            self.assert_same([RENDERED_VALUES])
+        self.assertEqual(dumps.call_count, len(RENDERED_VALUES) + 1)
+
+    def test_falls_back_on_what_orjson_refuses(self):
+        # Integers past 64 bits and non string keys.
+        for data in ({'big': 2 ** 70}, {1: 'one'}):
+            with self.subTest(data=data):
+                self.assert_same(data)
+
+    def test_ignores_serializer_formats(self):
+        # Like DRF's encoder, raw temporal values are always ISO 8601; the
+        # `*_FORMAT` settings are for serializer fields.
+        with self.settings(REST_FRAMEWORK=dict(
+                settings.REST_FRAMEWORK, DATETIME_FORMAT='%d/%m/%Y %H:%M',
+                DATE_FORMAT='%d/%m/%Y')):
+            self.assert_same(RENDERED_VALUES)
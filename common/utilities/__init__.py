@@ -6,8 +6,11 @@ from .choices import (
 from .helpers import (
 	validate_phone_number,
 	format_phone_number_prefix,
+	normalize_phone_number,
 )
 
+from .uuids import uuid7
+
 from .filters import (
     CommonFieldsFilterset,
     BooleanFieldFilter,
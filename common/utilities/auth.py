@@ -1,17 +1,23 @@
 import logging
 import jwt
 
-from django.core.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.validators import validate_email
-from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.contrib.auth import authenticate, get_user_model
 
-from common.utilities import validate_phone_number
+from common.utilities import normalize_phone_number, validate_phone_number
+from common.utilities.cache import (
+    get_credential_cache,
+    get_principal_cache,
+)
+from common.utilities.hashing import hash_password, verify_password
+from common.utilities.profiling import profiled
 
 from django.conf import settings
 
 from rest_framework.authentication import (
     BaseAuthentication,
+    BasicAuthentication,
     get_authorization_header
 )
 from rest_framework.exceptions import (
@@ -33,9 +39,9 @@ class ClassteacherAuthenticationBackend:
         2. Phone Number (recommended default) or
         3. Board Number (For Doctors ONLY)
 
-    If it fails, we fall back to 'django.contrib.auth.backends.ModelBackend'
-    which uses the `phone_number` field, which has been set as the default
-    `USERNAME_FIELD` in the custom `User` model (api.users.models.User).
+    Every answer is final, wrong credentials and lookup errors included, so
+    'django.contrib.auth.backends.ModelBackend' never hashes the password a
+    second time on the request thread, outside the hashing executor.
     """
 
     def validate_username(self, username):
@@ -56,24 +62,58 @@ class ClassteacherAuthenticationBackend:
         is_active = getattr(user, 'is_active', None)
         return is_active or is_active is None
 
-    def authenticate(self, username=None, password=None, **kwargs):
+    def get_lookup(self, username):
+        """
+        The one indexed column to find `username` in, and the value to look
+        for: email addresses by `email`, phone numbers in E.164 by
+        `phone_number_e164`, anything else by `username`.
+        """
+        if "@" in username:
+            return 'email', username
+        phone_number = normalize_phone_number(username)
+        if phone_number is not None:
+            return 'phone_number_e164', phone_number
+        return 'username', username
+
+    @profiled('auth')
+    def authenticate(self, request=None, username=None, password=None,
+                     **kwargs):
+        """
+        Log a user in with a single query. Once the username has been looked
+        up the answer is final: failures, lookup errors included, raise
+        `PermissionDenied`, so `ModelBackend` does not query and hash a
+        second time.
+        """
         self.validate_username(username)
+        column, value = self.get_lookup(username)
         try:
-            user = User.objects.get(
-                Q(phone_number=username) | Q(email=username))
+            user = User.objects.get(**{column: value})
         except User.DoesNotExist:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a nonexistent user (#20760).
-            User().set_password(password)
-        except Exception as e:
+            hash_password(password)
+            raise PermissionDenied
+        except Exception:
             LOGGER.error(
-                'Unexpected error: ', exc_info=True, extra=e.args
+                'Unexpected error looking up %s', column, exc_info=True
             )
-            return None
-        else:
-            if user.check_password(password) and \
-                    self.user_can_authenticate(user):
-                return user
+            raise PermissionDenied
+
+        if self.check_password(user, password) and \
+                self.user_can_authenticate(user):
+            return user
+        raise PermissionDenied
+
+    def check_password(self, user, password):
+        """
+        `user.check_password` with the hashing on the hashing executor. A
+        hash made with other hasher settings is replaced on success.
+        """
+        valid, must_update = verify_password(password, user.password)
+        if valid and must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return valid
 
     def get_user(self, user_id):
         try:
@@ -83,9 +123,44 @@ class ClassteacherAuthenticationBackend:
         return user if self.user_can_authenticate(user) else None
 
 
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    HTTP Basic authentication against `ClassteacherAuthenticationBackend`,
+    so the username can be a phone number or an email address.
+
+    Successful checks are remembered in the `CredentialCache` for
+    `BASIC_AUTH['CREDENTIAL_CACHE_TIMEOUT']` seconds. Repeated requests with
+    the same credentials then cost a primary key lookup instead of a
+    password hash, until the user's password or `is_active` changes.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        credential_cache = get_credential_cache()
+        user = credential_cache.match(
+            userid, password, ClassteacherAuthenticationBackend().get_user)
+        if user is not None:
+            return (user, None)
+
+        try:
+            user = authenticate(
+                request=request, username=userid, password=password)
+        except ValidationError:
+            user = None
+
+        if user is None:
+            raise AuthenticationFailed('Invalid username/password.')
+
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        credential_cache.add(userid, password, user)
+        return (user, None)
+
+
 class JWTAuthentication(BaseAuthentication):
     authentication_header_prefix = 'Bearer'
 
+    @profiled('auth')
     def authenticate(self, request):
         """
         The `authenticate` method is called on every request regardless of
@@ -157,11 +232,25 @@ class JWTAuthentication(BaseAuthentication):
             msg = 'Invalid authentication. Could not decode token.'
             raise AuthenticationFailed(msg)
 
-        try:
-            user = User.objects.get(pk=payload['id'])
-        except User.DoesNotExist:
-            msg = 'No user matching this token was found.'
-            raise AuthenticationFailed(msg)
+        # Serve the principal from the per-process cache when we can. The
+        # entry is bounded by the token's own expiry so a cached user never
+        # outlives the credentials it was loaded for.
+        principal_cache = get_principal_cache()
+        user = principal_cache.get(payload['id'])
+
+        if user is None:
+            # Read before the row, a write in between must not be cached
+            # under the newer generation.
+            generation = principal_cache.get_generation()
+            try:
+                user = User.objects.get(pk=payload['id'])
+            except User.DoesNotExist:
+                msg = 'No user matching this token was found.'
+                raise AuthenticationFailed(msg)
+
+            principal_cache.set(
+                payload['id'], user, expires_at=payload.get('exp'),
+                generation=generation)
 
         if not user.is_active:
             msg = 'This user has been deactivated.'
@@ -0,0 +1,227 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+class LRUCache(object):
+    """
+    A thread safe, size bounded, in-process cache.
+
+    Entries are evicted in least recently used order once `max_size` is
+    reached and expire after `timeout` seconds, or earlier if an explicit
+    `expires_at` timestamp is passed to `set`.
+    """
+
+    def __init__(self, max_size=1024, timeout=60):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout=None, expires_at=None):
+        if timeout is None:
+            timeout = self.timeout
+        if timeout <= 0 or self.max_size <= 0:
+            return
+
+        deadline = time.time() + timeout
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'max_size': self.max_size,
+        }
+
+
+class PrincipalCache(LRUCache):
+    """
+    Caches authenticated `User` instances by primary key so that
+    `JWTAuthentication` does not hit the database on every request.
+
+    Configured through the `JWT_AUTH` setting:
+        JWT_PRINCIPAL_CACHE_TIMEOUT: seconds an entry lives, 0 disables
+        JWT_PRINCIPAL_CACHE_MAX_SIZE: maximum number of cached users
+
+    Entries never outlive the token they were loaded for. Each one is
+    stored under the `User` generation, which every write to users bumps,
+    `QuerySet.update` included, in whichever worker makes it, so a
+    deactivated user stops authenticating on the next request. Every
+    request gets its own copy of the cached user to modify.
+    """
+
+    def __init__(self):
+        jwt_settings = getattr(settings, 'JWT_AUTH', {})
+        super(PrincipalCache, self).__init__(
+            max_size=jwt_settings.get('JWT_PRINCIPAL_CACHE_MAX_SIZE', 1024),
+            timeout=jwt_settings.get('JWT_PRINCIPAL_CACHE_TIMEOUT', 60),
+        )
+
+    def get_generation(self):
+        from django.contrib.auth import get_user_model
+        from common.utilities.generations import get_generation
+        return get_generation(get_user_model())
+
+    def get(self, user_id, default=None):
+        if self.timeout <= 0 or self.max_size <= 0:
+            return default
+        entry = super(PrincipalCache, self).get(str(user_id))
+        if entry is None:
+            return default
+        user, generation = entry
+        if generation != self.get_generation():
+            self.invalidate(user_id)
+            return default
+        return copy.deepcopy(user)
+
+    def set(self, user_id, user, timeout=None, expires_at=None,
+            generation=None):
+        """
+        Cache `user` under `generation`, which should be read before the
+        user was loaded, by default the current one.
+        """
+        if self.timeout <= 0 or self.max_size <= 0:
+            return
+        if generation is None:
+            generation = self.get_generation()
+        super(PrincipalCache, self).set(
+            str(user_id), (copy.deepcopy(user), generation),
+            timeout=timeout, expires_at=expires_at)
+
+    def invalidate(self, user_id):
+        self.delete(str(user_id))
+
+
+class CredentialCache(LRUCache):
+    """
+    Remembers successful username and password checks of
+    `CachedBasicAuthentication` so that a client sending the same
+    credentials on every request is not hashed on every request.
+
+    Configured through the `BASIC_AUTH` setting:
+        CREDENTIAL_CACHE_TIMEOUT: seconds an entry lives, 0 disables
+        CREDENTIAL_CACHE_MAX_SIZE: maximum number of cached credentials
+
+    Entries are keyed by an HMAC of the credentials, never the plaintext,
+    and hold the user's primary key and an HMAC of the password hash it
+    was checked against. `match` only accepts an entry for a user row that
+    still has that hash and is active, so changing the password or
+    `is_active` in any worker invalidates it.
+    """
+    key_salt = 'common.utilities.cache.CredentialCache'
+
+    def __init__(self):
+        basic_settings = getattr(settings, 'BASIC_AUTH', {})
+        super(CredentialCache, self).__init__(
+            max_size=basic_settings.get('CREDENTIAL_CACHE_MAX_SIZE', 1024),
+            timeout=basic_settings.get('CREDENTIAL_CACHE_TIMEOUT', 60),
+        )
+        self.stale = 0
+
+    def get_key(self, username, password):
+        # Basic credentials cannot have a colon in the username.
+        return salted_hmac(
+            self.key_salt, '{}:{}'.format(username, password)).hexdigest()
+
+    def get_fingerprint(self, user):
+        return salted_hmac(self.key_salt, user.password).hexdigest()
+
+    def add(self, username, password, user):
+        self.set(self.get_key(username, password),
+                 (user.pk, self.get_fingerprint(user)))
+
+    def match(self, username, password, load_user):
+        """
+        The user the credentials were verified for, loaded with
+        `load_user(pk)`, or `None` when they have to be checked again.
+        """
+        key = self.get_key(username, password)
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        user_id, fingerprint = entry
+        user = load_user(user_id)
+        if user is None or not user.is_active or not constant_time_compare(
+                self.get_fingerprint(user), fingerprint):
+            self.delete(key)
+            with self._lock:
+                self.stale += 1
+            return None
+        return user
+
+    def stats(self):
+        stats = super(CredentialCache, self).stats()
+        stats['stale'] = self.stale
+        return stats
+
+
+_principal_cache = None
+
+
+def get_principal_cache():
+    """
+    Return the process wide `PrincipalCache`, creating it on first use so
+    that settings are read after Django has been configured.
+    """
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache()
+    return _principal_cache
+
+
+_credential_cache = None
+
+
+def get_credential_cache():
+    """The process wide `CredentialCache`, created on first use."""
+    global _credential_cache
+    if _credential_cache is None:
+        _credential_cache = CredentialCache()
+    return _credential_cache
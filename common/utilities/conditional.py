@@ -0,0 +1,135 @@
+import hashlib
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from common.utilities.generations import get_generations
+
+VERSION_FIELD = 'updated_at'
+
+
+def _as_datetime(value):
+    # Raw cursors on some backends hand timestamps back as naive text.
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def _related_columns(related_models, connection):
+    qn = connection.ops.quote_name
+    return [
+        '(SELECT MAX({}) FROM {})'.format(
+            qn(VERSION_FIELD), qn(model._meta.db_table))
+        for model in sorted(related_models, key=lambda m: m._meta.label)
+    ]
+
+
+def has_version_field(model):
+    return any(field.name == VERSION_FIELD for field in model._meta.fields)
+
+
+def _split_models(related_models):
+    """
+    `(versioned, generations)`: the models with a version field, and the
+    sorted generations of those without one. A write to a model without
+    `updated_at` has no time to report, so it only shows in the ETag.
+    """
+    versioned = [m for m in related_models if has_version_field(m)]
+    unversioned = [m for m in related_models if not has_version_field(m)]
+    generations = sorted(get_generations(unversioned).items()) \
+        if unversioned else []
+    return versioned, generations
+
+
+class Validators(object):
+    """An ETag and Last-Modified pair for a response."""
+
+    def __init__(self, *parts, last_modified=None):
+        digest = hashlib.md5(
+            '|'.join(str(part) for part in parts).encode('utf-8'))
+        self.etag = '"{}"'.format(digest.hexdigest())
+        self.last_modified = last_modified
+
+    @property
+    def last_modified_timestamp(self):
+        if self.last_modified is None:
+            return None
+        # HTTP dates have a one second resolution.
+        return int(self.last_modified.timestamp())
+
+    def apply(self, response):
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(
+                self.last_modified_timestamp)
+        return response
+
+
+def get_list_validators(queryset, related_models=(), key=''):
+    """
+    An ETag for a list response, from the row count and latest `updated_at`
+    of `queryset` and the latest `updated_at` of every model nested in the
+    output, all read with a single query. Nested models without
+    `updated_at` are covered by their generations.
+
+    There is no Last-Modified: a row leaving the list, such as a soft
+    deleted or moved row that was not the newest, does not raise the latest
+    `updated_at`, and HTTP dates cannot tell two writes in one second apart.
+    """
+    connection = connections[queryset.db]
+    related_models, generations = _split_models(related_models)
+    inner_sql, params = queryset.order_by().values(
+        VERSION_FIELD).query.sql_with_params()
+    columns = [
+        'COUNT(*)',
+        'MAX(versions.{})'.format(connection.ops.quote_name(VERSION_FIELD)),
+    ] + _related_columns(related_models, connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT {} FROM ({}) versions'.format(
+            ', '.join(columns), inner_sql), params)
+        count, *versions = cursor.fetchone()
+
+    versions = [_as_datetime(version) for version in versions]
+    validators = Validators(key, count, *versions, *generations)
+    validators.count = count
+    return validators
+
+
+def get_generation_validators(models, key=''):
+    """
+    Validators for a list response from the generations of the models in
+    it, without touching the database. Any write to those models changes
+    the ETag; there is no Last-Modified.
+    """
+    generations = get_generations(models)
+    return Validators(key, *sorted(generations.items()))
+
+
+def get_detail_validators(instance, related_models=(), key=''):
+    """
+    Validators for a detail response, from the instance's `updated_at` and
+    the latest `updated_at` of every model nested in the output. Nested
+    models without `updated_at` are covered by their generations, and then
+    there is no Last-Modified.
+    """
+    versions = [getattr(instance, VERSION_FIELD)]
+    related_models, generations = _split_models(related_models)
+
+    if related_models:
+        connection = connections[instance._state.db or 'default']
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT {}'.format(
+                ', '.join(_related_columns(related_models, connection))))
+            versions.extend(
+                _as_datetime(version) for version in cursor.fetchone())
+
+    known = [version for version in versions if version is not None]
+    return Validators(
+        key, instance.pk, *versions, *generations,
+        last_modified=max(known) if known and not generations else None)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from common.utilities.generations import get_generations
+
+DEFAULTS = {
+    'COUNT_STRATEGY': 'exact',
+    'COUNT_CACHE_ALIAS': 'default',
+    'COUNT_CACHE_TIMEOUT': 60,
+    'ESTIMATE_THRESHOLD': 100000,
+}
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATE = 'estimate'
+NONE = 'none'
+COUNT_STRATEGIES = (EXACT, CACHED, ESTIMATE, NONE)
+
+
+def get_pagination_setting(name):
+    return getattr(settings, 'PAGINATION', {}).get(name, DEFAULTS[name])
+
+
+def get_query_models(queryset):
+    """The concrete models whose tables `queryset` reads."""
+    tables = {
+        join.table_name for join in queryset.query.alias_map.values()}
+    return [queryset.model] + sorted((
+        model for model in apps.get_models()
+        if model._meta.db_table in tables and model is not queryset.model
+    ), key=lambda model: model._meta.label_lower)
+
+
+def get_count_key(queryset):
+    """
+    A cache key for the row count of `queryset`: its SQL and parameters,
+    which are the same for the same filters in any order, under the
+    generations of every model it reads.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    generations = get_generations(get_query_models(queryset))
+    digest = hashlib.sha1('\n'.join([
+        sql,
+        json.dumps(params, default=str),
+        json.dumps(sorted(generations.items())),
+    ]).encode('utf-8')).hexdigest()
+    return 'count:{}:{}'.format(queryset.model._meta.label_lower, digest)
+
+
+def exact_count(queryset):
+    return queryset.count(), True
+
+
+def cached_count(queryset):
+    """
+    `COUNT(*)` stored for `COUNT_CACHE_TIMEOUT` seconds. The entry is keyed
+    by the generations of the models the query reads, which every worker
+    shares (see `check_generation_cache`), so a write through the ORM in
+    any worker makes the next request count again and the count stays
+    exact.
+    """
+    cache = caches[get_pagination_setting('COUNT_CACHE_ALIAS')]
+    key = get_count_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(
+            key, count, get_pagination_setting('COUNT_CACHE_TIMEOUT'))
+    return count, True
+
+
+def get_planner_estimate(queryset):
+    """
+    The planner's row estimate for `queryset` on PostgreSQL, which comes
+    from the table statistics (`reltuples`) and the filters' selectivity,
+    or `None` on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimated_count(queryset):
+    """
+    The planner's estimate when it is at least `ESTIMATE_THRESHOLD` rows,
+    where counting costs more than it tells. Smaller results, and databases
+    without an estimate, are counted exactly.
+    """
+    estimate = get_planner_estimate(queryset)
+    if estimate is None or estimate < get_pagination_setting(
+            'ESTIMATE_THRESHOLD'):
+        return queryset.count(), True
+    return estimate, False
+
+
+def omitted_count(queryset):
+    return None, False
+
+
+COUNTERS = {
+    EXACT: exact_count,
+    CACHED: cached_count,
+    ESTIMATE: estimated_count,
+    NONE: omitted_count,
+}
+
+
+def get_count(queryset, strategy):
+    """
+    `(count, exact)` for `queryset` under `strategy`. The count is `None`
+    when the strategy omits it.
+    """
+    return COUNTERS[strategy](queryset)
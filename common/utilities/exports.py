@@ -0,0 +1,142 @@
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from common.utilities.prefetch import get_prefetches
+
+CSV_LIST_SEPARATOR = ';'
+
+# Spreadsheets run cells starting with these as formulas.
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+CSV_FORMULA_ESCAPE = "'"
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def get_export_setting(name, default):
+    return getattr(settings, 'EXPORT', {}).get(name, default)
+
+
+class Echo(object):
+    """A file-like object whose `write` hands the value straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_in_chunks(queryset, chunk_size, prefetch_related=()):
+    """
+    Yield lists of up to `chunk_size` rows read through a server-side
+    cursor.
+
+    `QuerySet.iterator` ignores `prefetch_related`, so the prefetches are
+    run per chunk instead, keeping queries at one per chunk and lookup.
+    """
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) >= chunk_size:
+            prefetch_related_objects(chunk, *get_prefetches(prefetch_related))
+            yield chunk
+            chunk = []
+
+    if chunk:
+        prefetch_related_objects(chunk, *get_prefetches(prefetch_related))
+        yield chunk
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept an export format for views that stream
+    the export themselves. Anything else they answer, such as an error, is
+    written as JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        return json.dumps(data, cls=JSONEncoder).encode(self.charset)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+EXPORT_RENDERERS = (CSVExportRenderer, NDJSONExportRenderer)
+
+
+def to_csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return CSV_LIST_SEPARATOR.join(to_csv_value(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, cls=JSONEncoder)
+    return str(value)
+
+
+def escape_csv_formula(value):
+    """`value` with a leading quote if a spreadsheet would run it."""
+    if value.startswith(CSV_FORMULA_PREFIXES):
+        return CSV_FORMULA_ESCAPE + value
+    return value
+
+
+def stream_csv(fieldnames, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fieldnames)
+    for row in rows:
+        yield writer.writerow([
+            escape_csv_formula(to_csv_value(row[name]))
+            for name in fieldnames
+        ])
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + '\n'
+
+
+def export_response(serializer, queryset, lookups, export_format, filename,
+                    chunk_size=None):
+    """
+    Stream `queryset` through `serializer` as CSV or NDJSON without holding
+    more than one chunk of rows in memory.
+    """
+    chunk_size = chunk_size or get_export_setting('CHUNK_SIZE', 2000)
+    select_related, prefetch_related = lookups
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+
+    def rows():
+        for chunk in iterate_in_chunks(
+                queryset, chunk_size, prefetch_related):
+            for instance in chunk:
+                yield serializer.to_representation(instance)
+
+    if export_format == 'ndjson':
+        content = stream_ndjson(rows())
+    else:
+        content = stream_csv(list(serializer.fields), rows())
+
+    response = StreamingHttpResponse(
+        content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+        filename, export_format)
+    return response
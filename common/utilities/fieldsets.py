@@ -0,0 +1,108 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def parse_fieldset(value):
+    """
+    Parse a comma separated list of field names, dotted for nested fields,
+    into a tree: `{name: None}` selects a whole field and `{name: {...}}`
+    part of a nested serializer, so `id,student_class.name` gives
+    `{'id': None, 'student_class': {'name': None}}`.
+    """
+    tree = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                # The whole field is already selected.
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+def format_fieldset(tree, prefix=''):
+    return ','.join(sorted(
+        prefix + name if subtree is None else
+        format_fieldset(subtree, prefix + name + '.')
+        for name, subtree in tree.items()
+    ))
+
+
+def get_nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _check_names(serializer, tree, param, prefix):
+    unknown = sorted(set(tree) - set(serializer.fields))
+    if unknown:
+        raise ValidationError({param: [
+            'Unknown field(s) {}'.format(', '.join(
+                prefix + name for name in unknown))
+        ]})
+    for name, subtree in tree.items():
+        if subtree is not None and \
+                get_nested_serializer(serializer.fields[name]) is None:
+            raise ValidationError({param: [
+                '{}{} has no nested fields'.format(prefix, name)
+            ]})
+
+
+def keep_fields(serializer, tree, param='fields', prefix=''):
+    """Drop every field of `serializer` that `tree` does not select."""
+    _check_names(serializer, tree, param, prefix)
+    for name in list(serializer.fields):
+        if name not in tree:
+            serializer.fields.pop(name)
+        elif tree[name] is not None:
+            keep_fields(
+                get_nested_serializer(serializer.fields[name]), tree[name],
+                param, prefix + name + '.')
+
+
+def omit_fields(serializer, tree, param='omit', prefix=''):
+    """Drop the fields of `serializer` that `tree` selects."""
+    _check_names(serializer, tree, param, prefix)
+    for name, subtree in tree.items():
+        if subtree is None:
+            serializer.fields.pop(name)
+        else:
+            omit_fields(
+                get_nested_serializer(serializer.fields[name]), subtree,
+                param, prefix + name + '.')
+
+
+def apply_fieldset(serializer, fields=None, omit=None,
+                   fields_param='fields', omit_param='omit'):
+    """
+    Prune `serializer`, or the child of a `many=True` serializer, to the
+    `fields` tree and then drop the `omit` tree, both from
+    `parse_fieldset`.
+
+    The pruned serializer gets a `sparse_fieldset` attribute describing the
+    result, so code caching work per serializer class can tell fieldsets
+    apart.
+    """
+    target = serializer
+    if isinstance(serializer, serializers.ListSerializer):
+        target = serializer.child
+
+    key = []
+    if fields:
+        keep_fields(target, fields, fields_param)
+        key.append('{}={}'.format(fields_param, format_fieldset(fields)))
+    if omit:
+        omit_fields(target, omit, omit_param)
+        key.append('{}={}'.format(omit_param, format_fieldset(omit)))
+
+    if key:
+        target.sparse_fieldset = serializer.sparse_fieldset = '&'.join(key)
+    return serializer
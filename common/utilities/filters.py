@@ -1,4 +1,6 @@
 import django_filters
+from django_filters import fields as filter_fields
+from django_filters.filterset import FILTER_FOR_DBFIELD_DEFAULTS
 from rest_framework import filters
 from rest_framework import ISO_8601
 from distutils.util import strtobool
@@ -6,6 +8,9 @@ from django.utils.encoding import force_str
 from django import forms
 from django.utils.dateparse import parse_datetime
 from django.forms import DateTimeField
+from django.core.exceptions import ValidationError
+
+from common.utilities.reference import get_reference_cache
 
 BOOLEAN_CHOICES = (
     ('false', 'False'),
@@ -76,10 +81,79 @@ class ListIntegerFilter(ListCharFilter):
         return int(value)
 
 
+def get_references(field, values):
+    """
+    The rows for `values` from the reference cache of the field's model, or
+    `None` when the model has no cache or any of them is not in it.
+    """
+    model = field.queryset.model
+    reference = get_reference_cache(model)
+    if reference is None:
+        return None
+    if field.to_field_name not in (None, model._meta.pk.name):
+        return None
+    try:
+        pks = {model._meta.pk.to_python(value) for value in values}
+    except (TypeError, ValueError, ValidationError):
+        return None
+    instances = reference.get_many(pks)
+    if len(instances) != len(pks):
+        return None
+    return list(instances.values())
+
+
+class ReferenceModelChoiceField(filter_fields.ModelChoiceField):
+    def to_python(self, value):
+        if value not in self.empty_values:
+            instances = get_references(self, [value])
+            if instances:
+                return instances[0]
+        return super(ReferenceModelChoiceField, self).to_python(value)
+
+
+class ReferenceModelMultipleChoiceField(filter_fields.ModelMultipleChoiceField):
+    def _check_values(self, value):
+        instances = get_references(self, value)
+        if instances is None:
+            return super(ReferenceModelMultipleChoiceField, self)._check_values(
+                value)
+        return instances
+
+
+class ReferenceModelChoiceFilter(django_filters.ModelChoiceFilter):
+    """
+    Looks up the chosen row in the model's reference cache instead of the
+    database when there is one.
+    """
+    field_class = ReferenceModelChoiceField
+
+
+class ReferenceModelMultipleChoiceFilter(
+        django_filters.ModelMultipleChoiceFilter):
+    field_class = ReferenceModelMultipleChoiceField
+
+
+REFERENCE_FILTER_CLASSES = {
+    django_filters.ModelChoiceFilter: ReferenceModelChoiceFilter,
+    django_filters.ModelMultipleChoiceFilter: ReferenceModelMultipleChoiceFilter,
+}
+
+FILTER_DEFAULTS = {
+    field: dict(
+        options,
+        filter_class=REFERENCE_FILTER_CLASSES.get(
+            options['filter_class'], options['filter_class']))
+    for field, options in FILTER_FOR_DBFIELD_DEFAULTS.items()
+}
+
+
 class CommonFieldsFilterset(django_filters.FilterSet):
     """
         Every model that descends from AbstractBase should have this
     """
+    # Relations are validated against reference caches where available.
+    FILTER_DEFAULTS = FILTER_DEFAULTS
+
     active = django_filters.TypedChoiceFilter(
         choices=BOOLEAN_CHOICES, coerce=strtobool)
     deleted = django_filters.TypedChoiceFilter(
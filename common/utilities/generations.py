@@ -0,0 +1,114 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent in the worker that bumped the generation, right after the bump.
+generation_changed = Signal(providing_args=['model'])
+
+# Backends whose entries other processes cannot see.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_generation_cache():
+    return caches[getattr(settings, 'GENERATION_CACHE_ALIAS', 'default')]
+
+
+def _cache_storage(alias):
+    config = settings.CACHES[alias]
+    return config.get('BACKEND'), config.get('LOCATION', '')
+
+
+def check_generation_cache():
+    """
+    Refuse a generation cache that is not shared between processes. Every
+    feature built on generations, such as cached responses, validators,
+    reference caches, cached counts and the principal cache, would keep
+    serving data another worker has changed.
+
+    Also refuse one that stores the response or count caches, whose entries
+    would make it cull or evict counters.
+    """
+    alias = getattr(settings, 'GENERATION_CACHE_ALIAS', 'default')
+    if isinstance(caches[alias], PROCESS_LOCAL_BACKENDS):
+        raise ImproperlyConfigured(
+            "GENERATION_CACHE_ALIAS points at the '{}' cache, whose {} "
+            "backend is per process. Use a backend all workers share, such "
+            "as FileBasedCache or memcached.".format(
+                alias, type(caches[alias]).__name__))
+
+    from common.utilities.counts import get_pagination_setting
+    from common.utilities.response_cache import get_response_cache_setting
+    others = {
+        "RESPONSE_CACHE['ALIAS']": get_response_cache_setting('ALIAS'),
+        "PAGINATION['COUNT_CACHE_ALIAS']": get_pagination_setting(
+            'COUNT_CACHE_ALIAS'),
+    }
+    for name, other in sorted(others.items()):
+        if _cache_storage(other) == _cache_storage(alias):
+            raise ImproperlyConfigured(
+                "GENERATION_CACHE_ALIAS '{}' and {} '{}' store their "
+                "entries in the same place, so cached entries can push "
+                "generations out. Give generations a cache of their "
+                "own.".format(alias, name, other))
+
+
+def generation_key(model):
+    return 'generation:{}'.format(model._meta.label_lower)
+
+
+def _seed():
+    # Counters that were evicted come back at a value no earlier counter
+    # could have reached, so stale entries keyed on them are never reused.
+    return int(time.time() * 1000)
+
+
+def get_generations(models):
+    """
+    Return `{label: generation}` for `models`, read with one round trip to
+    the generation cache.
+
+    Generations are per-model counters bumped whenever a row of the model
+    changes. Anything derived from a model's rows can be stored under its
+    generation and is out of date as soon as the generation moves on. Keep
+    them in a cache every worker shares or changes made by one worker go
+    unnoticed by the others.
+    """
+    cache = get_generation_cache()
+    keys = {generation_key(model): model._meta.label_lower for model in models}
+    found = cache.get_many(list(keys))
+
+    for key in keys:
+        if key not in found:
+            cache.add(key, _seed(), None)
+            found[key] = cache.get(key)
+
+    return {label: found[key] for key, label in keys.items()}
+
+
+def get_generation(model):
+    return get_generations([model])[model._meta.label_lower]
+
+
+def bump_generation(model):
+    cache = get_generation_cache()
+    key = generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _seed(), None):
+            cache.incr(key)
+    generation_changed.send(sender=model, model=model)
+
+
+def bump_generation_on_commit(model, using=None):
+    """
+    Bump the generation of `model` once the current transaction commits, so
+    readers never store pre-commit data under the new generation.
+    """
+    transaction.on_commit(lambda: bump_generation(model), using=using)
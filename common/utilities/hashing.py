@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    check_password,
+    make_password,
+)
+
+from rest_framework.exceptions import Throttled
+
+from common.utilities.metrics import get_metrics
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'MAX_QUEUE': 16,
+    'RETRY_AFTER': 1,
+    'PBKDF2_ITERATIONS': PBKDF2PasswordHasher.iterations,
+}
+
+VERIFY = 'verify'
+ENCODE = 'encode'
+
+
+def get_hashing_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    `PBKDF2PasswordHasher` with `PASSWORD_HASHING['PBKDF2_ITERATIONS']`.
+    Hashes with a different iteration count still verify and, with this
+    hasher first in `PASSWORD_HASHERS`, are updated on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return get_hashing_setting('PBKDF2_ITERATIONS')
+
+
+class HashingOverloaded(Throttled):
+    default_detail = 'Too many sign ins in progress.'
+
+
+class HashingExecutor(object):
+    """
+    Runs password hashes on `workers` threads of their own, so a burst of
+    logins takes at most that many cores of a worker process while the
+    other requests go on. hashlib releases the GIL while it hashes.
+
+    At most `max_queue` hashes wait behind the running ones; past that
+    `submit` raises `HashingOverloaded` (429) at once rather than queueing
+    the request behind work it would time out waiting for.
+    """
+
+    def __init__(self, workers=2, max_queue=16, retry_after=1):
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hashing')
+
+    def submit(self, operation, func, *args):
+        """Run `func(*args)` on the pool, waiting for its result."""
+        metrics = get_metrics()
+        if not self._slots.acquire(blocking=False):
+            metrics.inc(
+                'password_hash_rejections_total', {'operation': operation})
+            raise HashingOverloaded(wait=self.retry_after)
+
+        metrics.inc_gauge('password_hash_queue_depth')
+        queued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            metrics.observe(
+                'password_hash_wait_seconds', {'operation': operation},
+                started_at - queued_at)
+            try:
+                return func(*args)
+            finally:
+                metrics.observe(
+                    'password_hash_duration_seconds',
+                    {'operation': operation},
+                    time.perf_counter() - started_at)
+
+        try:
+            return self._executor.submit(run).result()
+        finally:
+            metrics.inc_gauge('password_hash_queue_depth', amount=-1)
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    """The executor of this process, started on first use after a fork."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = HashingExecutor(
+                get_hashing_setting('WORKERS'),
+                get_hashing_setting('MAX_QUEUE'),
+                get_hashing_setting('RETRY_AFTER'))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _verify(password, encoded):
+    must_update = []
+    valid = check_password(password, encoded, setter=must_update.append)
+    return valid, bool(must_update)
+
+
+def verify_password(password, encoded):
+    """
+    `(valid, must_update)` for `password` against the `encoded` hash, where
+    `must_update` is set when the hash is not in the preferred format.
+    """
+    return get_hashing_executor().submit(VERIFY, _verify, password, encoded)
+
+
+def hash_password(password):
+    """`make_password(password)` on the hashing executor."""
+    return get_hashing_executor().submit(ENCODE, make_password, password)
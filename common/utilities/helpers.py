@@ -1,18 +1,32 @@
+from functools import lru_cache
+
 import phonenumbers
 
 from django.core.exceptions import ValidationError
 from phonenumber_field.phonenumber import to_python
 
+PHONE_NUMBER_CACHE_SIZE = 4096
+
 def format_phone_number_prefix(phone_number):
     assert isinstance(phone_number, (str,))
     return '+{}'.format(phone_number) if not phone_number.startswith('+') \
         else phone_number
-        
+
+@lru_cache(maxsize=PHONE_NUMBER_CACHE_SIZE)
+def normalize_phone_number(phone_number):
+    """
+    `phone_number` in E.164, `+254722000000` for `254 722 000000`, or
+    `None` when it is not a valid number. Parsing is memoized per process,
+    the same numbers come back on every login.
+    """
+    phne = to_python(format_phone_number_prefix(phone_number))
+    if not phonenumbers.is_valid_number(phne):
+        return None
+    return phonenumbers.format_number(phne, phonenumbers.PhoneNumberFormat.E164)
+
 def validate_phone_number(phone_number):
     error_msg = {
         "phone_number": "Enter a valid phone number."
     }
-    phne = format_phone_number_prefix(phone_number)
-    phne = to_python(phne)
-    if not phonenumbers.is_valid_number(phne):
-        raise ValidationError(error_msg)
\ No newline at end of file
+    if normalize_phone_number(phone_number) is None:
+        raise ValidationError(error_msg)
@@ -0,0 +1,442 @@
+import fcntl
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIRECTORY': os.path.join(tempfile.gettempdir(), 'classteacher-metrics'),
+    'FLUSH_INTERVAL': 1,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TOKEN': None,
+}
+
+# Where the samples of workers that have exited are added up.
+EXITED = 'exited.json'
+
+# Headers a reverse proxy adds, a request carrying them did not come from
+# REMOTE_ADDR itself.
+FORWARDED_HEADERS = (
+    'HTTP_FORWARDED', 'HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP')
+
+PREFIX = 'classteacher_'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+METRICS = {
+    'http_request_duration_seconds': (
+        HISTOGRAM, 'Request latency by URL name and action.'),
+    'http_requests_total': (
+        COUNTER, 'Responses by URL name, action and status code.'),
+    'http_requests_in_flight': (
+        GAUGE, 'Requests being handled right now.'),
+    'db_queries_total': (
+        COUNTER, 'SQL statements run by URL name and action.'),
+    'pagination_requests_total': (
+        COUNTER, 'Paginated list responses by pagination mode.'),
+    'pagination_counts_total': (
+        COUNTER, 'Page mode list responses by count strategy.'),
+    'password_hash_duration_seconds': (
+        HISTOGRAM, 'Password hashing time by operation.'),
+    'password_hash_wait_seconds': (
+        HISTOGRAM, 'Time password hashes waited for a hashing thread.'),
+    'password_hash_queue_depth': (
+        GAUGE, 'Password hashes running or waiting.'),
+    'password_hash_rejections_total': (
+        COUNTER, 'Password hashes refused with a 429 by operation.'),
+    'principal_cache_total': (
+        COUNTER, 'JWT principal cache lookups and evictions by result.'),
+    'credential_cache_total': (
+        COUNTER, 'Basic auth credential cache lookups by result.'),
+    'response_cache_total': (
+        COUNTER, 'Response cache lookups and stores by result.'),
+    'reference_cache_total': (
+        COUNTER, 'Reference cache hits and loads by model.'),
+}
+
+
+def get_metrics_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in labels) + '}'
+
+
+class MetricsRegistry(object):
+    """
+    The samples of one worker process.
+
+    Counter and histogram samples only grow, gauges are live values.
+    Samples are written to `<DIRECTORY>/<pid>-<start>.json` at most every
+    `FLUSH_INTERVAL` seconds and `collect` adds up the files of every
+    process. The files of workers that have exited are folded into
+    `exited.json` and removed, so totals never go backwards and the
+    directory does not grow with every restart; their gauges are dropped.
+    `<start>` is the process start time (see `get_process_start`), so a
+    worker given the pid of an exited one never overwrites its file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._gauges = {}
+        self._flushed_gauges = {}
+        self._collectors = []
+        self._flushed_at = 0
+        self._process_starts = {}
+
+    def inc(self, name, labels=None, amount=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def set_total(self, name, labels, value):
+        """Set a counter kept elsewhere, such as a cache's own hit count."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._samples[key] = value
+
+    def inc_gauge(self, name, labels=None, amount=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            for bound in buckets + (float('inf'),):
+                if value <= bound:
+                    key = (name + '_bucket', labels + (('le', bound),))
+                    self._samples[key] = self._samples.get(key, 0) + 1
+            for suffix, amount in (('_sum', value), ('_count', 1)):
+                key = (name + suffix, labels)
+                self._samples[key] = self._samples.get(key, 0) + amount
+
+    def register_collector(self, collector):
+        """`collector(registry)` runs before every flush."""
+        self._collectors.append(collector)
+
+    def get_path(self):
+        # Keyed by pid, a registry created before the workers fork is
+        # shared by all of them.
+        pid = os.getpid()
+        if pid not in self._process_starts:
+            self._process_starts[pid] = get_process_start(pid) or 0
+        return os.path.join(
+            get_metrics_setting('DIRECTORY'),
+            '{}-{}.json'.format(pid, self._process_starts[pid]))
+
+    def flush(self, force=False):
+        # A gauge written as non-zero that is back at zero is written
+        # straight away, so an idle worker never keeps reporting the request
+        # it last handled as in flight. Any other change waits for the
+        # interval, or every request would write the file.
+        now = time.time()
+        with self._lock:
+            gauges_settled = any(
+                value and not self._gauges.get(key)
+                for key, value in self._flushed_gauges.items())
+        if not force and not gauges_settled and now - self._flushed_at < \
+                get_metrics_setting('FLUSH_INTERVAL'):
+            return
+        self._flushed_at = now
+
+        for collector in self._collectors:
+            collector(self)
+        with self._lock:
+            data = {
+                'samples': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._samples.items()],
+                'gauges': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._gauges.items()],
+            }
+            self._flushed_gauges = dict(self._gauges)
+
+        path = self.get_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_samples(path, data)
+
+    def collect(self):
+        """Samples of every worker added up, as `{(name, labels): value}`."""
+        self.flush(force=True)
+        directory = get_metrics_setting('DIRECTORY')
+        # Only one process folds and reads the files at a time, so the
+        # samples of an exited worker are never counted twice.
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = os.path.join(directory, EXITED)
+            exited_totals = add_samples(
+                {}, read_samples(exited), ['samples'])
+            running, folded = [], []
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                try:
+                    pid, start = parse_sample_path(path)
+                except ValueError:
+                    continue
+                data = read_samples(path)
+                if is_running(pid, start):
+                    running.append(data)
+                else:
+                    add_samples(exited_totals, data, ['samples'])
+                    folded.append(path)
+
+            if folded:
+                write_samples(exited, {'samples': [
+                    [name, list(labels), value]
+                    for (name, labels), value in exited_totals.items()]})
+                for path in folded:
+                    os.remove(path)
+
+        totals = dict(exited_totals)
+        for data in running:
+            add_samples(totals, data, ['samples', 'gauges'])
+        return totals
+
+    def render(self):
+        """The collected samples in the text exposition format."""
+        totals = self.collect()
+        lines = []
+        for metric in sorted(METRICS):
+            kind, help_text = METRICS[metric]
+            name = PREFIX + metric
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for (sample, labels), value in sorted(
+                    totals.items(), key=sample_sort_key):
+                if sample != metric and not (
+                        kind == HISTOGRAM and sample.startswith(metric + '_')):
+                    continue
+                labels = [
+                    (label, '+Inf' if value_ == float('inf') else value_)
+                    for label, value_ in labels]
+                lines.append('{}{} {}'.format(
+                    PREFIX + sample, format_labels(labels), value))
+        return '\n'.join(lines) + '\n'
+
+
+def read_samples(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return {}
+
+
+def write_samples(path, data):
+    temporary = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def add_samples(totals, data, sections):
+    for section in sections:
+        for name, labels, value in data.get(section, ()):
+            key = (name, tuple(tuple(label) for label in labels))
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def sample_sort_key(item):
+    (name, labels), _ = item
+    return name, [
+        (label, value if isinstance(value, (int, float)) else 0, str(value))
+        for label, value in labels]
+
+
+def parse_sample_path(path):
+    """`(pid, start)` of a worker's samples file, `ValueError` otherwise."""
+    pid, _, start = os.path.basename(path)[:-len('.json')].partition('-')
+    return int(pid), int(start or 0)
+
+
+def get_process_start(pid):
+    """
+    When process `pid` started, in clock ticks since boot, or `None` where
+    there is no `/proc` to read it from or no such process.
+    """
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name in parentheses may hold spaces; starttime is the
+    # 20th field after it.
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def is_running(pid, start=0):
+    """
+    Whether the process that wrote a samples file as `pid` started at
+    `start` is still running. Without a start time, any process holding
+    `pid` counts.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    if not start:
+        return True
+    current = get_process_start(pid)
+    return current is None or current == start
+
+
+def collect_cache_stats(registry):
+    from common.utilities.cache import (
+        get_credential_cache,
+        get_principal_cache,
+    )
+    from common.utilities.reference import get_reference_caches
+    from common.utilities.response_cache import get_response_cache
+
+    stats = get_principal_cache().stats()
+    for result in ('hits', 'misses', 'evictions'):
+        registry.set_total(
+            'principal_cache_total', {'result': result}, stats[result])
+
+    stats = get_credential_cache().stats()
+    for result in ('hits', 'misses', 'stale', 'evictions'):
+        registry.set_total(
+            'credential_cache_total', {'result': result}, stats[result])
+
+    stats = get_response_cache().stats()
+    for result in ('hits', 'misses', 'stores'):
+        registry.set_total(
+            'response_cache_total', {'result': result}, stats[result])
+
+    for model, reference in get_reference_caches().items():
+        stats = reference.stats()
+        for result in ('hits', 'loads'):
+            registry.set_total('reference_cache_total', {
+                'model': model._meta.label_lower, 'result': result,
+            }, stats[result])
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+                _registry.register_collector(collect_cache_stats)
+    return _registry
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_view_labels(request, view_func):
+    match = request.resolver_match
+    url_name = (match.url_name if match else None) or 'unmatched'
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower(), 'unknown')
+    else:
+        action = request.method.lower()
+    return {'url_name': url_name, 'action': action}
+
+
+class MetricsMiddleware(object):
+    """
+    Counts requests, responses, latency and SQL statements per URL name and
+    viewset action into the process's `MetricsRegistry`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_metrics_setting('ENABLED'):
+            return self.get_response(request)
+
+        metrics = get_metrics()
+        request._metrics_labels = {'url_name': 'unmatched', 'action': 'unknown'}
+        counter = QueryCounter()
+        started = time.perf_counter()
+        metrics.inc_gauge('http_requests_in_flight')
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            metrics.inc_gauge('http_requests_in_flight', amount=-1)
+
+        labels = request._metrics_labels
+        metrics.observe(
+            'http_request_duration_seconds', labels,
+            time.perf_counter() - started)
+        metrics.inc('http_requests_total', dict(
+            labels, status=response.status_code))
+        metrics.inc('db_queries_total', labels, counter.count)
+        metrics.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = get_view_labels(request, view_func)
+
+
+def is_metrics_client(request):
+    """
+    Whether `request` sends `Authorization: Bearer <METRICS['TOKEN']>`, or
+    connects straight from one of `METRICS['ALLOWED_IPS']`. Behind a proxy
+    REMOTE_ADDR is the proxy's own, so proxied requests need the token.
+    """
+    token = get_metrics_setting('TOKEN')
+    if token:
+        expected = 'Bearer {}'.format(token)
+        # Bytes, as `compare_digest` refuses non-ASCII strings.
+        if hmac.compare_digest(
+                request.META.get('HTTP_AUTHORIZATION', '').encode('utf-8'),
+                expected.encode('utf-8')):
+            return True
+    if any(header in request.META for header in FORWARDED_HEADERS):
+        return False
+    return request.META.get('REMOTE_ADDR') in get_metrics_setting(
+        'ALLOWED_IPS')
+
+
+def metrics_view(request):
+    """
+    The metrics of every worker in the text exposition format, for the
+    clients `is_metrics_client` lets in.
+    """
+    if not is_metrics_client(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        get_metrics().render(), content_type='text/plain; version=0.0.4')
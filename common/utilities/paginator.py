@@ -1,7 +1,104 @@
+import json
+import math
+from base64 import b64decode, b64encode
 from collections import OrderedDict
 
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from common.utilities.counts import (
+    COUNT_STRATEGIES,
+    EXACT,
+    get_count,
+    get_pagination_setting,
+)
+from common.utilities.metrics import get_metrics
+
+PAGE_MODE = 'page'
+CURSOR_MODE = 'cursor'
+
+
+class CountPaginator(Paginator):
+    """
+    A `Paginator` handed its `count` by a count strategy. When the count is
+    approximate or missing it does not bound the page numbers, and whether
+    a next page exists is found by reading one row past the page.
+    """
+
+    def __init__(self, object_list, per_page, count=None, exact=True,
+                 **kwargs):
+        super(CountPaginator, self).__init__(object_list, per_page, **kwargs)
+        self._count = count
+        self.exact = exact and count is not None
+
+    @property
+    def count(self):
+        return self._count
+
+    @cached_property
+    def num_pages(self):
+        if self._count is None:
+            return None
+        if self._count == 0 and not self.allow_empty_first_page:
+            return 0
+        return math.ceil(max(1, self._count - self.orphans) / self.per_page)
+
+    def validate_number(self, number):
+        if self.exact:
+            return super(CountPaginator, self).validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if self.exact:
+            return super(CountPaginator, self).page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return InexactPage(
+            rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class InexactPage(Page):
+    def __init__(self, object_list, number, paginator, has_more):
+        super(InexactPage, self).__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        if not self.object_list:
+            return 0
+        return self.start_index() + len(self.object_list) - 1
 
 
 class ClassteacherPagingSerializer(pagination.PageNumberPagination):
@@ -10,20 +107,289 @@ class ClassteacherPagingSerializer(pagination.PageNumberPagination):
     It contains metadata that should be accessible at both the API and frontend
     And consequently used to manipulate pagination actions for the all list
     views
+
+    Two modes are supported:
+        1. `page` (default) - page number pagination with counts
+        2. `cursor` - keyset pagination on the model's default ordering with
+           `id` as a tie-breaker. No `COUNT(*)` or `OFFSET` is issued so deep
+           pages cost the same as the first one.
+
+    A view opts into cursor mode by setting `pagination_mode = 'cursor'`, and
+    a client by passing `?pagination=cursor` or a `cursor` it was handed.
+    Cursor pages cannot be reordered, so `ordering` and search are a 400.
+
+    In page mode the count comes from one of the `count` strategies:
+        1. `exact` - `COUNT(*)`, reusing the one the list validators ran
+        2. `cached` - `COUNT(*)` cached under the models' generations
+        3. `estimate` - the planner's estimate for large results
+        4. `none` - no count, total pages or last page
+    A view picks one with `count_strategy`, a client with `?count=`, and
+    `PAGINATION['COUNT_STRATEGY']` is the default. `approximate_count` is
+    true in responses whose count is an estimate.
     """
 
     page_size_query_param = 'page_size'
     max_page_size = 15000
 
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    count_query_param = 'count'
+    django_paginator_class = CountPaginator
+
+    mode = PAGE_MODE
+    count_strategy = EXACT
+
+    def get_pagination_mode(self, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            return CURSOR_MODE
+
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in (PAGE_MODE, CURSOR_MODE):
+            return mode
+
+        return getattr(view, 'pagination_mode', PAGE_MODE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.mode = self.get_pagination_mode(request, view)
+        get_metrics().inc('pagination_requests_total', {'mode': self.mode})
+        if self.mode == CURSOR_MODE:
+            return self.paginate_queryset_by_cursor(queryset, request, view)
+
+        return self.paginate_queryset_by_page(queryset, request, view)
+
+    def get_count_strategy(self, request, view=None):
+        strategy = request.query_params.get(self.count_query_param)
+        if strategy is None:
+            return getattr(view, 'count_strategy', None) or \
+                get_pagination_setting('COUNT_STRATEGY')
+        if strategy not in COUNT_STRATEGIES:
+            raise ValidationError({self.count_query_param: [
+                'Choose one of {}'.format(', '.join(COUNT_STRATEGIES))
+            ]})
+        return strategy
+
+    def get_count(self, queryset, view=None):
+        """
+        `(count, exact)` under the request's count strategy. An exact count
+        the view already made of the same queryset is reused.
+        """
+        known = getattr(view, 'filtered_count', None)
+        if self.count_strategy == EXACT and known is not None:
+            return known, True
+        return get_count(queryset, self.count_strategy)
+
+    # Page mode
+
+    def paginate_queryset_by_page(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.count_strategy = self.get_count_strategy(request, view)
+        get_metrics().inc(
+            'pagination_counts_total', {'strategy': self.count_strategy})
+        count, exact = self.get_count(queryset, view)
+        paginator = self.django_paginator_class(
+            queryset, page_size, count=count, exact=exact)
+
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            if paginator.num_pages is None:
+                raise NotFound('The last page is unknown without a count.')
+            page_number = paginator.num_pages
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+
+        if self.template is not None and (
+                paginator.num_pages is None or paginator.num_pages > 1):
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
     def get_paginated_response(self, data):
+        if self.mode == CURSOR_MODE:
+            return Response(OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('page_size', self.cursor_page_size),
+                ('results', data)
+            ]))
+
+        paginator = self.page.paginator
         return Response(OrderedDict([
-            ('count', self.page.paginator.count),
+            ('count', paginator.count),
+            ('approximate_count',
+             paginator.count is not None and not paginator.exact),
             ('next', self.get_next_link()),
             ('previous', self.get_previous_link()),
-            ('page_size', self.page.paginator.per_page),
+            ('page_size', paginator.per_page),
             ('current_page', self.page.number),
-            ('total_pages', self.page.paginator.num_pages),
+            ('total_pages', paginator.num_pages),
             ('start_index', self.page.start_index()),
             ('end_index', self.page.end_index()),
             ('results', data)
         ]))
+
+    def get_next_link(self):
+        if self.mode == CURSOR_MODE:
+            return self.get_cursor_link(self.next_position, reverse=False)
+        return super(ClassteacherPagingSerializer, self).get_next_link()
+
+    def get_previous_link(self):
+        if self.mode == CURSOR_MODE:
+            return self.get_cursor_link(self.previous_position, reverse=True)
+        return super(ClassteacherPagingSerializer, self).get_previous_link()
+
+    # Cursor mode
+
+    def get_cursor_ordering(self, queryset):
+        """
+        The keyset is the model's default ordering followed by `id`, which
+        every `AbstractBase` descendant has, so that rows sharing timestamps
+        still have a total order.
+        """
+        ordering = list(queryset.model._meta.ordering or [])
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in (pk_name, 'pk') for field in ordering):
+            ordering.append('-{}'.format(pk_name))
+        return ordering
+
+    def check_cursor_params(self, request):
+        """
+        Cursor pages follow the keyset ordering only; a client ordering or
+        search ranking would be silently dropped, so it is refused.
+        """
+        for param in (api_settings.ORDERING_PARAM, api_settings.SEARCH_PARAM):
+            if request.query_params.get(param, '').strip():
+                raise ValidationError({param: [
+                    'Cannot be combined with cursor pagination.'
+                ]})
+
+    def paginate_queryset_by_cursor(self, queryset, request, view=None):
+        self.check_cursor_params(request)
+        self.request = request
+        self.cursor_page_size = self.get_page_size(request)
+        self.ordering = self.get_cursor_ordering(queryset)
+        self.next_position = None
+        self.previous_position = None
+
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            ordering = [self._invert(field) for field in self.ordering]
+        else:
+            ordering = self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self._build_keyset_filter(ordering, position))
+
+        results = list(queryset[:self.cursor_page_size + 1])
+        has_more = len(results) > self.cursor_page_size
+        results = results[:self.cursor_page_size]
+
+        if reverse:
+            results.reverse()
+
+        if results:
+            first, last = results[0], results[-1]
+            if reverse:
+                # We came here from the page after this one.
+                self.next_position = self._get_position(last)
+                if has_more:
+                    self.previous_position = self._get_position(first)
+            else:
+                if has_more:
+                    self.next_position = self._get_position(last)
+                if position is not None:
+                    self.previous_position = self._get_position(first)
+        elif position is not None:
+            # Walked off either end; offer the way back.
+            if reverse:
+                self.next_position = position
+            else:
+                self.previous_position = position
+
+        return results
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(position, reverse))
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)})
+        return force_str(b64encode(payload.encode('utf-8'), altchars=b'-_'))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(force_str(
+                b64decode(encoded.encode('ascii'), altchars=b'-_')))
+            position = payload['p']
+            reverse = bool(payload.get('r', 0))
+            if not isinstance(position, list) or \
+                    len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def _get_position(self, instance):
+        # Rows are model instances, or dicts on the `values()` list path.
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            position.append(
+                value.isoformat() if hasattr(value, 'isoformat')
+                else str(value))
+        return position
+
+    def _invert(self, field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _build_keyset_filter(self, ordering, position):
+        """
+        Rows strictly after `position` in `ordering`:
+            a >= x AND (
+                (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+            ) ...
+        with `<` in place of `>` for descending fields. The redundant bound
+        on the leading column lets the index scan start at the cursor rather
+        than at the top of the index.
+        """
+        keyset_filter = Q()
+        equal_so_far = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset_filter |= equal_so_far & Q(
+                **{'{}__{}'.format(name, lookup): value})
+            equal_so_far &= Q(**{name: value})
+
+        leading, value = ordering[0], position[0]
+        bound = 'lte' if leading.startswith('-') else 'gte'
+        return Q(**{'{}__{}'.format(leading.lstrip('-'), bound): value}) & \
+            keyset_filter
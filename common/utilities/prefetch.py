@@ -0,0 +1,216 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+
+def get_related_lookups(serializer, model, prefix=''):
+    """
+    Walk a serializer's readable fields and work out the joins its output
+    needs on `model`.
+
+    Returns a `(select_related, prefetch_related)` pair where
+    `select_related` is a list of lookup paths and `prefetch_related` is a
+    list of `(path, related_model, nested_lookups)` tuples. Nested
+    serializers on forward relations are followed through the join, nested
+    serializers on to-many relations get their own lookups applied to the
+    prefetch queryset.
+    """
+    select_related = []
+    prefetch_related = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        child = field
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+        elif isinstance(field, ManyRelatedField):
+            child = field.child_relation
+
+        lookups = []
+        related_model = model
+        to_many = False
+        for attr in field.source_attrs:
+            try:
+                model_field = related_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+
+            lookups.append(attr)
+            related_model = model_field.related_model
+            if model_field.many_to_many or model_field.one_to_many:
+                to_many = True
+                break
+
+        if not lookups:
+            continue
+
+        path = prefix + '__'.join(lookups)
+        fully_walked = len(lookups) == len(field.source_attrs)
+        nested = fully_walked and isinstance(child, serializers.BaseSerializer)
+
+        if to_many:
+            nested_lookups = ([], [])
+            if nested:
+                nested_lookups = get_related_lookups(child, related_model)
+            prefetch_related.append((path, related_model, nested_lookups))
+            continue
+
+        if fully_walked and isinstance(child, PrimaryKeyRelatedField):
+            # Served from the local `<field>_id` column, no join needed.
+            continue
+
+        select_related.append(path)
+        if nested:
+            nested_select, nested_prefetch = get_related_lookups(
+                child, related_model, prefix=path + '__')
+            select_related.extend(nested_select)
+            prefetch_related.extend(nested_prefetch)
+
+    return select_related, prefetch_related
+
+
+def get_all_columns(model, prefix=''):
+    return [prefix + field.name for field in model._meta.concrete_fields]
+
+
+def get_projection(serializer, model, prefix=''):
+    """
+    Work out the columns a serializer's readable fields read on `model`,
+    mirroring the joins of `get_related_lookups`.
+
+    Returns a `(columns, prefetch_projections)` pair where `columns` are
+    `only()` paths, including those of models joined with
+    `select_related`, and `prefetch_projections` maps each prefetch path
+    to the projection of its queryset. Fields that do not read a model
+    field, such as properties, load every column of their model.
+    """
+    columns = {prefix + model._meta.pk.name}
+    prefetch_projections = {}
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            columns.update(get_all_columns(model, prefix))
+            continue
+
+        child = field
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+        elif isinstance(field, ManyRelatedField):
+            child = field.child_relation
+
+        current, path = model, prefix
+        for i, attr in enumerate(field.source_attrs):
+            last = i == len(field.source_attrs) - 1
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                columns.update(get_all_columns(current, path))
+                break
+
+            if model_field.many_to_many or model_field.one_to_many:
+                related_model = model_field.related_model
+                if last and isinstance(child, serializers.BaseSerializer):
+                    projection = get_projection(child, related_model)
+                else:
+                    projection = ({related_model._meta.pk.name}, {})
+                if model_field.one_to_many:
+                    # The prefetch matches rows on their foreign key.
+                    projection[0].add(model_field.field.name)
+                prefetch_projections[path + attr] = projection
+                break
+
+            if not model_field.concrete:
+                columns.update(get_all_columns(current, path))
+                break
+
+            columns.add(path + attr)
+            if not model_field.is_relation:
+                break
+
+            related_model = model_field.related_model
+            if last:
+                if isinstance(child, PrimaryKeyRelatedField):
+                    break
+                if isinstance(child, serializers.BaseSerializer):
+                    nested_columns, nested_prefetches = get_projection(
+                        child, related_model, prefix=path + attr + '__')
+                    columns.update(nested_columns)
+                    prefetch_projections.update(nested_prefetches)
+                else:
+                    columns.update(get_all_columns(
+                        related_model, path + attr + '__'))
+                break
+            current, path = related_model, path + attr + '__'
+
+    return columns, prefetch_projections
+
+
+def get_prefetches(prefetch_related, prefetch_projections=None):
+    """
+    Build `Prefetch` objects for the `prefetch_related` half of the lookups
+    from `get_related_lookups`, narrowed to the columns of
+    `prefetch_projections` when given.
+
+    Prefetches go through the related model's default manager so the
+    soft-delete managers keep filtering out deleted rows.
+    """
+    prefetch_projections = prefetch_projections or {}
+    return [
+        Prefetch(path, queryset=apply_related_lookups(
+            related_model._default_manager.all(), nested_lookups,
+            prefetch_projections.get(path)))
+        for path, related_model, nested_lookups in prefetch_related
+    ]
+
+
+def apply_related_lookups(queryset, lookups, projection=None):
+    """
+    Apply lookups from `get_related_lookups` to `queryset`, and with a
+    projection from `get_projection` load only the columns it lists.
+    """
+    select_related, prefetch_related = lookups
+    prefetch_projections = None
+
+    if projection is not None:
+        columns, prefetch_projections = projection
+        queryset = queryset.only(*sorted(columns))
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+
+    if prefetch_related:
+        queryset = queryset.prefetch_related(
+            *get_prefetches(prefetch_related, prefetch_projections))
+
+    return queryset
+
+
+def get_related_models(model, lookups):
+    """
+    Return the models reached by lookups from `get_related_lookups`, whose
+    rows end up nested in the serialized output.
+    """
+    select_related, prefetch_related = lookups
+    related_models = set()
+
+    for path in select_related:
+        current = model
+        for name in path.split('__'):
+            current = current._meta.get_field(name).related_model
+            related_models.add(current)
+
+    for path, related_model, nested_lookups in prefetch_related:
+        related_models.add(related_model)
+        related_models.update(
+            get_related_models(related_model, nested_lookups))
+
+    related_models.discard(model)
+    return related_models
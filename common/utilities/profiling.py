@@ -0,0 +1,274 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+LOGGER = logging.getLogger('classteacher.slow_requests')
+
+DEFAULTS = {
+    'ENABLED': False,
+    'ALLOW_HEADER': False,
+    'HEADER': 'HTTP_X_PROFILE',
+    'SLOW_REQUEST_MS': 500,
+    'EXPLAIN': True,
+    'EXPLAIN_LIMIT': 5,
+    'MAX_QUERIES': 500,
+}
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+}
+
+# Quoted literals in a plan, which are the parameter values of the query.
+PLAN_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+_local = threading.local()
+
+
+def get_profiling_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def get_current_profile():
+    return getattr(_local, 'profile', None)
+
+
+class Profile(object):
+    """
+    Timings of a single request, in milliseconds.
+
+    `sections` holds the time spent inside named `profile_section` blocks,
+    `queries` every SQL statement run with its duration.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sections = {}
+        self.section_query_ms = {}
+        self.queries = []
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.marks = {}
+
+    def add(self, name, duration_ms, query_ms=0.0):
+        self.sections[name] = self.sections.get(name, 0.0) + duration_ms
+        self.section_query_ms[name] = (
+            self.section_query_ms.get(name, 0.0) + query_ms)
+
+    def mark(self, name):
+        self.marks[name] = (time.perf_counter(), self.query_ms)
+
+    def between(self, start, end):
+        """
+        Time between two marks, with the SQL time of the window taken off.
+        """
+        if start not in self.marks or end not in self.marks:
+            return None
+        (started, start_sql), (ended, end_sql) = (
+            self.marks[start], self.marks[end])
+        return (ended - started) * 1000 - (end_sql - start_sql)
+
+    def record_query(self, alias, sql, params, duration_ms):
+        self.query_count += 1
+        self.query_ms += duration_ms
+        if len(self.queries) < get_profiling_setting('MAX_QUERIES'):
+            self.queries.append({
+                'alias': alias,
+                'sql': sql,
+                'params': params,
+                'time_ms': round(duration_ms, 3),
+            })
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def get_timings(self):
+        """
+        `(name, duration_ms, description)` entries for `Server-Timing`.
+        Serialization is the view's own time, less authentication and SQL.
+        """
+        auth = self.sections.get('auth', 0.0)
+        timings = [
+            ('total', self.total_ms, None),
+            ('auth', auth, None),
+            ('db', self.query_ms, '{} queries'.format(self.query_count)),
+        ]
+        view = self.between('view', 'response')
+        if view is not None:
+            own_auth = auth - self.section_query_ms.get('auth', 0.0)
+            timings.append(('serialize', max(view - own_auth, 0.0), None))
+        render = self.between('response', 'rendered')
+        if render is not None:
+            timings.append(('render', render, None))
+        return timings
+
+
+@contextmanager
+def profile_section(name):
+    """Add the time spent in the block to `name` on the current profile."""
+    profile = get_current_profile()
+    if profile is None:
+        yield
+        return
+    started, query_ms = time.perf_counter(), profile.query_ms
+    try:
+        yield
+    finally:
+        profile.add(
+            name, (time.perf_counter() - started) * 1000,
+            profile.query_ms - query_ms)
+
+
+def profiled(name):
+    """Decorate a function so its calls count towards section `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class QueryTimer(object):
+    def __init__(self, alias, profile):
+        self.alias = alias
+        self.profile = profile
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.profile.record_query(
+                self.alias, sql, params,
+                (time.perf_counter() - started) * 1000)
+
+
+def format_server_timing(timings):
+    entries = []
+    for name, duration, description in timings:
+        entry = '{};dur={:.1f}'.format(name, duration)
+        if description:
+            entry += ';desc="{}"'.format(description)
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+def explain_queries(profile):
+    """
+    EXPLAIN plans for the slowest distinct SELECTs of `profile`, at most
+    `PROFILING['EXPLAIN_LIMIT']` of them. Quoted values in the plans are
+    masked, they would put the query parameters in the log.
+    """
+    plans = []
+    seen = set()
+    limit = get_profiling_setting('EXPLAIN_LIMIT')
+    for query in sorted(profile.queries, key=lambda q: -q['time_ms']):
+        if len(plans) >= limit:
+            break
+        sql = query['sql']
+        if sql in seen or not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        seen.add(sql)
+
+        connection = connections[query['alias']]
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+        if prefix is None:
+            break
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, query['params'])
+                plan = PLAN_LITERAL.sub("'?'", '\n'.join(
+                    ' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()))
+        except Exception as e:
+            plan = 'EXPLAIN failed: {}'.format(e)
+        plans.append({'sql': sql, 'time_ms': query['time_ms'], 'plan': plan})
+    return plans
+
+
+class ProfilingMiddleware(object):
+    """
+    Times requests and reports the result in a `Server-Timing` header.
+
+    Every request is profiled when `PROFILING['ENABLED']` is set. With
+    `ALLOW_HEADER` a single request can ask for it by sending `X-Profile: 1`.
+    Requests slower than `SLOW_REQUEST_MS` are written as a line of JSON,
+    with their SQL and EXPLAIN plans of the slowest SELECTs, to the
+    `classteacher.slow_requests` logger, which settings send to a rotating
+    file.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_enabled(self, request):
+        if get_profiling_setting('ENABLED'):
+            return True
+        return get_profiling_setting('ALLOW_HEADER') and request.META.get(
+            get_profiling_setting('HEADER'), '').lower() in ('1', 'true')
+
+    def __call__(self, request):
+        if not self.is_enabled(request):
+            return self.get_response(request)
+
+        profile = Profile()
+        _local.profile = profile
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(
+                        QueryTimer(alias, profile)))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+
+        response['Server-Timing'] = format_server_timing(
+            profile.get_timings())
+        if profile.total_ms >= get_profiling_setting('SLOW_REQUEST_MS'):
+            self.log_slow_request(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = get_current_profile()
+        if profile is not None:
+            profile.mark('view')
+
+    def process_template_response(self, request, response):
+        profile = get_current_profile()
+        if profile is not None:
+            profile.mark('response')
+            response.add_post_render_callback(
+                lambda rendered: profile.mark('rendered'))
+        return response
+
+    def log_slow_request(self, request, response, profile):
+        # Query parameters and the query string hold password hashes, phone
+        # numbers, email addresses and search terms, so only the SQL and
+        # the path are logged.
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'timings': {
+                name: round(duration, 3)
+                for name, duration, _ in profile.get_timings()
+            },
+            'queries': [
+                {key: query[key] for key in ('alias', 'sql', 'time_ms')}
+                for query in profile.queries
+            ],
+        }
+        if get_profiling_setting('EXPLAIN'):
+            record['explain'] = explain_queries(profile)
+        LOGGER.warning(json.dumps(record, default=str))
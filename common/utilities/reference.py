@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from common.utilities.generations import generation_changed, get_generation
+
+_registry = {}
+
+
+def get_reference_setting(name, default):
+    return getattr(settings, 'REFERENCE_CACHE', {}).get(name, default)
+
+
+class ReferenceCache(object):
+    """
+    Every live row of a small, rarely changing model, held per worker with
+    an id map and an index per field in `indexes`.
+
+    Rows are loaded on first use and dropped whenever the model's generation
+    moves on: at once for writes made in this worker, and within
+    `REFERENCE_CACHE['CHECK_INTERVAL']` seconds for writes made in others.
+    Writes validating against the rows call `refresh` first, so a row
+    another worker just removed is not accepted. The instances are shared
+    between requests and must not be modified.
+    """
+
+    def __init__(self, model, indexes=()):
+        self.model = model
+        self.indexes = tuple(indexes)
+        self._lock = threading.Lock()
+        self._rows = None
+        self._indexes = {}
+        self._generation = None
+        self._checked_at = 0
+        self.hits = 0
+        self.loads = 0
+        generation_changed.connect(
+            self._generation_changed, sender=model, weak=False)
+
+    def _generation_changed(self, sender, **kwargs):
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+            self._indexes = {}
+
+    def load(self, generation):
+        rows = OrderedDict(
+            (instance.pk, instance)
+            for instance in self.model._default_manager.all())
+        indexes = {field: {} for field in self.indexes}
+        for instance in rows.values():
+            for field in self.indexes:
+                indexes[field].setdefault(
+                    getattr(instance, field), []).append(instance)
+        with self._lock:
+            self._rows = rows
+            self._indexes = indexes
+            self._generation = generation
+            self._checked_at = time.time()
+            self.loads += 1
+        return rows, indexes
+
+    def get_state(self, fresh=False):
+        interval = get_reference_setting('CHECK_INTERVAL', 1)
+        now = time.time()
+        with self._lock:
+            rows, indexes = self._rows, self._indexes
+            if rows is not None and not fresh and \
+                    now - self._checked_at < interval:
+                self.hits += 1
+                return rows, indexes
+
+        generation = get_generation(self.model)
+        with self._lock:
+            if rows is not None and rows is self._rows and \
+                    generation == self._generation:
+                self._checked_at = now
+                self.hits += 1
+                return rows, indexes
+        # The generation is read before the rows, so a write landing in
+        # between costs one more reload rather than serving stale rows.
+        return self.load(generation)
+
+    def refresh(self):
+        """
+        Check the generation now rather than within `CHECK_INTERVAL`,
+        reloading the rows if they are out of date. Calls right after it
+        are served from the checked rows.
+        """
+        self.get_state(fresh=True)
+
+    def all(self):
+        return list(self.get_state()[0].values())
+
+    def get(self, pk):
+        return self.get_state()[0].get(pk)
+
+    def get_many(self, pks):
+        rows = self.get_state()[0]
+        return {pk: rows[pk] for pk in pks if pk in rows}
+
+    def filter_by(self, field, value):
+        """Every row whose indexed `field` equals `value`."""
+        return list(self.get_state()[1][field].get(value, ()))
+
+    def get_by(self, field, value):
+        """The row whose `field` is `value`, `None` unless exactly one."""
+        rows = self.get_state()[1][field].get(value, ())
+        return rows[0] if len(rows) == 1 else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'loads': self.loads,
+                'size': len(self._rows) if self._rows is not None else 0,
+            }
+
+
+def register_reference_cache(model, indexes=()):
+    _registry[model] = ReferenceCache(model, indexes=indexes)
+    return _registry[model]
+
+
+def get_reference_cache(model):
+    return _registry.get(model)
+
+
+def get_reference_caches():
+    return dict(_registry)
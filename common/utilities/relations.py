@@ -0,0 +1,156 @@
+from django.core.exceptions import (
+    EmptyResultSet,
+    ValidationError as DjangoValidationError,
+)
+
+from rest_framework import serializers
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+)
+
+from common.utilities.reference import get_reference_cache
+
+RESOLVED_INSTANCES = 'resolved_instances'
+
+
+def get_queryset_key(queryset):
+    """`(model, sql)`, the same for querysets that match the same rows."""
+    try:
+        sql = str(queryset.order_by().query)
+    except EmptyResultSet:
+        sql = None
+    return queryset.model, sql
+
+
+class BatchedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    A `PrimaryKeyRelatedField` that looks up every submitted pk of a field
+    with a single `filter(pk__in=...)` query and reports all the missing
+    ones at once.
+
+    Resolved rows are kept in the serializer context under
+    `resolved_instances`, a `{(model, sql): {pk: instance}}` map shared by
+    every field with the same queryset in the serializer tree, so a row one
+    field's queryset allows never satisfies another's. `BatchedListSerializer`
+    fills it for all items before they are validated, and callers may pass
+    a pre-filled map in the context. Fields whose queryset is the model's
+    default manager are served from its reference cache, if it has one,
+    refreshed first, and only pks it does not know reach the database.
+    """
+    default_error_messages = {
+        'does_not_exist_many': (
+            'Invalid pks {pk_values} - objects do not exist.'),
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """
+        Return the shared `{pk: instance}` map of the field's queryset after
+        loading whichever of `pks` it did not hold yet.
+        """
+        queryset = self.get_queryset()
+        key = get_queryset_key(queryset)
+        resolved = self.context.setdefault(RESOLVED_INSTANCES, {})
+        instances = resolved.setdefault(key, {})
+
+        pending = set(pks) - set(instances)
+        reference = get_reference_cache(queryset.model)
+        default_key = get_queryset_key(queryset.model._default_manager.all())
+        if pending and reference is not None and key == default_key:
+            # Writes validate against the rows, check they are current.
+            reference.refresh()
+            instances.update(reference.get_many(pending))
+            pending -= set(instances)
+        if pending:
+            for instance in queryset.filter(pk__in=pending):
+                instances[instance.pk] = instance
+        return instances
+
+    def to_internal_values(self, data):
+        pks = [self.to_pk(item) for item in data]
+        instances = self.resolve(pks)
+
+        missing = [str(pk) for pk in pks if pk not in instances]
+        if len(missing) == 1:
+            self.fail('does_not_exist', pk_value=missing[0])
+        if missing:
+            self.fail('does_not_exist_many', pk_values=', '.join(
+                '"{}"'.format(pk) for pk in missing))
+        return [instances[pk] for pk in pks]
+
+    def to_internal_value(self, data):
+        return self.to_internal_values([data])[0]
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return self.child_relation.to_internal_values(data)
+
+
+def get_batched_relation(field):
+    if isinstance(field, BatchedManyRelatedField):
+        return field.child_relation, True
+    if isinstance(field, BatchedPrimaryKeyRelatedField):
+        return field, False
+    return None, False
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    """
+    Loads the rows referenced by every item's batched related fields with one
+    query per field before the items are validated one by one.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.resolve_related(data)
+        return super(BatchedListSerializer, self).to_internal_value(data)
+
+    def resolve_related(self, data):
+        for field in self.child.fields.values():
+            relation, many = get_batched_relation(field)
+            if relation is None or field.read_only:
+                continue
+
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict) or field.field_name not in item:
+                    continue
+                values = item[field.field_name]
+                if not many:
+                    values = [values]
+                elif isinstance(values, str) or \
+                        not hasattr(values, '__iter__'):
+                    continue
+                for value in values:
+                    if value is None:
+                        continue
+                    try:
+                        pks.add(relation.to_pk(value))
+                    except (serializers.ValidationError, TypeError):
+                        # Reported when the item itself is validated.
+                        continue
+            if pks:
+                relation.resolve(pks)
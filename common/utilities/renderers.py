@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULTS = {
+    'ENCODER': 'auto',
+}
+
+AUTO = 'auto'
+ORJSON = 'orjson'
+STDLIB = 'json'
+ENCODERS = (AUTO, ORJSON, STDLIB)
+
+
+def get_json_renderer_setting(name):
+    return getattr(settings, 'JSON_RENDERER', {}).get(name, DEFAULTS[name])
+
+
+def get_encoder(name=None):
+    """
+    The encoder to use for `name`, by default `JSON_RENDERER['ENCODER']`:
+    `auto` picks orjson when it is installed and the stdlib otherwise.
+    """
+    name = name or get_json_renderer_setting('ENCODER')
+    if name not in ENCODERS:
+        raise ImproperlyConfigured(
+            "JSON_RENDERER['ENCODER'] must be one of {}, not {!r}".format(
+                ', '.join(ENCODERS), name))
+    if name == AUTO:
+        return ORJSON if orjson is not None else STDLIB
+    if name == ORJSON and orjson is None:
+        raise ImproperlyConfigured(
+            "JSON_RENDERER['ENCODER'] is orjson, which is not installed")
+    return name
+
+
+# DRF's encoder for the types orjson does not know.
+default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` that encodes with orjson when it is installed, natively
+    handling `OrderedDict` payloads, UUIDs, datetimes, dates and times,
+    written as DRF's encoder writes them. The types only DRF's encoder
+    knows, such as `Decimal` and lazy strings, go through its `default`.
+
+    Indented output, `UNICODE_JSON = False`, `COMPACT_JSON = False` and
+    payloads orjson rejects, such as integers beyond 64 bits or non string
+    keys, are rendered with the standard library as `JSONRenderer` does.
+    Unlike it, orjson writes NaN and infinities as `null`, even where
+    `STRICT_JSON` would have the standard library raise `ValueError`.
+
+    Set `encoder` on a subclass to override `JSON_RENDERER['ENCODER']`.
+    """
+    encoder = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        renderer_context = renderer_context or {}
+        if get_encoder(self.encoder) != ORJSON or self.ensure_ascii or \
+                not self.compact or self.get_indent(
+                    accepted_media_type, renderer_context) is not None:
+            return super(FastJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=default, option=orjson.OPT_UTC_Z)
+        except TypeError:
+            return super(FastJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, as JSONRenderer does.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from common.utilities.generations import get_generations
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'SCOPE': 'user',
+}
+
+
+def get_response_cache_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def normalize_query(query_params):
+    """
+    Query parameters sorted by name and value, so `?a=1&b=2` and `?b=2&a=1`
+    share a cache entry.
+    """
+    return '&'.join(
+        '{}={}'.format(name, value)
+        for name in sorted(query_params)
+        for value in sorted(query_params.getlist(name))
+    )
+
+
+def get_response_cache_key(prefix, scope, path, query_params, generations):
+    digest = hashlib.sha1('\n'.join([
+        path,
+        normalize_query(query_params),
+        ','.join(
+            '{}={}'.format(label, generations[label])
+            for label in sorted(generations)),
+    ]).encode('utf-8')).hexdigest()
+    return 'response:{}:{}:{}'.format(prefix, scope, digest)
+
+
+class ResponseCache(object):
+    """
+    Rendered responses stored in the `RESPONSE_CACHE['ALIAS']` cache under
+    keys that include the generations of every model in the output.
+
+    A write bumps its model's generation, so the next read builds a new key
+    and the old entry ages out on its own. Point the alias at a shared
+    backend such as memcached to share entries between workers; a local
+    memory backend keeps them per worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def cache(self):
+        return caches[get_response_cache_setting('ALIAS')]
+
+    def get_key(self, prefix, scope, request, models):
+        return get_response_cache_key(
+            prefix, scope, request.path, request.query_params,
+            get_generations(models))
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, entry, timeout=None):
+        if timeout is None:
+            timeout = get_response_cache_setting('TIMEOUT')
+        self.cache.set(key, entry, timeout)
+        with self._lock:
+            self.stores += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
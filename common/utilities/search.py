@@ -0,0 +1,103 @@
+import re
+from functools import reduce
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'simple'
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class PrefixSearchQuery(SearchQuery):
+    """
+    A `tsquery` matching every word in `value` as a prefix, so `ama wan`
+    finds "Amani Wanjiru". Only word characters reach `to_tsquery`, which
+    keeps user input from being read as tsquery operators.
+    """
+
+    def __init__(self, value, **kwargs):
+        terms = TERM_PATTERN.findall(value)
+        kwargs.setdefault('config', SEARCH_CONFIG)
+        super(PrefixSearchQuery, self).__init__(
+            ' & '.join('{}:*'.format(term) for term in terms), **kwargs)
+
+    function = 'to_tsquery'
+
+    def as_sql(self, compiler, connection):
+        # `SearchQuery.as_sql` with `to_tsquery` for `plainto_tsquery`,
+        # which would read `:*` as text.
+        params = [self.value]
+        if self.config:
+            config_sql, config_params = compiler.compile(self.config)
+            template = '{}({}::regconfig, %s)'.format(
+                self.function, config_sql)
+            params = config_params + [self.value]
+        else:
+            template = '{}(%s)'.format(self.function)
+        if self.invert:
+            template = '!!({})'.format(template)
+        return template, params
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Search with `?q=` (`SEARCH_PARAM`) on views that declare:
+
+        search_vector_field: a trigger maintained `tsvector` column, matched
+            by word prefix
+        search_trigram_fields: columns matched by trigram similarity, which
+            catches misspellings
+
+    Matches are ordered by relevance unless the client asked for an
+    explicit `ordering`. Views without these attributes are left alone.
+    Other databases fall back to `icontains` on the trigram fields.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    rank_annotation = 'search_rank'
+
+    def get_search_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        vector_field = getattr(view, 'search_vector_field', None)
+        trigram_fields = getattr(view, 'search_trigram_fields', ())
+        search = self.get_search_terms(request)
+
+        if not search or not (vector_field or trigram_fields):
+            return queryset
+
+        if connection.vendor != 'postgresql':
+            return queryset.filter(reduce(lambda a, b: a | b, [
+                Q(**{'{}__icontains'.format(field): search})
+                for field in trigram_fields
+            ]))
+
+        conditions = []
+        ranks = []
+        if vector_field and TERM_PATTERN.search(search):
+            query = PrefixSearchQuery(search)
+            conditions.append(Q(**{vector_field: query}))
+            ranks.append(SearchRank(F(vector_field), query))
+        for field in trigram_fields:
+            conditions.append(Q(**{'{}__trigram_similar'.format(field): search}))
+            ranks.append(TrigramSimilarity(field, search))
+
+        if not conditions:
+            return queryset.none()
+
+        queryset = queryset.filter(reduce(lambda a, b: a | b, conditions))
+
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+
+        rank = ranks[0] if len(ranks) == 1 else Greatest(*ranks)
+        ordering = queryset.model._meta.ordering or ()
+        return queryset.annotate(**{self.rank_annotation: rank}).order_by(
+            '-{}'.format(self.rank_annotation), *ordering)
@@ -0,0 +1,212 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    PKOnlyObject,
+    PrimaryKeyRelatedField,
+)
+
+from common.utilities.prefetch import (
+    apply_related_lookups,
+    get_related_lookups,
+)
+
+COLUMN = 'column'
+PK = 'pk'
+NESTED = 'nested'
+MANY = 'many'
+
+
+def get_to_many_lookup(model_field):
+    """The lookup from the related model back to the owner of a to-many."""
+    if model_field.many_to_many and model_field.concrete:
+        return model_field.related_query_name()
+    return model_field.field.name
+
+
+class InstanceReader(object):
+    """
+    Renders rows of `model` with the serializer itself, for nested
+    serializers `ValuesReader` cannot read. Rows are still fetched in one
+    batch per request.
+    """
+
+    def __init__(self, serializer, model):
+        self.serializer = serializer
+        self.model = model
+
+    def represent_pks(self, pks, manager=None):
+        manager = manager or self.model._base_manager
+        queryset = apply_related_lookups(
+            manager.filter(pk__in=pks),
+            get_related_lookups(self.serializer, self.model))
+        return {
+            instance.pk: self.serializer.to_representation(instance)
+            for instance in queryset
+        }
+
+
+class ValuesReader(object):
+    """
+    Produces the output of a read only `ModelSerializer` from `values()`
+    rows instead of model instances.
+
+    Every field must read a column of `model`, a forward relation with a
+    primary key or nested serializer, or a to-many relation with a nested
+    serializer or primary keys. Nested rows are loaded once per distinct
+    primary key with a batched query per relation, and stitched into the
+    rows that point at them.
+
+    Use `get_reader` to build one; it returns `None` for serializers that
+    cannot be read this way.
+    """
+
+    def __init__(self, serializer, model, entries, columns):
+        self.serializer = serializer
+        self.model = model
+        self.entries = entries
+        self.columns = columns
+
+    def get_queryset(self, queryset, extra_columns=()):
+        """
+        `queryset` as the `values()` rows `represent` expects, with
+        `extra_columns` for callers that read more of the row, such as a
+        paginator.
+        """
+        columns = self.columns + [
+            column for column in extra_columns if column not in self.columns]
+        return queryset.select_related(None).prefetch_related(None).values(
+            *columns)
+
+    def represent_pks(self, pks, manager=None):
+        manager = manager or self.model._base_manager
+        rows = list(self.get_queryset(manager.filter(pk__in=pks)))
+        pk_name = self.model._meta.pk.name
+        return dict(zip(
+            (row[pk_name] for row in rows), self.represent(rows)))
+
+    def represent(self, rows):
+        """Render `values()` rows as `serializer.to_representation` would."""
+        pk_name = self.model._meta.pk.name
+        resolved = {}
+        for name, kind, field, source, related in self.entries:
+            if kind == NESTED:
+                pks = {row[source] for row in rows} - {None}
+                resolved[name] = related.represent_pks(pks) if pks else {}
+            elif kind == MANY:
+                resolved[name] = self.represent_many(
+                    [row[pk_name] for row in rows], field, source, related)
+
+        data = []
+        for row in rows:
+            item = OrderedDict()
+            for name, kind, field, source, related in self.entries:
+                if kind == MANY:
+                    item[name] = resolved[name].get(row[pk_name], [])
+                    continue
+                value = row[source]
+                if value is None:
+                    item[name] = None
+                elif kind == COLUMN:
+                    item[name] = field.to_representation(value)
+                elif kind == PK:
+                    item[name] = field.to_representation(PKOnlyObject(value))
+                else:
+                    item[name] = resolved[name].get(value)
+            data.append(item)
+        return data
+
+    def represent_many(self, pks, field, model_field, related):
+        """`{owner pk: [nested output]}` for a to-many relation."""
+        related_model = model_field.related_model
+        lookup = get_to_many_lookup(model_field)
+        pk_name = related_model._meta.pk.name
+        # Same manager and ordering as the prefetch of the normal path.
+        queryset = related_model._default_manager.filter(**{
+            lookup + '__in': pks})
+
+        if isinstance(related, ValuesReader):
+            # Owner and nested columns in one query, each distinct row
+            # rendered once.
+            rows = list(queryset.values(lookup, *related.columns))
+            pairs = [(row[lookup], row[pk_name]) for row in rows]
+            distinct = OrderedDict((row[pk_name], row) for row in rows)
+            rendered = dict(zip(
+                distinct, related.represent(list(distinct.values()))))
+        else:
+            pairs = list(queryset.values_list(lookup, 'pk'))
+            targets = {pk for _, pk in pairs}
+            if related is None:
+                child = field.child_relation
+                rendered = {pk: child.to_representation(PKOnlyObject(pk))
+                            for pk in targets}
+            else:
+                rendered = related.represent_pks(
+                    targets, related_model._base_manager) if targets else {}
+
+        grouped = {}
+        for owner, pk in pairs:
+            if pk in rendered:
+                grouped.setdefault(owner, []).append(rendered[pk])
+        return grouped
+
+
+def _get_entry(field, model):
+    """
+    `(kind, field, source, related_reader)` for a readable field, or
+    `None` when it cannot be read from `values()`. `source` is the column
+    to read, or the model field of a to-many relation.
+    """
+    if field.source == '*' or len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+
+    if model_field.many_to_many or model_field.one_to_many:
+        if isinstance(field, ManyRelatedField) and \
+                isinstance(field.child_relation, PrimaryKeyRelatedField):
+            return MANY, field, model_field, None
+        if isinstance(field, serializers.ListSerializer):
+            return MANY, field, model_field, get_reader(
+                field.child, model_field.related_model, nested=True)
+        return None
+
+    if not model_field.concrete:
+        return None
+    if not model_field.is_relation:
+        if isinstance(field, serializers.BaseSerializer):
+            return None
+        return COLUMN, field, model_field.name, None
+    if isinstance(field, PrimaryKeyRelatedField):
+        return PK, field, model_field.name, None
+    if isinstance(field, serializers.BaseSerializer) and not getattr(
+            field, 'many', False):
+        return NESTED, field, model_field.name, get_reader(
+            field, model_field.related_model, nested=True)
+    return None
+
+
+def get_reader(serializer, model, nested=False):
+    """
+    A `ValuesReader` for `serializer` on `model`. When a field cannot be
+    read from `values()` this is `None`, or for a nested serializer an
+    `InstanceReader` so the rest of the output still takes the fast path.
+    """
+    entries = []
+    columns = [model._meta.pk.name]
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        entry = _get_entry(field, model)
+        if entry is None:
+            return InstanceReader(serializer, model) if nested else None
+        kind, field, source, related = entry
+        if kind != MANY and source not in columns:
+            columns.append(source)
+        entries.append((name, kind, field, source, related))
+    return ValuesReader(serializer, model, entries, columns)
@@ -1,3 +1,389 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
 
-# Create your views here.
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.viewsets import ModelViewSet
+
+from common.utilities.conditional import (
+	VERSION_FIELD,
+	get_detail_validators,
+	get_generation_validators,
+	get_list_validators,
+	has_version_field,
+)
+from common.utilities.counts import EXACT
+from common.utilities.exports import (
+	EXPORT_FORMATS,
+	EXPORT_RENDERERS,
+	export_response,
+)
+from common.utilities.fieldsets import (
+	apply_fieldset,
+	parse_fieldset,
+)
+from common.utilities.prefetch import (
+	get_projection,
+	get_related_lookups,
+	get_related_models,
+	apply_related_lookups,
+)
+from common.utilities.values import get_reader
+from common.utilities.response_cache import (
+	get_response_cache,
+	get_response_cache_setting,
+)
+
+
+class RelatedLookupsMixin(object):
+	"""
+	Adds the `select_related`/`prefetch_related` calls the active serializer
+	needs to the queryset, so that a list page costs a fixed number of
+	queries whatever its size. When the serializer was narrowed to a sparse
+	fieldset the queryset, prefetches included, also loads only the columns
+	the remaining fields read.
+
+	The lookups are worked out once per serializer class and fieldset.
+	"""
+	related_lookups_actions = ('list', 'retrieve')
+
+	_related_lookups_cache = {}
+	_projection_cache = {}
+
+	def get_related_lookups(self, model, serializer=None):
+		if serializer is None:
+			serializer = self.get_serializer()
+		key = (
+			type(serializer), model,
+			getattr(serializer, 'sparse_fieldset', None))
+		lookups = self._related_lookups_cache.get(key)
+		if lookups is None:
+			lookups = get_related_lookups(serializer, model)
+			self._related_lookups_cache[key] = lookups
+		return lookups
+
+	def get_projection_columns(self, model):
+		"""
+		Columns loaded whatever the fieldset: the version field the
+		conditional validators read and the default ordering the cursor
+		paginator reads.
+		"""
+		columns = [
+			field.lstrip('-') for field in model._meta.ordering or []
+			if field.lstrip('-') != '?']
+		if has_version_field(model):
+			columns.append(VERSION_FIELD)
+		return columns
+
+	def get_projection(self, model, serializer):
+		key = (type(serializer), model, serializer.sparse_fieldset)
+		projection = self._projection_cache.get(key)
+		if projection is None:
+			columns, prefetch_projections = get_projection(serializer, model)
+			columns.update(self.get_projection_columns(model))
+			projection = (columns, prefetch_projections)
+			self._projection_cache[key] = projection
+		return projection
+
+	def get_queryset(self):
+		queryset = super(RelatedLookupsMixin, self).get_queryset()
+		if getattr(self, 'action', None) in self.related_lookups_actions:
+			serializer = self.get_serializer()
+			projection = None
+			if getattr(serializer, 'sparse_fieldset', None):
+				projection = self.get_projection(queryset.model, serializer)
+			queryset = apply_related_lookups(
+				queryset,
+				self.get_related_lookups(queryset.model, serializer),
+				projection)
+		return queryset
+
+
+class SparseFieldsetMixin(object):
+	"""
+	Lets list and retrieve clients choose the fields of the output with
+	`?fields=` or drop some with `?omit=`, both comma separated with dots
+	for nested fields, e.g. `?fields=id,first_name,student_class.name`.
+
+	The serializer is pruned before it is used, so `RelatedLookupsMixin`
+	drops the joins and prefetches of nested fields nobody asked for and
+	leaves unread columns out of the query.
+	"""
+	sparse_fieldset_actions = ('list', 'retrieve')
+	fields_query_param = 'fields'
+	omit_query_param = 'omit'
+
+	def get_sparse_fieldset(self):
+		"""The parsed `(fields, omit)` trees of the request."""
+		if getattr(self, 'action', None) not in self.sparse_fieldset_actions:
+			return None, None
+		params = self.request.query_params
+		return (
+			parse_fieldset(params.get(self.fields_query_param, '')),
+			parse_fieldset(params.get(self.omit_query_param, '')),
+		)
+
+	def get_serializer(self, *args, **kwargs):
+		serializer = super(SparseFieldsetMixin, self).get_serializer(
+			*args, **kwargs)
+		fields, omit = self.get_sparse_fieldset()
+		if fields or omit:
+			apply_fieldset(
+				serializer, fields, omit,
+				fields_param=self.fields_query_param,
+				omit_param=self.omit_query_param)
+		return serializer
+
+
+class ValuesListMixin(object):
+	"""
+	Opt-in fast path for `list`: with `values_list = True` the page is read
+	with `values()` and rendered by a `ValuesReader`, which gives the same
+	output as the list serializer without building model instances or
+	running every field's `get_attribute`. Nested rows are loaded once per
+	distinct primary key.
+
+	Serializers the reader cannot handle fall back to the normal path.
+	"""
+	values_list = False
+
+	_values_reader_cache = {}
+
+	def get_values_reader(self, model):
+		serializer = self.get_serializer()
+		key = (
+			type(serializer), model,
+			getattr(serializer, 'sparse_fieldset', None))
+		if key not in self._values_reader_cache:
+			self._values_reader_cache[key] = get_reader(serializer, model)
+		return self._values_reader_cache[key]
+
+	def list(self, request, *args, **kwargs):
+		reader = None
+		if self.values_list:
+			reader = self.get_values_reader(self.queryset.model)
+		if reader is None:
+			return super(ValuesListMixin, self).list(request, *args, **kwargs)
+
+		queryset = self.filter_queryset(self.get_queryset())
+		queryset = reader.get_queryset(
+			queryset, self.get_projection_columns(queryset.model))
+		page = self.paginate_queryset(queryset)
+		if page is not None:
+			return self.get_paginated_response(reader.represent(page))
+		return Response(reader.represent(list(queryset)))
+
+
+class ExportMixin(object):
+	"""
+	Adds a `GET export/` action that streams every row matching the view's
+	filters as CSV (default) or NDJSON, chosen with `?output=` or an
+	`Accept: text/csv` or `application/x-ndjson` header.
+
+	Rows are read through a server-side cursor in chunks of
+	`EXPORT['CHUNK_SIZE']` and rendered with `export_serializer_class`, so
+	worker memory does not grow with the number of rows.
+	"""
+	export_serializer_class = None
+	export_format_query_param = 'output'
+
+	def get_renderers(self):
+		renderers = super(ExportMixin, self).get_renderers()
+		if self.action == 'export':
+			renderers.extend(renderer() for renderer in EXPORT_RENDERERS)
+		return renderers
+
+	def get_export_format(self, request):
+		export_format = request.query_params.get(
+			self.export_format_query_param)
+		if export_format is not None:
+			return export_format
+		accepted = getattr(request, 'accepted_renderer', None)
+		if accepted is not None and accepted.format in EXPORT_FORMATS:
+			return accepted.format
+		return 'csv'
+
+	@action(detail=False, methods=['get'])
+	def export(self, request, *args, **kwargs):
+		export_format = self.get_export_format(request)
+		if export_format not in EXPORT_FORMATS:
+			raise ValidationError({
+				self.export_format_query_param: [
+					'Choose one of {}'.format(', '.join(sorted(EXPORT_FORMATS)))
+				]
+			})
+
+		queryset = self.filter_queryset(self.get_queryset())
+		serializer = self.export_serializer_class(
+			context=self.get_serializer_context())
+
+		return export_response(
+			serializer,
+			queryset,
+			self.get_related_lookups(queryset.model, serializer),
+			export_format,
+			'{}-export'.format(self.basename),
+		)
+
+
+class ConditionalGetMixin(object):
+	"""
+	Answers `If-None-Match`/`If-Modified-Since` on list and retrieve with a
+	`304 Not Modified` before anything is serialized, and sends `ETag` and
+	`Last-Modified` on full responses.
+
+	List validators come from the filtered row count and latest
+	`updated_at`, detail validators from the row's `updated_at`. Both also
+	cover the latest `updated_at` of the models nested in the output, so a
+	renamed class changes the validators of its students. Nested models
+	without `updated_at`, such as the class teacher, are covered by their
+	generations instead and the response has no `Last-Modified`. Lists
+	never have one, as a row leaving the list does not move any timestamp.
+
+	The list validators' row count is handed to the paginator as
+	`filtered_count`. Under a count strategy other than `exact` the list
+	validators come from the models' generations instead, so no rows are
+	counted at all.
+	"""
+	filtered_count = None
+
+	def get_validator_key(self):
+		return self.request.get_full_path()
+
+	def get_nested_models(self, model):
+		return get_related_models(model, self.get_related_lookups(model))
+
+	def counts_exactly(self, request):
+		paginator = self.paginator
+		if paginator is None or not hasattr(paginator, 'get_count_strategy'):
+			return True
+		return paginator.get_count_strategy(request, self) == EXACT
+
+	def list(self, request, *args, **kwargs):
+		queryset = self.filter_queryset(self.get_queryset())
+		nested = self.get_nested_models(queryset.model)
+		if self.counts_exactly(request):
+			validators = get_list_validators(
+				queryset, nested, key=self.get_validator_key())
+			self.filtered_count = validators.count
+		else:
+			validators = get_generation_validators(
+				[queryset.model] + sorted(
+					nested, key=lambda model: model._meta.label_lower),
+				key=self.get_validator_key())
+
+		response = get_conditional_response(
+			request, etag=validators.etag,
+			last_modified=validators.last_modified_timestamp)
+		if response is None:
+			response = super(ConditionalGetMixin, self).list(
+				request, *args, **kwargs)
+		return validators.apply(response)
+
+	def retrieve(self, request, *args, **kwargs):
+		instance = self.get_object()
+		validators = get_detail_validators(
+			instance, self.get_nested_models(type(instance)),
+			key=self.get_validator_key())
+
+		response = get_conditional_response(
+			request, etag=validators.etag,
+			last_modified=validators.last_modified_timestamp)
+		if response is None:
+			serializer = self.get_serializer(instance)
+			response = Response(serializer.data)
+		return validators.apply(response)
+
+
+class ResponseCacheMixin(object):
+	"""
+	Serves list and retrieve from the response cache. Entries are keyed by
+	the user scope, URL and sorted query string and by the generations of
+	the view's model and the models nested in its output, so any write to
+	those models makes the next read build a fresh response.
+
+	Only JSON responses are cached. Set `response_cache_timeout` to
+	override `RESPONSE_CACHE['TIMEOUT']` for a view.
+	"""
+	response_cache_actions = ('list', 'retrieve')
+	response_cache_formats = ('json',)
+	response_cache_timeout = None
+
+	_response_cache_key = None
+
+	def get_response_cache_scope(self):
+		if get_response_cache_setting('SCOPE') == 'shared':
+			return 'shared'
+		return 'user-{}'.format(self.request.user.pk)
+
+	def get_response_cache_models(self):
+		model = self.queryset.model
+		nested = get_related_models(model, self.get_related_lookups(model))
+		return [model] + sorted(nested, key=lambda m: m._meta.label_lower)
+
+	def use_response_cache(self, request):
+		renderer = getattr(request, 'accepted_renderer', None)
+		return (
+			get_response_cache_setting('ENABLED') and
+			request.method == 'GET' and
+			self.action in self.response_cache_actions and
+			renderer is not None and
+			renderer.format in self.response_cache_formats
+		)
+
+	def get_cached_response(self, request, handler, *args, **kwargs):
+		if not self.use_response_cache(request):
+			return handler(request, *args, **kwargs)
+
+		cache = get_response_cache()
+		key = cache.get_key(
+			'{}:{}'.format(self.basename, self.action),
+			self.get_response_cache_scope(),
+			request,
+			self.get_response_cache_models(),
+		)
+		entry = cache.get(key)
+		if entry is None:
+			self._response_cache_key = key
+			return handler(request, *args, **kwargs)
+
+		response = get_conditional_response(
+			request, etag=entry['etag'],
+			last_modified=parse_http_date_safe(entry['last_modified'] or ''))
+		if response is None:
+			response = HttpResponse(
+				entry['content'], content_type=entry['content_type'])
+		for header, name in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+			if entry[name]:
+				response[header] = entry[name]
+		return response
+
+	def list(self, request, *args, **kwargs):
+		return self.get_cached_response(
+			request, super(ResponseCacheMixin, self).list, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		return self.get_cached_response(
+			request, super(ResponseCacheMixin, self).retrieve, *args, **kwargs)
+
+	def finalize_response(self, request, response, *args, **kwargs):
+		response = super(ResponseCacheMixin, self).finalize_response(
+			request, response, *args, **kwargs)
+		if self._response_cache_key and isinstance(response, Response) and \
+				response.status_code == 200:
+			response.render()
+			get_response_cache().set(self._response_cache_key, {
+				'content': response.content,
+				'content_type': response['Content-Type'],
+				'etag': response.get('ETag'),
+				'last_modified': response.get('Last-Modified'),
+			}, timeout=self.response_cache_timeout)
+		return response
+
+
+class BaseViewSet(ResponseCacheMixin, ConditionalGetMixin, SparseFieldsetMixin,
+		ValuesListMixin, RelatedLookupsMixin, ModelViewSet):
+	def perform_create(self, serializer):
+		serializer.save(created_by=self.request.user)
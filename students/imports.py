@@ -0,0 +1,354 @@
+import csv
+import io
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from rest_framework import serializers
+
+from common.utilities.reference import get_reference_cache
+
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+
+CSV_LIST_SEPARATOR = ';'
+
+UPDATE_FIELDS = (
+	'first_name',
+	'last_name',
+	'date_of_birth',
+	'student_class_id',
+)
+
+
+def get_import_setting(name, default):
+	return getattr(settings, 'BULK_IMPORT', {}).get(name, default)
+
+
+def split_references(references):
+	"""
+	Split references into `(uuids, names)`, a reference being either a
+	primary key or a natural key such as a class name or subject code.
+	"""
+	uuids, names = set(), set()
+	for reference in references:
+		try:
+			uuids.add(uuid.UUID(reference))
+		except ValueError:
+			names.add(reference)
+	return uuids, names
+
+
+def flatten_errors(errors):
+	if isinstance(errors, dict):
+		errors = errors.values()
+	if isinstance(errors, (list, tuple)) or not isinstance(errors, str):
+		return [
+			message for error in errors for message in flatten_errors(error)
+		]
+	return [str(errors)]
+
+
+class StudentRowSerializer(serializers.Serializer):
+	"""
+	Shape checks for a single roster row. References are plain strings
+	here and are resolved for the whole roster at once.
+	"""
+	first_name = serializers.CharField(max_length=255)
+	last_name = serializers.CharField(max_length=255)
+	date_of_birth = serializers.DateField()
+	admission_number = serializers.CharField(
+		max_length=255, required=False, allow_null=True, allow_blank=True)
+	student_class = serializers.CharField()
+	subjects = serializers.ListField(
+		child=serializers.CharField(), allow_empty=False)
+
+
+class StudentRosterImport(object):
+	"""
+	Validate and write a roster of students in a fixed number of queries.
+
+	`student_class` may be a class id or name and each of `subjects` a
+	subject id or code. Classes and subjects are each resolved with a single
+	query, and students and their subject links are written with
+	`bulk_create` in chunks of `BULK_IMPORT['BATCH_SIZE']`.
+
+	With `upsert=True` rows whose `admission_number` matches an existing
+	student update that student, and replace its subjects, instead of
+	creating a new one.
+	"""
+
+	def __init__(self, rows, user, upsert=False, batch_size=None):
+		self.rows = rows
+		self.user = user
+		self.upsert = upsert
+		self.batch_size = batch_size or get_import_setting('BATCH_SIZE', 500)
+		self.errors = []
+		self.validated_rows = None
+
+	@classmethod
+	def from_csv(cls, upload, user, **kwargs):
+		"""
+		Build an import from a CSV upload with a header row. Multiple subjects
+		in a cell are separated by `;`.
+		"""
+		text = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+		rows = []
+		try:
+			for record in csv.DictReader(text):
+				# Short rows leave `None` in the missing cells.
+				row = {
+					key.strip(): ((value or '').strip() or None)
+					for key, value in record.items()
+					if key and not isinstance(value, list)
+				}
+				subjects = row.get('subjects') or ''
+				row['subjects'] = [
+					subject.strip()
+					for subject in subjects.split(CSV_LIST_SEPARATOR)
+					if subject.strip()
+				]
+				rows.append(row)
+		except UnicodeDecodeError:
+			raise serializers.ValidationError({
+				'file': ['The file is not UTF-8 encoded text.']})
+		except csv.Error as exc:
+			raise serializers.ValidationError({
+				'file': ['The file is not valid CSV: {}'.format(exc)]})
+		return cls(rows, user, **kwargs)
+
+	def add_error(self, row, pointer, message):
+		self.errors.append({
+			'row': row,
+			'pointer': pointer,
+			'message': message,
+		})
+
+	def is_valid(self):
+		self.errors = []
+		max_rows = get_import_setting('MAX_ROWS', 20000)
+
+		if not isinstance(self.rows, (list, tuple)):
+			self.add_error(None, 'non_field_errors', 'Expected a list of rows')
+			return False
+		if not self.rows:
+			self.add_error(None, 'non_field_errors', 'No rows to import')
+			return False
+		if len(self.rows) > max_rows:
+			self.add_error(
+				None, 'non_field_errors',
+				'A roster may not have more than {} rows'.format(max_rows))
+			return False
+
+		rows = []
+		for number, row in enumerate(self.rows, 1):
+			serializer = StudentRowSerializer(data=row)
+			if serializer.is_valid():
+				rows.append((number, serializer.validated_data))
+				continue
+			for field, errors in serializer.errors.items():
+				self.add_error(number, field, ' '.join(flatten_errors(errors)))
+
+		classes = self.resolve(
+			Class, 'name', [data['student_class'] for _, data in rows])
+		subjects = self.resolve(
+			Subject, 'code',
+			[subject for _, data in rows for subject in data['subjects']])
+		existing = self.resolve_existing(rows)
+
+		seen = set()
+		self.validated_rows = []
+		for number, data in rows:
+			student_class = classes.get(data['student_class'])
+			if student_class is None:
+				self.add_error(
+					number, 'student_class',
+					'Unknown class {}'.format(data['student_class']))
+			elif student_class is False:
+				self.add_error(
+					number, 'student_class',
+					'More than one class is named {}'.format(
+						data['student_class']))
+
+			missing = [
+				subject for subject in data['subjects']
+				if subject not in subjects
+			]
+			if missing:
+				self.add_error(
+					number, 'subjects',
+					'Unknown subjects {}'.format(', '.join(missing)))
+			ambiguous = [
+				subject for subject in data['subjects']
+				if subjects.get(subject) is False
+			]
+			if ambiguous:
+				self.add_error(
+					number, 'subjects',
+					'More than one subject has code {}'.format(
+						', '.join(ambiguous)))
+
+			admission_number = data.get('admission_number') or None
+			if admission_number:
+				if admission_number in seen:
+					self.add_error(
+						number, 'admission_number',
+						'Admission number {} appears more than once'.format(
+							admission_number))
+				seen.add(admission_number)
+
+			instance = existing.get(admission_number)
+			if instance is False:
+				self.add_error(
+					number, 'admission_number',
+					'More than one student has admission number {}'.format(
+						admission_number))
+
+			if not student_class or missing or ambiguous or \
+					instance is False:
+				continue
+
+			self.validated_rows.append({
+				'instance': instance,
+				'first_name': data['first_name'],
+				'last_name': data['last_name'],
+				'date_of_birth': data['date_of_birth'],
+				'admission_number': admission_number,
+				'student_class_id': student_class.pk,
+				'subject_ids': {
+					subjects[subject].pk for subject in data['subjects']},
+			})
+
+		# Shape errors are found before reference errors; report them in row
+		# order, keeping the order of the errors within a row.
+		self.errors.sort(key=lambda error: error['row'])
+		return not self.errors
+
+	def resolve(self, model, natural_key, references):
+		"""
+		Map each reference to its row, from the model's reference cache where
+		it has one and otherwise with a single query. A natural key shared
+		by more than one row maps to `False`.
+		"""
+		references = set(references)
+		uuids, names = split_references(references)
+		if not references:
+			return {}
+
+		by_key = {}
+		reference = get_reference_cache(model)
+		if reference is not None:
+			reference.refresh()
+			for pk in list(uuids):
+				instance = reference.get(pk)
+				if instance is not None:
+					by_key[pk] = instance
+					uuids.discard(pk)
+			for name in list(names):
+				matches = reference.filter_by(natural_key, name)
+				if matches:
+					by_key[name] = matches[0] if len(matches) == 1 else False
+					names.discard(name)
+
+		if uuids or names:
+			lookup = Q(pk__in=uuids) | Q(**{'{}__in'.format(natural_key): names})
+			for instance in model.objects.filter(lookup):
+				by_key[instance.pk] = instance
+				name = getattr(instance, natural_key)
+				if name not in names:
+					continue
+				current = by_key.get(name)
+				if current is None:
+					by_key[name] = instance
+				elif current is not False and current.pk != instance.pk:
+					by_key[name] = False
+
+		resolved = {}
+		for reference in references:
+			try:
+				key = uuid.UUID(reference)
+			except ValueError:
+				key = reference
+			if key in by_key:
+				resolved[reference] = by_key[key]
+		return resolved
+
+	def resolve_existing(self, rows):
+		"""
+		Map admission numbers to the students they belong to, or to `False`
+		when more than one student shares the number.
+		"""
+		if not self.upsert:
+			return {}
+
+		admission_numbers = {
+			data['admission_number'] for _, data in rows
+			if data.get('admission_number')
+		}
+		existing = {}
+		for student in Student.objects.filter(
+				admission_number__in=admission_numbers).only(
+				'id', 'admission_number'):
+			if student.admission_number in existing:
+				existing[student.admission_number] = False
+			else:
+				existing[student.admission_number] = student
+		return existing
+
+	@transaction.atomic
+	def save(self):
+		assert self.validated_rows is not None, (
+			'You must call `.is_valid()` before calling `.save()`.')
+		assert not self.errors, (
+			'You cannot call `.save()` on an import with invalid rows.')
+
+		created, updated = [], []
+		links = []
+		for row in self.validated_rows:
+			student = row['instance'] or Student(created_by=self.user)
+			for field in UPDATE_FIELDS + ('admission_number',):
+				setattr(student, field, row[field])
+			(updated if row['instance'] else created).append(student)
+			links.append((student, row['subject_ids']))
+
+		Student.objects.bulk_create(created, batch_size=self.batch_size)
+		self.bulk_update(updated)
+
+		Enrollment = Student.subjects.through
+		if updated:
+			Enrollment.objects.filter(
+				student_id__in=[student.pk for student in updated]).delete()
+		Enrollment.objects.bulk_create([
+			Enrollment(student_id=student.pk, subject_id=subject_id)
+			for student, subject_ids in links
+			for subject_id in subject_ids
+		], batch_size=self.batch_size)
+
+		return {
+			'created': len(created),
+			'updated': len(updated),
+		}
+
+	def bulk_update(self, students):
+		"""
+		Update `students` with one `UPDATE ... CASE` statement per chunk.
+		"""
+		now = timezone.now()
+		for start in range(0, len(students), self.batch_size):
+			chunk = students[start:start + self.batch_size]
+			values = {}
+			for field in UPDATE_FIELDS:
+				model_field = Student._meta.get_field(field)
+				output_field = getattr(model_field, 'target_field', model_field)
+				values[field] = Case(*[
+					When(pk=student.pk, then=Value(
+						getattr(student, field), output_field=output_field))
+					for student in chunk
+				], output_field=output_field)
+			Student.objects.filter(
+				pk__in=[student.pk for student in chunk]).update(
+				updated_at=now, **values)
@@ -0,0 +1,19 @@
+# Generated by Django 2.1.1 on 2026-10-18 07:14
+
+import common.utilities.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_student_subjects'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='id',
+            field=models.UUIDField(default=common.utilities.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Partial indexes for the rows `SoftDeletionManager` returns, matching the
+    default ordering (plus `id`, the cursor pagination tie-breaker) and the
+    `StudentFilter` lookups. `iexact` compiles to `UPPER(col::text) =
+    UPPER(%s)` on PostgreSQL, so the name indexes are on that expression.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('students', '0003_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_alive_ordering_idx '
+            'ON students_student (updated_at DESC, created_at DESC, id DESC) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_alive_ordering_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_alive_class_idx '
+            'ON students_student (student_class_id, updated_at DESC, '
+            'created_at DESC, id DESC) WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_alive_class_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_alive_admission_idx '
+            'ON students_student (admission_number) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_alive_admission_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_alive_first_name_idx '
+            'ON students_student (UPPER(first_name::text)) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_alive_first_name_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_alive_last_name_idx '
+            'ON students_student (UPPER(last_name::text)) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_alive_last_name_idx',
+        ),
+    ]
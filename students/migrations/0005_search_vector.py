@@ -0,0 +1,74 @@
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Add a trigger maintained `search_vector` for prefix full-text search,
+    and GIN indexes on it and, with pg_trgm, on the name and admission number
+    columns.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('students', '0004_alive_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='student',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION students_student_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.first_name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.last_name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.admission_number, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER students_student_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF first_name, last_name, admission_number
+            ON students_student FOR EACH ROW EXECUTE PROCEDURE students_student_search_vector_update();
+
+            UPDATE students_student SET search_vector =
+                setweight(to_tsvector('simple', coalesce(first_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(last_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(admission_number, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS students_student_search_vector_trigger ON students_student;
+            DROP FUNCTION IF EXISTS students_student_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_search_vector_idx '
+            'ON students_student USING gin (search_vector) WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_search_vector_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_first_name_trgm_idx '
+            'ON students_student USING gin (first_name gin_trgm_ops) WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_first_name_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_last_name_trgm_idx '
+            'ON students_student USING gin (last_name gin_trgm_ops) WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_last_name_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS students_student_admission_number_trgm_idx '
+            'ON students_student USING gin (admission_number gin_trgm_ops) WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS students_student_admission_number_trgm_idx',
+        ),
+    ]
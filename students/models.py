@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from common.models import AbstractBase
@@ -27,6 +28,8 @@ class Student(AbstractBase):
 		Subject,
 		related_name='students'
 	)
+	# Maintained by a database trigger, see migration 0005.
+	search_vector = SearchVectorField(null=True, editable=False)
 
 	def __str__(self):
 		full_name = self.full_name
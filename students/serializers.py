@@ -1,13 +1,21 @@
 from rest_framework import serializers
 
+from common.utilities.relations import (
+	BatchedListSerializer,
+	BatchedPrimaryKeyRelatedField,
+)
+
 from students.models import Student
 
 from classes.serializers import ClassInlineSerializer
 from subjects.serializers import SubjectInlineSerializer
 
 class StudentSerializer(serializers.ModelSerializer):
+	serializer_related_field = BatchedPrimaryKeyRelatedField
+
 	class Meta:
 		model = Student
+		list_serializer_class = BatchedListSerializer
 		fields = (
 			'id',
 			'first_name',
@@ -61,4 +69,27 @@ class StudentInlineSerializer(serializers.ModelSerializer):
 			'admission_number',
 			'student_class',
 			'subjects'
-		)
\ No newline at end of file
+		)
+
+
+class StudentExportSerializer(serializers.ModelSerializer):
+	student_class = serializers.CharField(
+		source='student_class.name', read_only=True)
+	class_teacher = serializers.CharField(
+		source='student_class.class_teacher.full_name', read_only=True,
+		default=None)
+	subjects = serializers.SlugRelatedField(
+		slug_field='code', many=True, read_only=True)
+
+	class Meta:
+		model = Student
+		fields = (
+			'id',
+			'first_name',
+			'last_name',
+			'date_of_birth',
+			'admission_number',
+			'student_class',
+			'class_teacher',
+			'subjects',
+		)
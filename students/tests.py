@@ -1,3 +1,429 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from common.benchmarks.budgets import EndpointBudgetMixin
+from common.benchmarks.endpoints import Budget
+from common.utilities.generations import bump_generation
+from common.utilities.reference import get_reference_caches
+
+from classes.models import Class
+from subjects.models import Subject
+from students.models import Student
+from students.views import StudentViewSet
+from users.models import User
+
+RESPONSE_CACHE_DISABLED = dict(settings.RESPONSE_CACHE, ENABLED=False)
+
+
+class StudentEndpointBudgetTest(EndpointBudgetMixin, TestCase):
+	"""Query budgets of the student endpoints."""
+	app_label = 'students'
+	# The list takes the `values()` path, which reads each nested relation
+	# with its own batched query.
+	budgets = {
+		('student-list', 'list'): Budget(queries=5, time_ms=1000),
+		('student-list', 'create'): Budget(queries=5, time_ms=150),
+		('student-detail', 'retrieve'): Budget(queries=3, time_ms=100),
+		('student-detail', 'update'): Budget(queries=4, time_ms=500),
+		('student-detail', 'partial_update'): Budget(queries=3, time_ms=100),
+		('student-detail', 'destroy'): Budget(queries=2, time_ms=100),
+		('student-bulk', 'bulk'): Budget(queries=8, time_ms=1000),
+		('student-export', 'export'): Budget(queries=3, time_ms=5000),
+	}
+	sparse_fields = {
+		'student-list': 'id,first_name,last_name,admission_number',
+	}
+
+
+class StudentListTestCase(TestCase):
+	"""A class of students, with a client signed in as their teacher."""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_user(
+			'lister', 'Lister', phone_number='+254722000300',
+			password='lister-pass')
+		cls.student_class = Class.objects.create(
+			name='4A', class_teacher=cls.user, created_by=cls.user)
+		cls.subjects = [
+			Subject.objects.create(
+				name='Mathematics', code='MAT', created_by=cls.user),
+			Subject.objects.create(
+				name='English', code='ENG', created_by=cls.user),
+		]
+		for number in range(7):
+			cls.create_student(number)
+
+	@classmethod
+	def create_student(cls, number):
+		student = Student.objects.create(
+			first_name='Student', last_name=str(number),
+			date_of_birth=datetime.date(2010, 1, 1),
+			admission_number='L{}'.format(number),
+			student_class=cls.student_class, created_by=cls.user)
+		student.subjects.set(cls.subjects[:number % 2 + 1])
+		return student
+
+	def setUp(self):
+		self.client = APIClient()
+		self.client.credentials(
+			HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+		self.url = reverse('student-list')
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class StudentCursorPaginationTest(StudentListTestCase):
+	"""`?pagination=cursor` walks the list without skipping or repeating."""
+
+	def get_page(self, url, params=None):
+		response = self.client.get(url, params)
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def ids(self, page):
+		return [student['id'] for student in page['results']]
+
+	def test_pages_are_stable_across_inserts(self):
+		expected = [str(pk) for pk in Student.objects.values_list(
+			'pk', flat=True)]
+
+		page = self.get_page(
+			self.url, {'pagination': 'cursor', 'page_size': 3})
+		seen = self.ids(page)
+		# A new student sorts first and must not push rows into later pages.
+		self.create_student(99)
+		while page['next']:
+			page = self.get_page(page['next'])
+			seen.extend(self.ids(page))
+
+		self.assertEqual(seen, expected)
+
+	def test_previous_returns_the_same_page(self):
+		first = self.get_page(
+			self.url, {'pagination': 'cursor', 'page_size': 3})
+		second = self.get_page(first['next'])
+		self.assertEqual(self.ids(self.get_page(second['previous'])),
+			self.ids(first))
+
+	def test_cursor_cannot_be_reordered_or_searched(self):
+		for param in ('ordering', 'q'):
+			with self.subTest(param=param):
+				response = self.client.get(self.url, {
+					'pagination': 'cursor', param: 'first_name'})
+				self.assertEqual(response.status_code, 400)
+				self.assertEqual(
+					response.data['errors'][0]['pointer'], param)
+
+	def test_invalid_cursor_is_a_404(self):
+		response = self.client.get(self.url, {'cursor': 'garbage'})
+		self.assertEqual(response.status_code, 404)
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class StudentSparseFieldsetTest(StudentListTestCase):
+	"""`?fields=` and `?omit=` prune the output or answer a 400."""
+
+	def test_selects_nested_fields(self):
+		response = self.client.get(self.url, {
+			'fields': 'first_name,student_class.name'})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data['results'][0], {
+			'first_name': 'Student', 'student_class': {'name': '4A'}})
+
+	def test_unknown_fields_are_a_400(self):
+		for param, value in (
+				('fields', 'nickname'),
+				('fields', 'student_class.nickname'),
+				('fields', 'first_name.initial'),
+				('omit', 'nickname')):
+			with self.subTest(**{param: value}):
+				for url in (self.url, reverse('student-detail', kwargs={
+						'pk': Student.objects.first().pk})):
+					response = self.client.get(url, {param: value})
+					self.assertEqual(response.status_code, 400)
+					self.assertEqual(
+						response.data['errors'][0]['pointer'], param)
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class StudentValuesListTest(StudentListTestCase):
+	"""The `values()` list path renders exactly what the serializer does."""
+
+	def get_list(self, params):
+		response = self.client.get(self.url, params)
+		self.assertEqual(response.status_code, 200)
+		return response.json()
+
+	def test_matches_serializer_output(self):
+		for params in ({}, {'fields': 'id,subjects.code'},
+				{'omit': 'student_class.class_teacher'},
+				{'fields': 'last_name,student_class.class_teacher.full_name'},
+				{'pagination': 'cursor', 'page_size': 3}):
+			with self.subTest(params=params):
+				values = self.get_list(params)
+				with mock.patch.object(StudentViewSet, 'values_list', False):
+					serialized = self.get_list(params)
+				self.assertEqual(values, serialized)
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class StudentCountStrategyTest(StudentListTestCase):
+	"""`?count=` picks how page mode counts, and says when it estimated."""
+
+	def setUp(self):
+		super(StudentCountStrategyTest, self).setUp()
+		# Counts cached by earlier runs sit under the same SQL.
+		bump_generation(Student)
+
+	def get_page(self, count):
+		response = self.client.get(self.url, {'count': count, 'page_size': 3})
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def test_cached_until_the_generation_moves_on(self):
+		page = self.get_page('cached')
+		self.assertEqual(
+			(page['count'], page['approximate_count']), (7, False))
+
+		# A write that bumps nothing is not counted...
+		QuerySet.update(
+			Student.objects.filter(admission_number='L0'),
+			deleted_at=timezone.now())
+		self.assertEqual(self.get_page('cached')['count'], 7)
+		# ...until its commit bumps the generation.
+		bump_generation(Student)
+		self.assertEqual(self.get_page('cached')['count'], 6)
+
+	def test_estimate_above_the_threshold(self):
+		with mock.patch(
+				'common.utilities.counts.get_planner_estimate',
+				return_value=250000):
+			page = self.get_page('estimate')
+		self.assertEqual(
+			(page['count'], page['approximate_count']), (250000, True))
+		self.assertIsNotNone(page['next'])
+
+	def test_estimate_below_the_threshold_counts(self):
+		for estimate in (5, None):
+			with self.subTest(estimate=estimate):
+				with mock.patch(
+						'common.utilities.counts.get_planner_estimate',
+						return_value=estimate):
+					page = self.get_page('estimate')
+				self.assertEqual(
+					(page['count'], page['approximate_count']), (7, False))
+
+	def test_none_omits_the_count(self):
+		page = self.get_page('none')
+		self.assertEqual(
+			(page['count'], page['approximate_count'], page['total_pages']),
+			(None, False, None))
+		self.assertIsNotNone(page['next'])
+
+
+class StudentExportTest(StudentListTestCase):
+	"""`GET /api/students/export/` streams the filtered rows."""
+
+	def setUp(self):
+		super(StudentExportTest, self).setUp()
+		self.url = reverse('student-export')
+
+	def export(self, params=None, **headers):
+		response = self.client.get(self.url, params, **headers)
+		self.assertEqual(response.status_code, 200)
+		return response, b''.join(response.streaming_content).decode('utf-8')
+
+	def read_csv(self, content):
+		return list(csv.DictReader(io.StringIO(content)))
+
+	def test_csv_by_default(self):
+		response, content = self.export()
+		self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+		rows = self.read_csv(content)
+		self.assertEqual(len(rows), 7)
+		self.assertEqual(rows[0]['student_class'], '4A')
+
+	def test_format_by_accept_header(self):
+		for accept, content_type in (
+				('text/csv', 'text/csv; charset=utf-8'),
+				('application/x-ndjson', 'application/x-ndjson')):
+			with self.subTest(accept=accept):
+				response, _ = self.export(HTTP_ACCEPT=accept)
+				self.assertEqual(response['Content-Type'], content_type)
+
+	def test_ndjson(self):
+		_, content = self.export({'output': 'ndjson'})
+		rows = [json.loads(line) for line in content.splitlines()]
+		self.assertEqual(len(rows), 7)
+		self.assertEqual(rows[0]['student_class'], '4A')
+
+	def test_applies_filters(self):
+		_, content = self.export({'last_name': '3'})
+		rows = self.read_csv(content)
+		self.assertEqual(
+			[row['admission_number'] for row in rows], ['L3'])
+
+	def test_escapes_formulas(self):
+		Student.objects.filter(admission_number='L0').update(
+			first_name='=HYPERLINK("http://example.test")', last_name='@SUM')
+		_, content = self.export({'admission_number': 'L0'})
+		row, = self.read_csv(content)
+		self.assertEqual(
+			row['first_name'], '\'=HYPERLINK("http://example.test")')
+		self.assertEqual(row['last_name'], "'@SUM")
+
+	def test_unknown_output_is_a_400(self):
+		response = self.client.get(self.url, {'output': 'xlsx'})
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.data['errors'][0]['pointer'], 'output')
+
+
+class StudentRosterImportTest(TestCase):
+	"""`POST /api/students/bulk/` with JSON rosters and CSV uploads."""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_user(
+			'importer', 'Importer', phone_number='+254722000100',
+			password='import-pass')
+		cls.student_class = Class.objects.create(
+			name='4A', class_teacher=cls.user, created_by=cls.user)
+		cls.math = Subject.objects.create(
+			name='Mathematics', code='MAT', created_by=cls.user)
+		cls.english = Subject.objects.create(
+			name='English', code='ENG', created_by=cls.user)
+
+	def setUp(self):
+		# Writes inside a test never commit, so nothing bumps generations.
+		for reference in get_reference_caches().values():
+			reference.invalidate()
+		self.client = APIClient()
+		self.client.credentials(
+			HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+		self.url = reverse('student-bulk')
+
+	def row(self, **kwargs):
+		row = {
+			'first_name': 'Amina',
+			'last_name': 'Otieno',
+			'date_of_birth': '2010-01-01',
+			'admission_number': 'A1',
+			'student_class': '4A',
+			'subjects': ['MAT'],
+		}
+		row.update(kwargs)
+		return row
+
+	def upload(self, content, upsert=False):
+		url = self.url + ('?upsert=true' if upsert else '')
+		return self.client.post(url, {
+			'file': SimpleUploadedFile('roster.csv', content, 'text/csv'),
+		}, format='multipart')
+
+	def errors(self, response):
+		return [
+			(error['row'], error['pointer'])
+			for error in response.data['errors']
+		]
+
+	def test_reports_errors_per_row(self):
+		response = self.client.post(self.url, [
+			self.row(),
+			self.row(admission_number='A2', student_class='9Z'),
+			self.row(admission_number='A3', subjects=['MAT', 'XXX']),
+			self.row(admission_number='A1'),
+			self.row(admission_number='A5', date_of_birth='soon'),
+		], format='json')
+
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(self.errors(response), [
+			(2, 'student_class'),
+			(3, 'subjects'),
+			(4, 'admission_number'),
+			(5, 'date_of_birth'),
+		])
+		self.assertFalse(Student.objects.exists())
+
+	def test_reports_ambiguous_subject_codes(self):
+		Subject.objects.create(
+			name='Further Mathematics', code='MAT', created_by=self.user)
+		for reference in get_reference_caches().values():
+			reference.invalidate()
+
+		response = self.client.post(self.url, [self.row()], format='json')
+
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(self.errors(response), [(1, 'subjects')])
+		self.assertIn('MAT', response.data['errors'][0]['message'])
+
+	def test_csv_short_rows_are_row_errors(self):
+		response = self.upload(
+			b'first_name,last_name,date_of_birth,student_class,subjects\n'
+			b'Amina,Otieno,2010-01-01,4A,MAT;ENG\n'
+			b'Baraka,Kamau\n')
+
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(self.errors(response), [
+			(2, 'date_of_birth'),
+			(2, 'student_class'),
+			(2, 'subjects'),
+		])
+
+	def test_csv_that_is_not_utf8_is_a_400(self):
+		response = self.upload(
+			b'first_name,last_name\n\xff\xfeAmina,Otieno\n')
+
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.data['errors'][0]['pointer'], 'file')
+
+	def test_upsert_by_primary_key_references(self):
+		student = Student.objects.create(
+			first_name='Amina', last_name='Otieno',
+			date_of_birth=datetime.date(2010, 1, 1), admission_number='A1',
+			student_class=self.student_class, created_by=self.user)
+		student.subjects.set([self.math])
+
+		response = self.client.post(self.url + '?upsert=true', [
+			self.row(
+				last_name='Wanjiru',
+				student_class=str(self.student_class.pk),
+				subjects=[str(self.english.pk)]),
+		], format='json')
+
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(response.data, {'created': 0, 'updated': 1})
+		student.refresh_from_db()
+		self.assertEqual(student.last_name, 'Wanjiru')
+		self.assertEqual(list(student.subjects.all()), [self.english])
+
+	def test_upsert_by_natural_key_references(self):
+		Student.objects.create(
+			first_name='Amina', last_name='Otieno',
+			date_of_birth=datetime.date(2010, 1, 1), admission_number='A1',
+			student_class=self.student_class, created_by=self.user)
+
+		response = self.upload(
+			b'first_name,last_name,date_of_birth,admission_number,'
+			b'student_class,subjects\n'
+			b'Amina,Wanjiru,2010-01-01,A1,4A,MAT;ENG\n'
+			b'Baraka,Kamau,2011-02-02,A2,4A,ENG\n', upsert=True)
+
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(response.data, {'created': 1, 'updated': 1})
+		updated = Student.objects.get(admission_number='A1')
+		self.assertEqual(updated.last_name, 'Wanjiru')
+		self.assertEqual(
+			set(updated.subjects.all()), {self.math, self.english})
+		self.assertEqual(Student.objects.count(), 2)
@@ -1,27 +1,62 @@
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.status import (
+	HTTP_201_CREATED,
+	HTTP_400_BAD_REQUEST,
+)
+
+from common.views import BaseViewSet, ExportMixin
 
 from students.models import Student
 
 from students.serializers import (
 	StudentSerializer,
 	StudentInlineSerializer,
+	StudentExportSerializer,
 )
 
 from students.filters import StudentFilter
 
+from students.imports import StudentRosterImport
 
-class BaseViewSet(ModelViewSet):
-	def perform_create(self, serializer):
-		serializer.save(created_by=self.request.user)
+TRUTHY_VALUES = ('true', 't', 'yes', 'y', '1')
 
 
-class StudentViewSet(BaseViewSet):
+class StudentViewSet(ExportMixin, BaseViewSet):
 	queryset = Student.objects.all()
 	serializer_class = StudentSerializer
+	export_serializer_class = StudentExportSerializer
 	filter_class = StudentFilter
+	values_list = True
+	search_vector_field = 'search_vector'
+	search_trigram_fields = ('first_name', 'last_name', 'admission_number')
 
 	def get_serializer_class(self):
 		serializer_class = StudentSerializer
 		if self.action in ['retrieve', 'list']:            
 			serializer_class = StudentInlineSerializer
-		return serializer_class
\ No newline at end of file
+		return serializer_class
+
+	@action(detail=False, methods=['post'], url_path='bulk')
+	def bulk(self, request, *args, **kwargs):
+		"""
+		Create, or with `?upsert=true` update by admission number, a roster
+		of students from a JSON array or a CSV upload in the `file` field.
+		Nothing is written unless every row is valid.
+		"""
+		upsert = request.query_params.get(
+			'upsert', '').lower() in TRUTHY_VALUES
+		upload = request.FILES.get('file')
+
+		if upload is not None:
+			roster = StudentRosterImport.from_csv(
+				upload, request.user, upsert=upsert)
+		else:
+			roster = StudentRosterImport(
+				request.data, request.user, upsert=upsert)
+
+		if not roster.is_valid():
+			return Response(
+				{'errors': roster.errors}, status=HTTP_400_BAD_REQUEST)
+
+		return Response(roster.save(), status=HTTP_201_CREATED)
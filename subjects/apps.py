@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class SubjectsConfig(AppConfig):
     name = 'subjects'
+
+    def ready(self):
+        from common.utilities.reference import register_reference_cache
+        register_reference_cache(
+            self.get_model('Subject'), indexes=('code', 'name'))
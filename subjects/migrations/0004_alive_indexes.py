@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Partial index for the rows `SoftDeletionManager` returns, matching the
+    default ordering plus `id`, the cursor pagination tie-breaker.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('subjects', '0003_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS subjects_subject_alive_ordering_idx '
+            'ON subjects_subject (updated_at DESC, created_at DESC, id DESC) '
+            'WHERE deleted_at IS NULL',
+            'DROP INDEX CONCURRENTLY IF EXISTS subjects_subject_alive_ordering_idx',
+        ),
+    ]
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework.test import APIClient
+
+from common.benchmarks.budgets import EndpointBudgetMixin
+from common.benchmarks.endpoints import Budget
+
+from subjects.models import Subject
+from users.models import User
+
+
+class SubjectEndpointBudgetTest(EndpointBudgetMixin, TestCase):
+	"""Query budgets of the subject endpoints."""
+	app_label = 'subjects'
+	budgets = {
+		('subject-list', 'list'): Budget(queries=3, time_ms=100),
+		('subject-list', 'create'): Budget(queries=1, time_ms=100),
+		('subject-detail', 'retrieve'): Budget(queries=1, time_ms=100),
+		('subject-detail', 'update'): Budget(queries=2, time_ms=100),
+		('subject-detail', 'partial_update'): Budget(queries=2, time_ms=100),
+		('subject-detail', 'destroy'): Budget(queries=2, time_ms=100),
+	}
+	sparse_fields = {
+		'subject-list': 'id,name',
+	}
+
+
+@override_settings(RESPONSE_CACHE=dict(settings.RESPONSE_CACHE, ENABLED=False))
+class SubjectConditionalListTest(TestCase):
+	"""A list's validators change when a row leaves it."""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_user(
+			'subjects', 'Amina', phone_number='+254722000700',
+			password='subjects-pass')
+		cls.subjects = [
+			Subject.objects.create(
+				name=name, code=name[:3].upper(), created_by=cls.user)
+			for name in ('Biology', 'Chemistry', 'Physics')
+		]
+
+	def setUp(self):
+		self.client = APIClient()
+		self.client.credentials(
+			HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+		self.url = reverse('subject-list')
+
+	def test_soft_delete_ends_the_304(self):
+		response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		self.assertFalse(response.has_header('Last-Modified'))
+		etag = response['ETag']
+		self.assertEqual(
+			self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code,
+			304)
+
+		# Not the newest row, so the latest `updated_at` stays put.
+		self.subjects[0].delete()
+
+		self.assertEqual(
+			self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code,
+			200)
+		self.assertEqual(self.client.get(
+			self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+		).status_code, 200)
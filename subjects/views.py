@@ -1,4 +1,4 @@
-from rest_framework.viewsets import ModelViewSet
+from common.views import BaseViewSet
 
 from subjects.models import Subject
 
@@ -7,11 +7,6 @@ from subjects.serializers import (
 )
 
 
-class BaseViewSet(ModelViewSet):
-	def perform_create(self, serializer):
-		serializer.save(created_by=self.request.user)
-
-
 class SubjectViewSet(BaseViewSet):
 	queryset = Subject.objects.all()
 	serializer_class = SubjectSerializer
\ No newline at end of file
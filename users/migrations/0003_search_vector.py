@@ -0,0 +1,76 @@
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Add a trigger maintained `search_vector` for prefix full-text search,
+    and GIN indexes on it and, with pg_trgm, on the name and username
+    columns.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_time_ordered_ids'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='user',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION users_user_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.first_name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.last_name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.other_names, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.username, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER users_user_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF first_name, last_name, other_names, username
+            ON users_user FOR EACH ROW EXECUTE PROCEDURE users_user_search_vector_update();
+
+            UPDATE users_user SET search_vector =
+                setweight(to_tsvector('simple', coalesce(first_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(last_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(other_names, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(username, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS users_user_search_vector_trigger ON users_user;
+            DROP FUNCTION IF EXISTS users_user_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_user_search_vector_idx '
+            'ON users_user USING gin (search_vector)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_user_search_vector_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_user_first_name_trgm_idx '
+            'ON users_user USING gin (first_name gin_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_user_first_name_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_user_last_name_trgm_idx '
+            'ON users_user USING gin (last_name gin_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_user_last_name_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_user_username_trgm_idx '
+            'ON users_user USING gin (username gin_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_user_username_trgm_idx',
+        ),
+    ]
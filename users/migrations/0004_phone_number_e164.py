@@ -0,0 +1,48 @@
+import phonenumbers
+
+from django.db import migrations, models
+
+
+def normalize_phone_number(phone_number):
+    # A frozen copy of `common.utilities.normalize_phone_number`, so later
+    # changes to it do not change what this migration wrote.
+    if not phone_number.startswith('+'):
+        phone_number = '+{}'.format(phone_number)
+    try:
+        parsed = phonenumbers.parse(phone_number)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(
+        parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def backfill_phone_number_e164(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = User.objects.exclude(phone_number=None).values_list(
+        'pk', 'phone_number')
+    for pk, phone_number in users.iterator():
+        User.objects.filter(pk=pk).update(
+            phone_number_e164=normalize_phone_number(phone_number))
+
+
+class Migration(migrations.Migration):
+    """
+    Add `phone_number_e164`, the indexed E.164 form of `phone_number` that
+    logins look users up by, and fill it in for existing users.
+    """
+
+    dependencies = [
+        ('users', '0003_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_number_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(
+            backfill_phone_number_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_phone_numbers(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    # Without `order_by()` the default ordering joins the GROUP BY.
+    duplicates = User.objects.exclude(phone_number_e164=None).order_by(
+        ).values('phone_number_e164').annotate(users=Count('pk')).filter(
+        users__gt=1).values_list('phone_number_e164', flat=True)
+    conflicts = User.objects.filter(
+        phone_number_e164__in=list(duplicates)).order_by(
+        'phone_number_e164', 'date_joined', 'pk').values_list(
+        'phone_number_e164', 'pk', 'username', 'phone_number')
+    if not conflicts:
+        return
+    raise RuntimeError(
+        'Users share phone numbers; give each number to a single user and '
+        'migrate again:\n{}'.format('\n'.join(
+            '  {} user {} ({}) as {!r}'.format(*conflict)
+            for conflict in conflicts)))
+
+
+class Migration(migrations.Migration):
+    """
+    Make `phone_number_e164` unique. Users holding the same number in
+    different spellings stop the migration with a list of them, for an
+    operator to decide who keeps the number.
+    """
+
+    dependencies = [
+        ('users', '0004_phone_number_e164'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_duplicate_phone_numbers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='phone_number_e164',
+            field=models.CharField(blank=True, editable=False, error_messages={'unique': 'A user with that phone number already exists'}, max_length=16, null=True, unique=True),
+        ),
+    ]
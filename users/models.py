@@ -3,22 +3,50 @@ User related models
 """
 
 import datetime
-import uuid
 import jwt
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.query import QuerySet
 from django.utils import timezone
 
 from common.utilities import (
 	GENDER_CHOICES,
+	normalize_phone_number,
 	validate_phone_number,
+	uuid7,
 )
+from common.utilities.cache import get_principal_cache
+from common.utilities.generations import bump_generation_on_commit
 
 
+class UserQuerySet(QuerySet):
+	"""
+	Bulk writes skip model signals, so they bump the `User` generation
+	themselves: cached principals are dropped when, say, users are
+	deactivated with `update(is_active=False)`.
+	"""
+	def with_phone_number(self, phone_number):
+		"""Users holding `phone_number`, in whatever spelling."""
+		phone_number_e164 = normalize_phone_number(phone_number)
+		if phone_number_e164 is None:
+			return self.none()
+		return self.filter(phone_number_e164=phone_number_e164)
+
+	def update(self, **kwargs):
+		rows = super(UserQuerySet, self).update(**kwargs)
+		bump_generation_on_commit(self.model, using=self.db)
+		return rows
+
+	def bulk_create(self, *args, **kwargs):
+		objs = super(UserQuerySet, self).bulk_create(*args, **kwargs)
+		bump_generation_on_commit(self.model, using=self.db)
+		return objs
 
-class CustomUserManager(BaseUserManager):
+
+class CustomUserManager(BaseUserManager.from_queryset(UserQuerySet)):
 	"""
 	Django requires that custom users define their own Manager class.
 	By inheriting from `BaseUserManager`, we get a lot of the same code used by
@@ -97,7 +125,7 @@ class User(AbstractBaseUser):
 	USERNAME_FIELD = 'phone_number'
 
 	id = models.UUIDField(
-		primary_key=True, default=uuid.uuid4, editable=False)
+		primary_key=True, default=uuid7, editable=False)
 	first_name = models.CharField(max_length=255)
 	last_name = models.CharField(
 		max_length=255,
@@ -126,6 +154,18 @@ class User(AbstractBaseUser):
 		blank=True, 
 		default=None
 	)
+	# `phone_number` in E.164, so equivalent spellings find the same user
+	# and no two users hold one number.
+	phone_number_e164 = models.CharField(
+		max_length=16,
+		unique=True,
+		null=True,
+		blank=True,
+		editable=False,
+		error_messages={
+			'unique': 'A user with that phone number already exists'
+		}
+	)
 	gender = models.CharField(
 		max_length=1, 
 		choices=GENDER_CHOICES, 
@@ -139,6 +179,8 @@ class User(AbstractBaseUser):
 	is_active = models.BooleanField(default=True)
 	is_deleted = models.BooleanField(default=False)
 	date_joined = models.DateTimeField(default=timezone.now)
+	# Maintained by a database trigger, see migration 0003.
+	search_vector = SearchVectorField(null=True, editable=False)
 
 	objects = CustomUserManager()
 
@@ -177,15 +219,25 @@ class User(AbstractBaseUser):
 		return token.decode('utf-8')
 
 	def save(self, *args, **kwargs):
-		self.full_clean(exclude=None)
-
 		if not self.phone_number:
 			self.phone_number = None
 
+		# Set before `full_clean`, which then refuses a number another user
+		# holds in a different spelling.
+		self.phone_number_e164 = normalize_phone_number(
+			self.phone_number) if self.phone_number else None
+
 		if not self.email:
 			self.email = None
 
+		self.full_clean(exclude=None)
+
 		super(User, self).save(*args, **kwargs)
+		get_principal_cache().invalidate(self.pk)
+
+	def delete(self, *args, **kwargs):
+		get_principal_cache().invalidate(self.pk)
+		return super(User, self).delete(*args, **kwargs)
 
 	class Meta:
 		ordering = ('-date_joined', 'first_name')
\ No newline at end of file
@@ -12,7 +12,28 @@ from users import models
 
 from common.utilities import validate_phone_number
 
+def validate_unique_phone_number(value, instance=None):
+    """
+    Refuse `value` when another user holds the same number, in whatever
+    spelling.
+    """
+    if not value:
+        return
+    validate_phone_number(value)
+    users = models.User.objects.with_phone_number(value)
+    if instance is not None:
+        users = users.exclude(pk=instance.pk)
+    if users.exists():
+        raise serializers.ValidationError(
+            'A user with that phone number already exists'
+        )
+
+
 class MeSerializer(serializers.ModelSerializer):
+    def validate_phone_number(self, value):
+        validate_unique_phone_number(value, self.instance)
+        return value
+
     def validate(self, attrs):
         phone_number = attrs.get('phone_number', False)
         email = attrs.get('email', False)
@@ -111,15 +132,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return value
 
     def validate_phone_number(self, value):
-        if value:
-            validate_phone_number(value)
-
-        if value and models.User.objects.filter(
-                phone_number=value, is_deleted=False).exists():
-            raise serializers.ValidationError(
-                'A user with that phone number already exists'
-            )
-
+        validate_unique_phone_number(value)
         return value
 
     def validate(self, attrs):
@@ -192,6 +205,14 @@ class UserCreateSerializer(serializers.ModelSerializer):
         }
 
 
+class LoginDetailsSerializer(MeSerializer):
+    """`MeSerializer` with the token `UserLoginSerializer` already minted."""
+    token = serializers.SerializerMethodField()
+
+    def get_token(self, user):
+        return self.parent.validated_data['token']
+
+
 class UserLoginSerializer(serializers.ModelSerializer):
     token = serializers.CharField(read_only=True, allow_blank=True)
     phone_number = serializers.CharField(required=False, allow_blank=True)
@@ -202,7 +223,7 @@ class UserLoginSerializer(serializers.ModelSerializer):
             'blank': 'This field is required'
         }
     )
-    details = MeSerializer(read_only=True)
+    details = LoginDetailsSerializer(read_only=True)
 
     def validate_email(self, value):
         if 'email' in self.get_initial() and not value:
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import base64
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from common.benchmarks.budgets import BENCHMARK_REPEAT, EndpointBudgetMixin
+from common.benchmarks.endpoints import Budget, measure
+from common.utilities import normalize_phone_number
+from common.utilities.cache import get_credential_cache
+from common.utilities.generations import generation_key, get_generation_cache
+from common.utilities.hashing import HashingExecutor
+
+from users.models import User
+
+RESPONSE_CACHE_DISABLED = dict(settings.RESPONSE_CACHE, ENABLED=False)
+
+# The profile endpoint has no URL name.
+ME_URL = '/api/auth/me/'
+
+# Logins, each a single query whatever identifier is used, with the status
+# the scenario must return.
+LOGIN_SCENARIOS = (
+    ('login:phone', {'phone_number': '+254700000000'}, 200),
+    ('login:phone-spaced', {'phone_number': '254 700 000000'}, 200),
+    ('login:email', {'email': 'bench@school.test'}, 200),
+    ('login:username', {'phone_number': 'bench'}, 200),
+    ('login:wrong-password', {
+        'phone_number': '+254700000000', 'password': 'wrong-pass'}, 400),
+    ('login:unknown', {'email': 'nobody@school.test'}, 400),
+)
+LOGIN_BUDGET = Budget(queries=1, time_ms=1000)
+
+
+class UserEndpointBudgetTest(EndpointBudgetMixin, TestCase):
+    """Query budgets of the user endpoints and of logging in."""
+    app_label = 'users'
+    budgets = {
+        ('user-list', 'list'): Budget(queries=2, time_ms=250),
+        ('user-detail', 'retrieve'): Budget(queries=1, time_ms=100),
+        ('user-export', 'export'): Budget(queries=1, time_ms=250),
+    }
+    sparse_fields = {
+        'user-list': 'id,full_name',
+    }
+
+    def test_login_budgets(self):
+        client = APIClient()
+        for scenario, credentials, status in LOGIN_SCENARIOS:
+            response, result = measure(
+                client, 'post', reverse('login'),
+                dict({'password': 'bench-pass'}, **credentials),
+                repeat=BENCHMARK_REPEAT, format='json')
+            self.record(
+                'login', scenario, response, dict(result, action='login'),
+                LOGIN_BUDGET, status)
+
+
+class PhoneNumberTest(TestCase):
+    """Phone numbers are one number whatever the spelling."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='254 722 000400',
+            password='amina-pass')
+        cls.other = User.objects.create_user(
+            'baraka', 'Baraka', phone_number='+254722000401',
+            password='baraka-pass')
+
+    def test_normalizes_to_e164(self):
+        for spelling in ('+254722000400', '254722000400', '+254 722 000 400'):
+            with self.subTest(spelling=spelling):
+                self.assertEqual(
+                    normalize_phone_number(spelling), '+254722000400')
+        self.assertIsNone(normalize_phone_number('12345'))
+        self.assertEqual(self.user.phone_number_e164, '+254722000400')
+
+    def test_logs_in_with_any_spelling(self):
+        for spelling in ('+254722000400', '254722000400', '+254 722 000400'):
+            with self.subTest(spelling=spelling):
+                response = APIClient().post(reverse('login'), {
+                    'phone_number': spelling, 'password': 'amina-pass',
+                }, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.data['details']['id'], str(self.user.pk))
+
+    def test_register_refuses_a_taken_number(self):
+        response = APIClient().post(reverse('register'), {
+            'first_name': 'Chege', 'username': 'chege',
+            'phone_number': '+254722000400', 'password': 'chege-pass',
+            'confirm_password': 'chege-pass',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['errors'][0]['pointer'], 'phone_number')
+
+    def test_update_refuses_a_taken_number(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(self.other.token))
+        url = ME_URL
+
+        response = client.put(url, {
+            'first_name': 'Baraka', 'phone_number': '254722000400',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        # Their own number in another spelling is not a conflict.
+        response = client.put(url, {
+            'first_name': 'Baraka', 'phone_number': '254 722 000401',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_user_refuses_a_taken_number(self):
+        with self.assertRaises(ValidationError):
+            User.objects.create_user(
+                'chege', 'Chege', phone_number='+254 722 000400',
+                password='chege-pass')
+
+
+class HashingOverloadTest(TestCase):
+    """Logins past the hashing queue are turned away with a 429."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='+254722000500',
+            password='amina-pass')
+
+    def test_full_queue_is_a_429(self):
+        executor = HashingExecutor(workers=1, max_queue=0, retry_after=3)
+        self.addCleanup(executor.shutdown)
+        # Take the only slot, as a hash already running would.
+        executor._slots.acquire()
+        self.addCleanup(executor._slots.release)
+
+        with mock.patch(
+                'common.utilities.hashing.get_hashing_executor',
+                return_value=executor):
+            response = APIClient().post(reverse('login'), {
+                'phone_number': '+254722000500', 'password': 'amina-pass',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class CredentialCacheTest(TestCase):
+    """Cached Basic credentials stop working as soon as they change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='+254722000600',
+            password='amina-pass')
+
+    def setUp(self):
+        self.cache = get_credential_cache()
+        self.cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Basic {}'.format(
+            base64.b64encode(b'+254722000600:amina-pass').decode('ascii')))
+        self.url = ME_URL
+
+    def assert_signed_in(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], str(self.user.pk))
+
+    def assert_refused(self):
+        stale = self.cache.stats()['stale']
+        response = self.client.get(self.url)
+        # Session authentication comes first and sends no challenge, so
+        # failed credentials are a 403 rather than a 401.
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.cache.stats()['stale'], stale + 1)
+
+    def test_repeated_credentials_are_not_hashed_again(self):
+        self.assert_signed_in()
+        hits = self.cache.stats()['hits']
+        with mock.patch(
+                'common.utilities.auth.verify_password') as verify_password:
+            self.assert_signed_in()
+        verify_password.assert_not_called()
+        self.assertEqual(self.cache.stats()['hits'], hits + 1)
+
+    def test_password_change_invalidates(self):
+        self.assert_signed_in()
+        self.user.set_password('new-pass')
+        self.user.save()
+        self.assert_refused()
+
+    def test_deactivation_invalidates(self):
+        self.assert_signed_in()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assert_refused()
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE_DISABLED)
+class PrincipalCacheTest(TransactionTestCase):
+    """
+    Token users cached per worker stop authenticating on the next request
+    once deactivated. Writes must commit to bump generations, hence the
+    `TransactionTestCase`.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'amina', 'Amina', phone_number='+254722000800',
+            password='amina-pass')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(self.user.token))
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+    def assert_refused(self):
+        # Session authentication comes first, see CredentialCacheTest.
+        self.assertEqual(self.client.get(ME_URL).status_code, 403)
+
+    def test_deactivated_with_save(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assert_refused()
+
+    def test_deactivated_with_update(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assert_refused()
+
+    def test_deactivated_by_another_worker(self):
+        # A write that bumps nothing in this worker: the cached user is
+        # still served.
+        QuerySet.update(User.objects.filter(pk=self.user.pk), is_active=False)
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        # The other worker's bump reaches this one through the shared cache.
+        get_generation_cache().incr(generation_key(User))
+        self.assert_refused()
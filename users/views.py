@@ -27,9 +27,20 @@ from users.serializers import (
 
 from users.models import User
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+from common.views import (
+    ExportMixin,
+    RelatedLookupsMixin,
+    ResponseCacheMixin,
+    SparseFieldsetMixin,
+)
+
+class UserViewSet(ExportMixin, ResponseCacheMixin, SparseFieldsetMixin,
+                  RelatedLookupsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    export_serializer_class = UserSerializer
+    search_vector_field = 'search_vector'
+    search_trigram_fields = ('first_name', 'last_name', 'username')
 
 class UserRetrieveUpdateAPIView(RetrieveUpdateAPIView):
     serializer_class = MeSerializer